@@ -1,35 +1,50 @@
 import streamlit as st
 from databases.mongo_connection import connect_mongodb
-from queries.mongo_queries import (
-    year_with_most_movies, movies_after_1999, avg_votes_2007, films_per_year, avg_runtime_by_decade, distinct_genres, highest_revenue_film,
-    directors_with_more_than_5_films, top_genre_by_avg_revenue, top_3_rated_by_decade, high_score_high_revenue, longest_film_by_genre,
-    correlation_runtime_revenue
-)
+from queries.mongo_queries import dashboard_snapshot, directors_with_more_than_5_films
 from queries.neo4j_queries import (
     top_actor_by_films,
-    actors_with_anne_hathaway,
+    co_actors,
     top_actor_by_revenue,
     avg_votes,
     top_genre,
     films_with_my_coworkers,
     top_director_by_distinct_actors,
     most_connected_film,
+    similar_films,
     top_5_actors_by_directors,
     recommend_by_genres,
     create_director_influence_relations,
     shortest_path_between_actors,
-    detect_actor_communities
-)
-from utils.visualization import (
-    plot_histogram_films_per_year, plot_avg_runtime_by_decade
+    actor_communities_page
 )
+from utils.visualization import show_chart, show_page, page_number
 from databases.neo4j_connection import connect_neo4j
+from config.config import GRAPH_SNAPSHOT, MONGO_BACKEND
+from utils.dashboard_executor import Section, render_dashboard
+from utils.cache import query_cache
+from utils.instrumentation import summary, slow_query_log, start_metrics_server
+
+# Requêtes de parcours servies par la copie CSR locale du graphe (même signature)
+if GRAPH_SNAPSHOT:
+    from queries.graph_snapshot import (
+        top_actor_by_films,
+        co_actors,
+        films_with_my_coworkers,
+        most_connected_film,
+        similar_films
+    )
 
 st.set_page_config(page_title="Projet NoSQL", layout="wide")
 st.title("📊 Projet NoSQL - MongoDB & Neo4j")
 
-# Selection de la BD
-menu = st.sidebar.selectbox("📂 Choisir une base de données :", ["Accueil", "MongoDB", "Neo4j"])
+# Point de collecte Prometheus (si INSTRUMENT_METRICS_PORT est défini)
+start_metrics_server()
+
+# Selection de la BD (page "Performance" cachée : ajouter ?perf=1 à l'URL)
+pages = ["Accueil", "MongoDB", "Neo4j"]
+if st.query_params.get("perf") == "1":
+    pages.append("Performance")
+menu = st.sidebar.selectbox("📂 Choisir une base de données :", pages)
 
 # Traitement concernant l'accueil
 if menu == "Accueil":
@@ -46,72 +61,96 @@ elif menu == "MongoDB":
         collection = connect_mongodb()
         st.success("✅ Connexion MongoDB établie.")
 
+        # Source : collection en direct ou instantané Parquet (queries/films_snapshot.py)
+        sources = {"Direct (MongoDB)": "live", "Instantané (Parquet)": "snapshot"}
+        source = st.sidebar.radio("🗄️ Source des données :", list(sources),
+                                  index=list(sources.values()).index(MONGO_BACKEND))
+
+        if sources[source] == "snapshot":
+            from queries import films_snapshot
+
+            if st.sidebar.button("🔄 Rafraîchir l'instantané"):
+                with st.spinner("Export de la collection..."):
+                    films_snapshot.export_snapshot(collection)
+            with st.spinner("Chargement de l'instantané..."):
+                snapshot = films_snapshot.dashboard_snapshot(collection)
+            st.caption(f"Instantané du {films_snapshot.get_snapshot(collection).exported_at}")
+        else:
+            # Toutes les sections en une seule agrégation $facet
+            snapshot = dashboard_snapshot(collection)
+
         st.subheader("1️⃣ Année avec le plus grand nombre de films")
-        result = year_with_most_movies(collection)
+        result = snapshot.year_with_most_movies
         if result:
             st.write(f"🎬 Année : **{result[0]['_id']}** avec **{result[0]['count']}** films")
 
         st.subheader("2️⃣ Nombre de films après 1999")
-        count = movies_after_1999(collection)
+        count = snapshot.movies_after_1999
         st.write(f"📈 Nombre de films : **{count}**")
 
         st.subheader("3️⃣ Moyenne des votes pour les films de 2007")
-        avg_votes = avg_votes_2007(collection)
+        avg_votes = snapshot.avg_votes_2007
         st.write(f"⭐ Moyenne des votes : **{avg_votes:.2f}**" if avg_votes else "Pas de données")
 
         st.subheader("4️⃣ Histogramme du nombre de films par année")
-        histogram_data = films_per_year(collection)
-        fig1 = plot_histogram_films_per_year(histogram_data)
-        st.pyplot(fig1)
+        histogram_data = snapshot.year_counts
+        show_chart(st, "films_per_year", histogram_data)
 
         st.subheader("5️⃣ Genres disponibles")
-        genres = distinct_genres(collection)
+        genres = snapshot.distinct_genres
         st.write(genres)
 
         st.subheader("6️⃣ Film ayant généré le plus de revenus")
-        top_film = highest_revenue_film(collection)
+        top_film = snapshot.highest_revenue_film
         if top_film:
             st.write(f"🎬 **{top_film['title']}** - 💵 {top_film['Revenue (Millions)']} millions")
 
         st.subheader("7️⃣ Réalisateurs avec plus de 5 films")
-        directors = directors_with_more_than_5_films(collection)
-        for d in directors:
-            st.write(f"- 🎬 {d['_id']} ({d['count']} films)")
+        directors_page = (films_snapshot.directors_with_more_than_5_films if sources[source] == "snapshot"
+                          else directors_with_more_than_5_films)
+
+        # Changer de page ne ré-exécute que cette section
+        @st.fragment
+        def directors_section():
+            page = directors_page(collection, page=page_number(st, "directors_page", source))
+            show_page(st, page, "directors_page", {"_id": "Réalisateur", "count": "Films"})
+
+        directors_section()
 
         st.subheader("8️⃣ Genre avec le revenu moyen le plus élevé")
-        top_genres = top_genre_by_avg_revenue(collection)
-        top = top_genres[0]
-        st.write(f"🏆 Genre : **{top['genre']}** - Moyenne : **{top['avg']:.2f} M$**")
-        st.bar_chart({g["genre"]: g["avg"] for g in top_genres[:10]})
+        top_genres = snapshot.genre_avg_revenue
+        if top_genres:
+            top = top_genres[0]
+            st.write(f"🏆 Genre : **{top['genre']}** - Moyenne : **{top['avg']:.2f} M$**")
+            st.bar_chart({g["genre"]: g["avg"] for g in top_genres[:10]})
 
         st.subheader("9️⃣ Top 3 films les mieux notés par décennie")
-        top_per_decade = top_3_rated_by_decade(collection)
+        top_per_decade = snapshot.top_3_by_decade
         for decade, films in top_per_decade.items():
             st.markdown(f"**🎞️ Décennie {decade}**")
             for film in films:
                 st.write(f"- {film['title']} (Rating: {film['rating']})")
 
         st.subheader("🔟 Film le plus long par genre")
-        longest_by_genre = longest_film_by_genre(collection)
+        longest_by_genre = snapshot.longest_by_genre
         for genre, film in longest_by_genre.items():
             st.write(f"- **{genre}** : {film['title']} ({film['Runtime (Minutes)']} min)")
 
         st.subheader("1️⃣1️⃣ Films bien notés ET rentables")
-        filtered = high_score_high_revenue(collection)
+        filtered = snapshot.high_score_high_revenue
         for film in filtered:
             st.write(f"🎬 {film['title']} - 🎯 Metascore: {film['Metascore']} - 💰 {film['Revenue (Millions)']} M$")
 
         st.subheader("1️⃣2️⃣ Corrélation entre durée et revenu")
-        corr = correlation_runtime_revenue(collection)
+        corr = snapshot.correlation
         if corr is not None:
             st.write(f"📊 Coefficient de corrélation : **{corr:.2f}**")
         else:
             st.warning("Pas assez de données pour calculer la corrélation.")
 
         st.subheader("1️⃣3️⃣ Évolution de la durée moyenne des films par décennie")
-        avg_runtime_data = avg_runtime_by_decade(collection)
-        fig2 = plot_avg_runtime_by_decade(avg_runtime_data)
-        st.pyplot(fig2)
+        avg_runtime_data = snapshot.runtime_by_decade
+        show_chart(st, "runtime_by_decade", avg_runtime_data)
     except Exception as e:
         st.error(f"❌ Erreur de connexion à MongoDB : {e}")
 
@@ -126,55 +165,43 @@ elif menu == "Neo4j":
             result = session.run("RETURN '✅ Connexion réussie à Neo4j !' AS msg")
             st.success(result.single()["msg"])
 
-        st.subheader("🔍 14️⃣ Acteur ayant joué dans le plus de films")
-        top_actor = top_actor_by_films(driver)
-        if top_actor:
-            st.write(f"🎭 **{top_actor['acteur']}** a joué dans **{top_actor['nb_films']}** films")
-
-        st.subheader("🔍 15️⃣ Acteurs ayant joué avec Anne Hathaway")
-        actors = actors_with_anne_hathaway(driver)
-        st.write(actors)
-
-        st.subheader("🔍 16️⃣ Acteur ayant généré le plus de revenus")
-        top_revenue = top_actor_by_revenue(driver)
-        if top_revenue:
-            st.write(f"💰 **{top_revenue['acteur']}** avec **{top_revenue['total_revenue']:.2f} M$**")
-
-        st.subheader("🔍 17️⃣ Moyenne des votes des films")
-        avg = avg_votes(driver)
-        st.write(f"⭐ Moyenne des votes : **{avg:.2f}**")
-
-        st.subheader("🔍 18️⃣ Genre le plus représenté")
-        genre = top_genre(driver)
-        if genre:
-            st.write(f"🎬 Genre : **{genre['genre']}** avec **{genre['nb_films']}** films")
-
-        st.subheader("🔍 19️⃣ Films avec les acteurs qui ont joué avec toi")
-        nom_utilisateur = st.text_input("Ton nom d'acteur enregistré dans la base :", value="Ton Nom")
-        if nom_utilisateur:
-            films = films_with_my_coworkers(driver, nom_utilisateur)
-            st.write(films)
-
-        st.subheader("🔍 20️⃣ Réalisateur ayant travaillé avec le plus d’acteurs différents")
-        top_dir = top_director_by_distinct_actors(driver)
-        if top_dir:
-            st.write(f"🎬 **{top_dir['realisateur']}** avec **{top_dir['nb_acteurs']}** acteurs différents")
-
-        st.subheader("🔍 21️⃣ Film le plus connecté")
-        connected = most_connected_film(driver)
-        if connected:
-            st.write(
-                f"🔗 **{connected['film']}** a des acteurs en commun avec **{connected['connexions']}** autres films")
-
-        st.subheader("🔍 22️⃣ Acteurs ayant travaillé avec le plus de réalisateurs")
-        top5 = top_5_actors_by_directors(driver)
-        for record in top5:
-            st.write(f"- 🎭 {record['acteur']} (avec {record['nb_realisateurs']} réalisateurs)")
-
-        st.subheader("🔍 23️⃣ Recommandation de films à un acteur (par genre)")
-        target_actor = st.text_input("Nom de l'acteur :", value="Tom Hanks")
-        if target_actor:
-            recos = recommend_by_genres(driver, target_actor)
+        # Affichage de chaque section
+        def show_top_actor(top_actor):
+            if top_actor:
+                st.write(f"🎭 **{top_actor['acteur']}** a joué dans **{top_actor['nb_films']}** films")
+
+        def show_top_revenue(top_revenue):
+            if top_revenue:
+                st.write(f"💰 **{top_revenue['acteur']}** avec **{top_revenue['total_revenue']:.2f} M$**")
+
+        def show_avg_votes(avg):
+            st.write(f"⭐ Moyenne des votes : **{avg:.2f}**")
+
+        def show_top_genre(genre):
+            if genre:
+                st.write(f"🎬 Genre : **{genre['genre']}** avec **{genre['nb_films']}** films")
+
+        def show_top_director(top_dir):
+            if top_dir:
+                st.write(f"🎬 **{top_dir['realisateur']}** avec **{top_dir['nb_acteurs']}** acteurs différents")
+
+        def show_connected(connected):
+            if connected:
+                st.write(
+                    f"🔗 **{connected['film']}** a des acteurs en commun avec **{connected['connexions']}** autres films")
+
+        def show_similar(similar):
+            if similar:
+                for record in similar:
+                    st.write(f"- 🎬 {record['film']} ({record['acteurs_communs']} acteurs en commun)")
+            else:
+                st.warning("Aucun film ne partage d'acteur avec celui-ci.")
+
+        def show_top5(top5):
+            for record in top5:
+                st.write(f"- 🎭 {record['acteur']} (avec {record['nb_realisateurs']} réalisateurs)")
+
+        def show_recos(recos):
             if recos:
                 st.write("🎥 Suggestions :")
                 for r in recos:
@@ -182,20 +209,7 @@ elif menu == "Neo4j":
             else:
                 st.warning("Aucune recommandation trouvée.")
 
-        st.subheader("🔍 24️⃣ Créer les relations d'influence entre réalisateurs")
-        if st.button("Créer les relations INFLUENCE_PAR"):
-            create_director_influence_relations(driver)
-            st.success("Relations d'influence créées ✅")
-
-        st.subheader("🔍 25️⃣ Chemin le plus court entre deux acteurs")
-        col1, col2 = st.columns(2)
-        with col1:
-            actor1 = st.text_input("Acteur 1", value="Tom Hanks")
-        with col2:
-            actor2 = st.text_input("Acteur 2", value="Scarlett Johansson")
-
-        if actor1 and actor2:
-            path = shortest_path_between_actors(driver, actor1, actor2)
+        def show_path(path):
             if path:
                 st.success("✅ Chemin trouvé :")
                 for step in path:
@@ -203,13 +217,162 @@ elif menu == "Neo4j":
             else:
                 st.warning("Aucun chemin trouvé entre ces deux acteurs.")
 
-        st.subheader("🔍 26️⃣ Communautés d’acteurs (Louvain)")
-        if st.button("Détecter les communautés (GDS)"):
-            try:
-                results = detect_actor_communities(driver)
-                for r in results[:10]:  # affiche les 10 premiers
-                    st.write(f"{r['acteur']} → Communauté {r['communityId']}")
-            except Exception as e:
-                st.error("⚠️ Neo4j Aura ne supporte peut-être pas GDS dans la version gratuite.")
+        def show_communities(result):
+            st.write(f"{result['total']} acteurs répartis en {result['communities']} communautés")
+            show_page(st, result["page"], "communities_page",
+                      {"acteur": "Acteur", "communityId": "Communauté", "taille": "Taille de la communauté"})
+
+        # Nom saisi -> elementId de l'acteur (queries/actor_lookup.py). Sans correspondance
+        # exacte unique, une liste de propositions (préfixe / faute de frappe) s'affiche
+        # et aucune requête de parcours ne part sur un nom inconnu.
+        def pick_actor(name, key):
+            from queries.actor_lookup import get_lookup
+
+            lookup = get_lookup(driver)
+            exact = lookup.resolve(name)
+            if len(exact) == 1:
+                return exact[0].id
+            options = exact or lookup.suggest(name)
+            if not options:
+                st.warning(f"Aucun acteur ne correspond à « {name} ».")
+                return None
+            if exact:
+                label, show = f"Plusieurs acteurs s'appellent « {name} » :", lambda m: f"{m.name} ({m.id})"
+            else:
+                label, show = f"« {name} » est introuvable. Vouliez-vous dire :", lambda m: m.name
+            choice = st.selectbox(label, options, format_func=show, index=None, key=key)
+            return choice.id if choice else None
+
+        # Widgets des sections (lus dans le thread principal). Les champs texte sont
+        # dans des formulaires : la requête ne part qu'à la validation, pas à chaque saisie.
+        # Les résultats longs sont paginés : le numéro de page vit dans session_state.
+        def co_actors_inputs():
+            with st.form("co_actors_form", border=False):
+                actor_name = st.text_input("Nom de l'acteur :", value="Anne Hathaway")
+                st.form_submit_button("Rechercher")
+            actor_id = pick_actor(actor_name, "co_actors_pick") if actor_name else None
+            return {"actor_id": actor_id, "page": page_number(st, "co_actors_page", actor_id)} if actor_id else None
+
+        def coworkers_inputs():
+            with st.form("coworkers_form", border=False):
+                nom_utilisateur = st.text_input("Ton nom d'acteur enregistré dans la base :", value="Ton Nom")
+                st.form_submit_button("Rechercher")
+            my_id = pick_actor(nom_utilisateur, "coworkers_pick") if nom_utilisateur else None
+            return {"my_id": my_id, "page": page_number(st, "coworkers_page", my_id)} if my_id else None
+
+        def reco_inputs():
+            with st.form("reco_form", border=False):
+                target_actor = st.text_input("Nom de l'acteur :", value="Tom Hanks")
+                st.form_submit_button("Recommander")
+            actor_id = pick_actor(target_actor, "reco_pick") if target_actor else None
+            return {"actor_id": actor_id} if actor_id else None
+
+        def similar_inputs():
+            with st.form("similar_form", border=False):
+                title = st.text_input("Titre du film :", value="Inception")
+                st.form_submit_button("Rechercher")
+            return {"title": title} if title else None
+
+        def path_inputs():
+            with st.form("path_form", border=False):
+                col1, col2 = st.columns(2)
+                with col1:
+                    actor1 = st.text_input("Acteur 1", value="Tom Hanks")
+                with col2:
+                    actor2 = st.text_input("Acteur 2", value="Scarlett Johansson")
+                st.form_submit_button("Chercher le chemin")
+            if not (actor1 and actor2):
+                return None
+            id1, id2 = pick_actor(actor1, "path_pick_1"), pick_actor(actor2, "path_pick_2")
+            return {"id1": id1, "id2": id2} if id1 and id2 else None
+
+        def influence_inputs():
+            incremental = st.checkbox("Seulement les nouveaux réalisateurs", value=True)
+            weighted = st.checkbox("Pondérer par le nombre de genres partagés")
+            if not st.button("Créer les relations INFLUENCE_PAR"):
+                return None
+            return {"incremental": incremental, "weighted": weighted}
+
+        # Le résultat est en cache : changer de page ne relance pas la détection
+        def communities_inputs():
+            if st.button("Détecter les communautés"):
+                st.session_state["communities_requested"] = True
+            if not st.session_state.get("communities_requested"):
+                return None
+            return {"page": page_number(st, "communities_page")}
+
+        # Seule la vue affichée exécute ses requêtes ; dans une vue, les sections sans
+        # widget partent en parallèle et chaque section à widgets est un fragment
+        views = {
+            "📊 Statistiques": [
+                Section("🔍 14️⃣ Acteur ayant joué dans le plus de films",
+                        lambda: top_actor_by_films(driver), show_top_actor),
+                Section("🔍 16️⃣ Acteur ayant généré le plus de revenus",
+                        lambda: top_actor_by_revenue(driver), show_top_revenue),
+                Section("🔍 17️⃣ Moyenne des votes des films",
+                        lambda: avg_votes(driver), show_avg_votes),
+                Section("🔍 18️⃣ Genre le plus représenté",
+                        lambda: top_genre(driver), show_top_genre),
+                Section("🔍 20️⃣ Réalisateur ayant travaillé avec le plus d’acteurs différents",
+                        lambda: top_director_by_distinct_actors(driver), show_top_director),
+                Section("🔍 21️⃣ Film le plus connecté",
+                        lambda: most_connected_film(driver), show_connected),
+                Section("🔍 22️⃣ Acteurs ayant travaillé avec le plus de réalisateurs",
+                        lambda: top_5_actors_by_directors(driver), show_top5),
+            ],
+            "🔎 Recherche": [
+                Section("🔍 15️⃣ Acteurs ayant joué avec un acteur",
+                        lambda actor_id, page: co_actors(driver, actor_id, page=page, by_id=True),
+                        lambda page: show_page(st, page, "co_actors_page",
+                                               {"acteur": "Acteur", "films_communs": "Films en commun"}),
+                        inputs=co_actors_inputs),
+                Section("🔍 19️⃣ Films avec les acteurs qui ont joué avec toi",
+                        lambda my_id, page: films_with_my_coworkers(driver, my_id, by_id=True, page=page),
+                        lambda page: show_page(st, page, "coworkers_page", {"film": "Film"}),
+                        inputs=coworkers_inputs),
+                Section("🔍 Films partageant le plus d'acteurs avec un film",
+                        lambda title: similar_films(driver, title), show_similar, inputs=similar_inputs),
+                Section("🔍 23️⃣ Recommandation de films à un acteur (par genre)",
+                        lambda actor_id: recommend_by_genres(driver, actor_id, by_id=True), show_recos,
+                        inputs=reco_inputs),
+                Section("🔍 25️⃣ Chemin le plus court entre deux acteurs",
+                        lambda id1, id2: shortest_path_between_actors(driver, id1, id2, by_id=True), show_path,
+                        inputs=path_inputs),
+            ],
+            "🕸️ Graphe": [
+                Section("🔍 24️⃣ Créer les relations d'influence entre réalisateurs",
+                        lambda incremental, weighted: create_director_influence_relations(driver, incremental, weighted),
+                        lambda created: st.success(f"{created} relations d'influence créées ✅"),
+                        inputs=influence_inputs, timeout=600, job=True),
+                Section("🔍 26️⃣ Communautés d’acteurs",
+                        lambda page: actor_communities_page(driver, page), show_communities,
+                        inputs=communities_inputs, timeout=300, job=True),
+            ],
+        }
+        view = st.radio("Vue", list(views), horizontal=True, label_visibility="collapsed")
+        render_dashboard(views[view], st)
     except Exception as e:
-        st.error(f"❌ Erreur de connexion à Neo4j : {e}")
\ No newline at end of file
+        st.error(f"❌ Erreur de connexion à Neo4j : {e}")
+
+# Mesures des requêtes (appels réels aux bases, hors cache)
+elif menu == "Performance":
+    st.header("⏱️ Performance des requêtes")
+
+    rows = summary()
+    if rows:
+        st.subheader("Latence par fonction")
+        st.dataframe(rows, use_container_width=True)
+    else:
+        st.info("Aucune requête mesurée pour l'instant : ouvrir les pages MongoDB ou Neo4j.")
+
+    st.subheader("Requêtes lentes")
+    slow = slow_query_log()
+    if slow:
+        st.dataframe(slow, use_container_width=True)
+    else:
+        st.write("Aucune requête au-dessus du seuil.")
+
+    st.subheader("Cache de résultats")
+    cache_stats = query_cache.stats()
+    st.write(f"{cache_stats['entries']}/{cache_stats['max_entries']} entrées — "
+             f"{cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['evictions']} évictions")
@@ -4,7 +4,92 @@ import os
 load_dotenv()  # charge les variables depuis .env
 
 MONGODB_URI = os.getenv("MONGODB_URI")
+MONGODB_DB = os.getenv("MONGODB_DB", "entertainment")
+MONGODB_COLLECTION = os.getenv("MONGODB_COLLECTION", "films")
+
+# Réglages du pool MongoDB (partagé par tout le processus)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000"))
+MONGODB_READ_PREFERENCE = os.getenv("MONGODB_READ_PREFERENCE", "primaryPreferred")
 
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
\ No newline at end of file
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+
+# Réglages du pool Neo4j
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "15"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+
+# Intervalle minimal (secondes) entre deux health checks d'une même connexion
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+
+# Cache des résultats de requêtes (utils/cache.py)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "300"))
+CACHE_PATH = os.getenv("CACHE_PATH")  # ex : .cache/query_cache.pkl (désactivé si vide)
+
+# Exécution concurrente des sections du tableau de bord (utils/dashboard_executor.py)
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "8"))
+SECTION_TIMEOUT = float(os.getenv("SECTION_TIMEOUT", "20"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # traitements longs en écriture (pool séparé)
+
+# Copie locale du graphe acteurs–films (queries/graph_snapshot.py)
+GRAPH_SNAPSHOT = os.getenv("GRAPH_SNAPSHOT", "0") == "1"
+GRAPH_SNAPSHOT_DIR = os.getenv("GRAPH_SNAPSHOT_DIR", ".cache/graph_snapshot")
+GRAPH_SNAPSHOT_BATCH = int(os.getenv("GRAPH_SNAPSHOT_BATCH", "10000"))
+GRAPH_SNAPSHOT_REFRESH = float(os.getenv("GRAPH_SNAPSHOT_REFRESH", "600"))
+
+# Plus courts chemins entre acteurs (queries/path_service.py)
+PATH_MAX_HOPS = int(os.getenv("PATH_MAX_HOPS", "12"))
+PATH_METHOD = os.getenv("PATH_METHOD", "bfs" if GRAPH_SNAPSHOT else "cypher")
+
+# Taille des lots d'écriture des relations INFLUENCE_PAR (queries/director_influence.py)
+INFLUENCE_BATCH_SIZE = int(os.getenv("INFLUENCE_BATCH_SIZE", "1000"))
+
+# Détection de communautés d'acteurs (queries/communities.py)
+COMMUNITY_PROJECTION = os.getenv("COMMUNITY_PROJECTION", "actorGraph")
+COMMUNITY_WRITE_BATCH = int(os.getenv("COMMUNITY_WRITE_BATCH", "1000"))
+COMMUNITY_MAX_ITERATIONS = int(os.getenv("COMMUNITY_MAX_ITERATIONS", "20"))
+COMMUNITY_PAGE_SIZE = int(os.getenv("COMMUNITY_PAGE_SIZE", "20"))
+
+# Projection film–film PARTAGE_ACTEURS (queries/film_projection.py)
+FILM_PROJECTION_BATCH = int(os.getenv("FILM_PROJECTION_BATCH", "200"))
+
+# Recommandations par lots (queries/recommendations.py)
+RECO_COACTOR_WEIGHT = float(os.getenv("RECO_COACTOR_WEIGHT", "0.5"))
+RECO_MAX_CELLS = int(os.getenv("RECO_MAX_CELLS", "16000000"))  # taille max d'un bloc acteurs × films
+
+# Chargement MongoDB -> Neo4j (queries/mongo_to_neo4j.py)
+ETL_BATCH_SIZE = int(os.getenv("ETL_BATCH_SIZE", "500"))
+ETL_WORKERS = int(os.getenv("ETL_WORKERS", "4"))
+
+# Instrumentation des requêtes (utils/instrumentation.py)
+INSTRUMENT_SAMPLE_RATE = float(os.getenv("INSTRUMENT_SAMPLE_RATE", "0.05"))  # part des appels avec explain/PROFILE
+INSTRUMENT_SLOW_MS = float(os.getenv("INSTRUMENT_SLOW_MS", "500"))
+INSTRUMENT_HISTORY = int(os.getenv("INSTRUMENT_HISTORY", "200"))
+INSTRUMENT_METRICS_PORT = int(os.getenv("INSTRUMENT_METRICS_PORT", "0"))  # 0 : pas de serveur /metrics
+
+# Graphiques (utils/visualization.py) : native, vega ou png
+CHART_BACKEND = os.getenv("CHART_BACKEND", "native")
+CHART_CACHE_ENTRIES = int(os.getenv("CHART_CACHE_ENTRIES", "64"))
+CHART_DPI = int(os.getenv("CHART_DPI", "100"))
+
+# Instantané Parquet de entertainment.films (queries/films_snapshot.py)
+MONGO_BACKEND = os.getenv("MONGO_BACKEND", "live")  # live ou snapshot
+FILMS_SNAPSHOT_DIR = os.getenv("FILMS_SNAPSHOT_DIR", ".cache/films_snapshot")
+FILMS_SNAPSHOT_BATCH = int(os.getenv("FILMS_SNAPSHOT_BATCH", "50000"))
+
+# Recherche des noms d'acteurs (queries/actor_lookup.py)
+LOOKUP_BACKEND = os.getenv("LOOKUP_BACKEND", "local")  # local (index en mémoire) ou fulltext (index Neo4j)
+LOOKUP_REFRESH = float(os.getenv("LOOKUP_REFRESH", "300"))
+LOOKUP_SUGGESTIONS = int(os.getenv("LOOKUP_SUGGESTIONS", "8"))
+
+# Pagination et flux de résultats (utils/pagination.py)
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+STREAM_FETCH_SIZE = int(os.getenv("STREAM_FETCH_SIZE", "1000"))  # lignes par lot (Neo4j fetch_size / MongoDB batchSize)
+PAGE_BOOKMARKS = int(os.getenv("PAGE_BOOKMARKS", "1024"))
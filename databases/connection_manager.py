@@ -0,0 +1,175 @@
+import atexit
+import threading
+import time
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from neo4j import GraphDatabase
+from neo4j.exceptions import DriverError, Neo4jError
+
+from config.config import (
+    MONGODB_URI, MONGODB_DB, MONGODB_COLLECTION,
+    MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE, MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    MONGODB_CONNECT_TIMEOUT_MS, MONGODB_SOCKET_TIMEOUT_MS, MONGODB_READ_PREFERENCE,
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
+    NEO4J_MAX_POOL_SIZE, NEO4J_CONNECTION_TIMEOUT, NEO4J_ACQUISITION_TIMEOUT, NEO4J_MAX_CONNECTION_LIFETIME,
+    HEALTH_CHECK_INTERVAL
+)
+from utils.instrumentation import query_listener
+
+
+# Gestionnaire de connexions partagé par tout le processus.
+# Streamlit ré-exécute app.py à chaque interaction mais garde les modules importés :
+# le client MongoDB et le driver Neo4j sont donc créés une seule fois (à la demande)
+# puis réutilisés par toutes les pages et toutes les requêtes.
+class ConnectionManager:
+
+    def __init__(self, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.health_check_interval = health_check_interval
+        self._lock = threading.RLock()
+        self._mongo_client = None
+        self._neo4j_driver = None
+        self._last_mongo_check = 0.0
+        self._last_neo4j_check = 0.0
+
+    # Options du pool MongoDB
+    @staticmethod
+    def mongo_options():
+        return {
+            "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": MONGODB_MIN_POOL_SIZE,
+            "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": MONGODB_SOCKET_TIMEOUT_MS,
+            "readPreference": MONGODB_READ_PREFERENCE,
+            "appname": "movie-analytics-app",
+            "event_listeners": [query_listener],
+        }
+
+    # Options du pool Neo4j
+    @staticmethod
+    def neo4j_options():
+        return {
+            "max_connection_pool_size": NEO4J_MAX_POOL_SIZE,
+            "connection_timeout": NEO4J_CONNECTION_TIMEOUT,
+            "connection_acquisition_timeout": NEO4J_ACQUISITION_TIMEOUT,
+            "max_connection_lifetime": NEO4J_MAX_CONNECTION_LIFETIME,
+        }
+
+    # ---------- MongoDB ----------
+
+    def mongo_client(self):
+        with self._lock:
+            if self._mongo_client is None:
+                self._mongo_client = MongoClient(MONGODB_URI, **self.mongo_options())
+                self._last_mongo_check = time.monotonic()
+            elif self._health_check_due(self._last_mongo_check):
+                if not self._ping_mongo():
+                    self._reconnect_mongo()
+                self._last_mongo_check = time.monotonic()
+            return self._mongo_client
+
+    def films_collection(self):
+        return self.mongo_client()[MONGODB_DB][MONGODB_COLLECTION]
+
+    def _ping_mongo(self):
+        try:
+            self._mongo_client.admin.command("ping")
+            return True
+        except PyMongoError:
+            return False
+
+    def _reconnect_mongo(self):
+        self._close_mongo()
+        self._mongo_client = MongoClient(MONGODB_URI, **self.mongo_options())
+
+    def _close_mongo(self):
+        if self._mongo_client is not None:
+            try:
+                self._mongo_client.close()
+            except PyMongoError:
+                pass
+            self._mongo_client = None
+
+    # ---------- Neo4j ----------
+
+    def neo4j_driver(self):
+        with self._lock:
+            if self._neo4j_driver is None:
+                self._neo4j_driver = GraphDatabase.driver(
+                    NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), **self.neo4j_options()
+                )
+                self._last_neo4j_check = time.monotonic()
+            elif self._health_check_due(self._last_neo4j_check):
+                if not self._ping_neo4j():
+                    self._reconnect_neo4j()
+                self._last_neo4j_check = time.monotonic()
+            return self._neo4j_driver
+
+    def _ping_neo4j(self):
+        try:
+            self._neo4j_driver.verify_connectivity()
+            return True
+        except (DriverError, Neo4jError, OSError):
+            return False
+
+    def _reconnect_neo4j(self):
+        self._close_neo4j()
+        self._neo4j_driver = GraphDatabase.driver(
+            NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD), **self.neo4j_options()
+        )
+
+    def _close_neo4j(self):
+        if self._neo4j_driver is not None:
+            try:
+                self._neo4j_driver.close()
+            except (DriverError, Neo4jError, OSError):
+                pass
+            self._neo4j_driver = None
+
+    # ---------- Commun ----------
+
+    def _health_check_due(self, last_check):
+        return time.monotonic() - last_check >= self.health_check_interval
+
+    # État des deux connexions (sans en créer de nouvelles)
+    def health_check(self):
+        with self._lock:
+            return {
+                "mongodb": self._mongo_client is not None and self._ping_mongo(),
+                "neo4j": self._neo4j_driver is not None and self._ping_neo4j(),
+            }
+
+    # Ferme puis recrée les connexions déjà ouvertes
+    def reconnect(self):
+        with self._lock:
+            if self._mongo_client is not None:
+                self._reconnect_mongo()
+            if self._neo4j_driver is not None:
+                self._reconnect_neo4j()
+
+    def close(self):
+        with self._lock:
+            self._close_mongo()
+            self._close_neo4j()
+
+
+# Instance unique du processus, fermée proprement à l'arrêt de l'interpréteur
+manager = ConnectionManager()
+atexit.register(manager.close)
+
+
+def get_mongo_client():
+    return manager.mongo_client()
+
+
+def get_films_collection():
+    return manager.films_collection()
+
+
+def get_neo4j_driver():
+    return manager.neo4j_driver()
+
+
+def close_connections():
+    manager.close()
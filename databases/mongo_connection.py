@@ -1,10 +1,5 @@
-from pymongo import MongoClient
-from config.config import MONGODB_URI
+from databases.connection_manager import get_films_collection
 
-# Connexion à la BD mongoDB
+# Connexion à la BD mongoDB (client partagé, créé une seule fois par processus)
 def connect_mongodb():
-    client = MongoClient(MONGODB_URI)
-    db = client["entertainment"]
-    collection = db["films"]
-    return collection
-
+    return get_films_collection()
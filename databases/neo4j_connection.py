@@ -1,7 +1,5 @@
-from neo4j import GraphDatabase
-from config.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from databases.connection_manager import get_neo4j_driver
 
-# Connexion à la BD Neo4j
+# Connexion à la BD Neo4j (driver partagé, créé une seule fois par processus)
 def connect_neo4j():
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    return driver
\ No newline at end of file
+    return get_neo4j_driver()
@@ -0,0 +1,264 @@
+import bisect
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+
+import numpy as np
+from neo4j.exceptions import ClientError
+
+from config.config import GRAPH_SNAPSHOT_BATCH, LOOKUP_BACKEND, LOOKUP_REFRESH, LOOKUP_SUGGESTIONS
+from queries.graph_snapshot import name_size
+
+# Résolution des noms d'acteurs saisis dans l'application :
+#   - index en mémoire chargé une fois puis rafraîchi de façon incrémentale :
+#     préfixes (liste triée du nom complet et de chaque mot, parcourue par
+#     dichotomie comme un trie) et trigrammes (recherche approchée, fautes de frappe)
+#   - index plein texte Neo4j (Lucene, préfixe + flou) : LOOKUP_BACKEND=fulltext,
+#     ou en secours quand l'index local ne trouve rien (acteur ajouté depuis le
+#     dernier rafraîchissement)
+#   - les noms sont résolus en elementId : les requêtes en aval partent du nœud
+# Comme graph_snapshot.py, le rafraîchissement transfère les acteurs d'id(a) supérieur
+# au dernier chargé, après contrôle d'une empreinte des acteurs déjà chargés.
+
+FULLTEXT_INDEX = "actor_name_fulltext"  # créé par queries/neo4j_schema.py
+
+ACTORS_QUERY = """
+    MATCH (a:Actor)
+    WHERE id(a) > $after AND a.name IS NOT NULL
+    RETURN id(a) AS node_id, elementId(a) AS id, a.name AS name
+    ORDER BY node_id
+    LIMIT $limit
+"""
+
+# Empreinte des acteurs d'id <= $last (nombre, somme des id, longueurs des noms) :
+# une suppression, un id réutilisé par un nouvel acteur ou un renommage la modifient
+FINGERPRINT_QUERY = """
+    MATCH (a:Actor)
+    WHERE id(a) <= $last AND a.name IS NOT NULL
+    RETURN count(a) AS actors, sum(id(a)) AS ids, sum(size(a.name)) AS names
+"""
+
+EXACT_QUERY = "MATCH (a:Actor {name: $name}) RETURN elementId(a) AS id, a.name AS name"
+
+FULLTEXT_QUERY = """
+    CALL db.index.fulltext.queryNodes($index, $query, {limit: $k})
+    YIELD node, score
+    RETURN elementId(node) AS id, node.name AS name, score
+"""
+
+LUCENE_SPECIAL = set('+-&|!(){}[]^"~*?:\\/')
+
+
+@dataclass(frozen=True)
+class ActorMatch:
+    id: str        # elementId du nœud :Actor
+    name: str
+    score: float = 1.0
+
+
+# Casse, accents et espaces ignorés : "  penélope CRUZ" -> "penelope cruz"
+def normalize(name):
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Requête Lucene : chaque mot en préfixe ou à une faute près. L'analyseur standard
+# met en minuscules sans retirer les accents : ils sont gardés dans la requête.
+def lucene_query(text):
+    terms = ["".join("\\" + c if c in LUCENE_SPECIAL else c for c in word) for word in text.lower().split()]
+    return " AND ".join(f"({t}* OR {t}~1)" if len(t) > 2 else f"{t}*" for t in terms)
+
+
+class NameIndex:
+
+    def __init__(self):
+        self.ids = []                       # position -> elementId
+        self.names = []                     # position -> nom
+        self.positions = {}                 # elementId -> position
+        self.by_key = {}                    # nom normalisé -> positions
+        self.prefixes = []                  # (nom complet ou fin du nom à partir d'un mot, position), trié
+        self.trigrams = defaultdict(list)   # trigramme -> positions
+        self.gram_counts = []               # position -> nombre de trigrammes du nom
+        self._arrays = {}                   # listes de positions en tableaux NumPy (recherche approchée)
+        self._counts = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Un petit lot est inséré à sa place ; un gros lot est trié en une fois
+    def add_many(self, rows):
+        entries = []
+        for element_id, name in rows:
+            if element_id in self.positions or not isinstance(name, str) or not name.strip():
+                continue
+            position = len(self.ids)
+            key = normalize(name)
+            self.ids.append(element_id)
+            self.names.append(name)
+            self.positions[element_id] = position
+            self.by_key.setdefault(key, []).append(position)
+            words = key.split(" ")
+            entries.extend((" ".join(words[i:]), position) for i in range(len(words)))
+            grams = trigrams(key)
+            for gram in grams:
+                self.trigrams[gram].append(position)
+                self._arrays.pop(gram, None)
+            self.gram_counts.append(len(grams))
+        self._counts = None
+
+        if len(entries) > len(self.prefixes) // 10:
+            self.prefixes.extend(entries)
+            self.prefixes.sort()
+        else:
+            for entry in entries:
+                bisect.insort(self.prefixes, entry)
+        return len(entries)
+
+    def _match(self, position, score):
+        return ActorMatch(self.ids[position], self.names[position], score)
+
+    def exact(self, name):
+        return [self._match(p, 1.0) for p in self.by_key.get(normalize(name), [])]
+
+    def prefix(self, text, k):
+        key = normalize(text)
+        if not key:
+            return []
+        found = {}
+        i = bisect.bisect_left(self.prefixes, (key,))
+        while i < len(self.prefixes) and len(found) < k and self.prefixes[i][0].startswith(key):
+            found.setdefault(self.prefixes[i][1], None)
+            i += 1
+        return [self._match(p, 1.0) for p in found]
+
+    def _array(self, gram):
+        if gram not in self._arrays:
+            self._arrays[gram] = np.asarray(self.trigrams[gram], dtype=np.int64)
+        return self._arrays[gram]
+
+    # Similarité de Dice sur les trigrammes : seules les positions présentes dans
+    # une liste de la requête sont notées (np.unique compte les trigrammes communs)
+    def fuzzy(self, text, k, min_score=0.3):
+        grams = trigrams(normalize(text))
+        postings = [self._array(g) for g in grams if g in self.trigrams]
+        if not postings or k <= 0:
+            return []
+        positions, shared = np.unique(np.concatenate(postings), return_counts=True)
+        if self._counts is None:
+            self._counts = np.asarray(self.gram_counts, dtype=np.int64)
+        scores = 2 * shared / (len(grams) + self._counts[positions])
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [self._match(int(positions[i]), round(float(scores[i]), 3)) for i in best if scores[i] >= min_score]
+
+    def search(self, text, k):
+        matches = self.prefix(text, k)
+        if len(matches) < k:
+            seen = {m.id for m in matches}
+            matches += [m for m in self.fuzzy(text, k) if m.id not in seen][:k - len(matches)]
+        return matches
+
+
+class ActorLookup:
+
+    def __init__(self, driver, backend=LOOKUP_BACKEND, max_age=LOOKUP_REFRESH):
+        if backend not in ("local", "fulltext"):
+            raise ValueError(f"méthode inconnue : {backend}")
+        self.driver = driver
+        self.backend = backend
+        self.max_age = max_age
+        self.index = NameIndex()
+        self.last_node_id = -1
+        self.fingerprint = self._empty_fingerprint()  # empreinte des lignes reçues (id <= last_node_id)
+        self.loaded_at = 0.0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _empty_fingerprint():
+        return {"actors": 0, "ids": 0, "names": 0}
+
+    # Seuls les acteurs créés depuis le dernier appel sont transférés ; si les
+    # acteurs déjà chargés ont changé (empreinte différente), l'index est reconstruit.
+    # Un renommage à longueur égale n'est vu qu'au rechargement complet : refresh(full=True)
+    def refresh(self, full=False, batch_size=GRAPH_SNAPSHOT_BATCH):
+        with self._lock:
+            with self.driver.session() as session:
+                if not full and self.last_node_id >= 0:
+                    remote = session.run(FINGERPRINT_QUERY, last=self.last_node_id).single().data()
+                    full = remote != self.fingerprint
+                if full:
+                    self.index, self.last_node_id, self.fingerprint = NameIndex(), -1, self._empty_fingerprint()
+                while True:
+                    records = session.run(ACTORS_QUERY, after=self.last_node_id, limit=batch_size).data()
+                    if not records:
+                        break
+                    self.index.add_many((r["id"], r["name"]) for r in records)
+                    self.last_node_id = records[-1]["node_id"]
+                    self.fingerprint["actors"] += len(records)
+                    self.fingerprint["ids"] += sum(r["node_id"] for r in records)
+                    self.fingerprint["names"] += sum(name_size(r["name"]) for r in records)
+            self.loaded_at = time.time()
+            return self
+
+    def _local(self):
+        if time.time() - self.loaded_at > self.max_age:
+            self.refresh()
+        return self.index
+
+    def _fulltext(self, text, k):
+        query = lucene_query(text)
+        if not query:
+            return []
+        with self.driver.session() as session:
+            records = session.run(FULLTEXT_QUERY, index=FULLTEXT_INDEX, query=query, k=k)
+            return [ActorMatch(r["id"], r["name"], round(r["score"], 3)) for r in records]
+
+    # Propositions pour une saisie partielle ou mal orthographiée
+    def suggest(self, text, k=LOOKUP_SUGGESTIONS):
+        if not text or not text.strip():
+            return []
+        if self.backend == "fulltext":
+            try:
+                return self._fulltext(text, k)
+            except ClientError:
+                pass  # index plein texte absent : index local
+        matches = self._local().search(text, k)
+        if not matches and self.backend == "local":
+            try:
+                return self._fulltext(text, k)
+            except ClientError:
+                return []
+        return matches
+
+    # Nœuds dont le nom correspond exactement (plusieurs en cas d'homonymes)
+    def resolve(self, name):
+        if not name or not name.strip():
+            return []
+        matches = self._local().exact(name) if self.backend == "local" else []
+        if not matches:
+            with self.driver.session() as session:
+                matches = [ActorMatch(r["id"], r["name"]) for r in session.run(EXACT_QUERY, name=name.strip())]
+        return matches
+
+
+# ---------- Instance partagée du processus ----------
+
+_lookup = None
+_lookup_lock = threading.Lock()
+
+
+def get_lookup(driver):
+    global _lookup
+    with _lookup_lock:
+        if _lookup is None:
+            _lookup = ActorLookup(driver)
+        return _lookup
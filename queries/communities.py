@@ -0,0 +1,176 @@
+import argparse
+import time
+
+import numpy as np
+from neo4j.exceptions import ClientError
+
+from config.config import COMMUNITY_PROJECTION, COMMUNITY_WRITE_BATCH, COMMUNITY_MAX_ITERATIONS
+from utils.pagination import cypher_after
+
+# Détection de communautés d'acteurs :
+#   - GDS disponible : projection nommée réutilisée tant que le graphe n'a pas
+#     changé (sinon supprimée puis recréée), Louvain en streaming
+#   - GDS absent (Aura Free) : propagation de labels locale sur la matrice
+#     co-acteurs, construite à partir de la copie CSR chargée par lots
+#   - dans les deux cas, communityId et communitySize sont réécrits sur les nœuds
+#     Actor par lots ; les pages de résultats sont relues depuis le graphe
+# Usage : python -m queries.communities [--local] [--no-write]
+
+EDGE_COUNT_QUERY = "MATCH (:Actor)-[r:A_JOUE]->(:films) RETURN count(r) AS edges"
+
+# Graphe biparti non orienté : les films relient les acteurs entre eux
+PROJECT_QUERY = """
+    CALL gds.graph.project($name, ['Actor', 'films'], {A_JOUE: {orientation: 'UNDIRECTED'}})
+    YIELD relationshipCount
+    RETURN relationshipCount
+"""
+
+LOUVAIN_QUERY = """
+    CALL gds.louvain.stream($name)
+    YIELD nodeId, communityId
+    WITH gds.util.asNode(nodeId) AS node, communityId
+    WHERE node:Actor
+    RETURN elementId(node) AS id, node.name AS acteur, communityId
+"""
+
+# Écriture par elementId : un nœud par ligne (homonymes distincts, pas de parcours du label)
+WRITE_QUERY = """
+    UNWIND $rows AS row
+    MATCH (a) WHERE elementId(a) = row.id
+    SET a.communityId = row.communityId, a.communitySize = row.taille
+"""
+
+# Pagination par clé (communityId, nom, elementId) : index range Actor.communityId
+COMMUNITY_PAGE_QUERY = f"""
+    MATCH (a:Actor)
+    WHERE a.communityId IS NOT NULL AND {cypher_after(["a.communityId", "a.name", "elementId(a)"])}
+    RETURN a.name AS acteur, a.communityId AS communityId, a.communitySize AS taille, elementId(a) AS id
+    ORDER BY communityId, acteur, id
+    LIMIT $limit
+"""
+
+_gds_available = None
+
+
+def gds_available(driver):
+    global _gds_available
+    if _gds_available is None:
+        try:
+            with driver.session() as session:
+                session.run("RETURN gds.version() AS version").consume()
+            _gds_available = True
+        except ClientError:
+            _gds_available = False
+    return _gds_available
+
+
+# Réutilise la projection si elle couvre toutes les relations actuelles
+# (UNDIRECTED : chaque relation est comptée deux fois), sinon la recrée.
+def ensure_projection(driver, name=COMMUNITY_PROJECTION, refresh=False):
+    with driver.session() as session:
+        expected = 2 * session.run(EDGE_COUNT_QUERY).single()["edges"]
+        existing = session.run("""
+            CALL gds.graph.list($name) YIELD relationshipCount
+            RETURN relationshipCount
+        """, name=name).single()
+        if existing is not None and not refresh and existing["relationshipCount"] == expected:
+            return False
+        if existing is not None:
+            session.run("CALL gds.graph.drop($name, false) YIELD graphName RETURN graphName", name=name).consume()
+        session.run(PROJECT_QUERY, name=name).consume()
+        return True
+
+
+def gds_communities(driver, name=COMMUNITY_PROJECTION):
+    ensure_projection(driver, name)
+    ids, names, labels = [], [], []
+    with driver.session() as session:
+        for record in session.run(LOUVAIN_QUERY, name=name):
+            ids.append(record["id"])
+            names.append(record["acteur"])
+            labels.append(record["communityId"])
+    return ids, names, np.asarray(labels, dtype=np.int64)
+
+
+# Propagation de labels pondérée (synchrone, vectorisée) : chaque acteur prend
+# le label le plus lourd parmi ses co-acteurs et lui-même, à égalité le plus petit.
+def label_propagation(n_nodes, sources, targets, weights, max_iterations=COMMUNITY_MAX_ITERATIONS):
+    nodes = np.arange(n_nodes, dtype=np.int64)
+    sources = np.concatenate([sources, nodes])
+    targets = np.concatenate([targets, nodes])
+    weights = np.concatenate([weights, np.ones(n_nodes, dtype=weights.dtype)])
+    labels = nodes.copy()
+
+    for _ in range(max_iterations):
+        keys, inverse = np.unique(sources * n_nodes + labels[targets], return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        owners, candidates = keys // n_nodes, keys % n_nodes
+        order = np.lexsort((candidates, -scores, owners))
+        _, first = np.unique(owners[order], return_index=True)
+        updated = candidates[order][first]
+        if np.array_equal(updated, labels):
+            break
+        labels = updated
+    return labels
+
+
+def local_communities(driver):
+    from queries.graph_snapshot import get_snapshot
+
+    snapshot = get_snapshot(driver)
+    sources, targets, weights = snapshot.co_actor_edges()
+    labels = label_propagation(len(snapshot.actor_names), sources, targets, weights)
+    return list(snapshot.element_ids()[0]), list(snapshot.actor_names), labels
+
+
+# Renumérote les communautés par taille décroissante (0 = la plus grande)
+def rank_communities(ids, names, labels):
+    if len(labels) == 0:
+        return []
+    unique, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(unique), dtype=np.int64)
+    rank[np.lexsort((unique, -sizes))] = np.arange(len(unique))
+    community = rank[inverse]
+    order = sorted(range(len(names)), key=lambda i: (community[i], names[i], ids[i]))
+    return [{"id": ids[i], "acteur": names[i], "communityId": int(community[i]), "taille": int(sizes[inverse[i]])}
+            for i in order]
+
+
+def write_communities(driver, rows, batch_size=COMMUNITY_WRITE_BATCH):
+    with driver.session() as session:
+        for start in range(0, len(rows), batch_size):
+            batch = [{"id": r["id"], "communityId": r["communityId"], "taille": r["taille"]}
+                     for r in rows[start:start + batch_size]]
+            session.execute_write(lambda tx: tx.run(WRITE_QUERY, rows=batch).consume())
+
+
+def detect_communities(driver, use_gds=None, write=True):
+    if use_gds is None:
+        use_gds = gds_available(driver)
+    ids, names, labels = gds_communities(driver) if use_gds else local_communities(driver)
+    rows = rank_communities(ids, names, labels)
+    if write:
+        write_communities(driver, rows)
+    return rows
+
+
+def summarize(rows):
+    return {"total": len(rows), "communities": len({r["communityId"] for r in rows})}
+
+
+if __name__ == "__main__":
+    from databases.neo4j_connection import connect_neo4j
+
+    parser = argparse.ArgumentParser(description="Détecte les communautés d'acteurs (GDS ou calcul local)")
+    parser.add_argument("--local", action="store_true", help="force le calcul local même si GDS est disponible")
+    parser.add_argument("--no-write", action="store_true", help="n'écrit pas communityId dans Neo4j")
+    args = parser.parse_args()
+
+    driver = connect_neo4j()
+    start = time.perf_counter()
+    rows = detect_communities(driver, use_gds=False if args.local else None, write=not args.no_write)
+    summary = summarize(rows)
+    print(f"✅ {summary['total']} acteurs, {summary['communities']} communautés "
+          f"en {time.perf_counter() - start:.1f} s")
+    for r in rows[:10]:
+        print(f"   {r['communityId']:>5}  {r['acteur']} ({r['taille']})")
@@ -0,0 +1,129 @@
+import argparse
+import time
+from datetime import datetime, timezone
+
+from config.config import INFLUENCE_BATCH_SIZE
+from utils.cache import query_cache
+
+# Relations INFLUENCE_PAR entre réalisateurs qui partagent un genre :
+#   - traitement genre par genre (pas de produit cartésien global)
+#   - paires dédupliquées avant le MERGE, écritures en CALL { } IN TRANSACTIONS
+#   - poids optionnel : genres partagés (rel.genres, rel.weight)
+#   - reprenable : les genres terminés sont notés dans un nœud JobState
+#   - mode incrémental : seules les paires impliquant un réalisateur pas encore traité
+# Usage : python -m queries.director_influence [--incremental] [--weighted] [--batch-size 1000]
+
+JOB_NAME = "director_influence"
+
+GENRES_QUERY = """
+    MATCH (g:Genre)
+    RETURN g.name AS genre
+    ORDER BY genre
+"""
+
+# Les paires déjà reliées sont écartées en mode non pondéré : le MERGE ne
+# prend des verrous que pour les arêtes réellement nouvelles.
+PAIRS_QUERY = """
+    MATCH (:Genre {{name: $genre}})<-[:A_GENRE]-(:films)<-[:A_REALISE]-(r:Realisateur)
+    WITH DISTINCT r
+    WITH collect(r) AS directors
+    UNWIND directors AS r1
+    UNWIND directors AS r2
+    WITH r1, r2
+    WHERE r1 <> r2
+      AND (NOT $incremental OR r1.influence_indexed IS NULL OR r2.influence_indexed IS NULL)
+      AND ($weighted OR NOT EXISTS {{ (r1)-[:INFLUENCE_PAR]->(r2) }})
+    CALL {{
+        WITH r1, r2
+        MERGE (r1)-[rel:INFLUENCE_PAR]->(r2)
+        {weight}
+    }} IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+# Idempotent : un genre déjà compté n'est pas ajouté deux fois (reprise sûre)
+WEIGHT_CLAUSE = """
+        SET rel.genres = CASE WHEN $genre IN coalesce(rel.genres, []) THEN rel.genres
+                              ELSE coalesce(rel.genres, []) + $genre END,
+            rel.weight = size(rel.genres)
+"""
+
+MARK_QUERY = """
+    MATCH (r:Realisateur)
+    WHERE r.influence_indexed IS NULL
+    CALL {
+        WITH r
+        SET r.influence_indexed = true
+    } IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+
+def _pairs_query(weighted):
+    return PAIRS_QUERY.format(weight=WEIGHT_CLAUSE if weighted else "")
+
+
+def _load_state(session):
+    record = session.run("""
+        MERGE (s:JobState {name: $name})
+        RETURN s.status AS status, s.mode AS mode, coalesce(s.done_genres, []) AS done_genres
+    """, name=JOB_NAME).single()
+    return record.data()
+
+
+def _save_state(session, **fields):
+    session.run("""
+        MATCH (s:JobState {name: $name})
+        SET s += $fields
+    """, name=JOB_NAME, fields=fields).consume()
+
+
+# CALL { } IN TRANSACTIONS n'est accepté que dans une transaction implicite :
+# d'où session.run (auto-commit) et non execute_write.
+def build_influence_relations(driver, batch_size=INFLUENCE_BATCH_SIZE, weighted=False, incremental=False,
+                              progress=print):
+    mode = ("incremental" if incremental else "full") + ("+weighted" if weighted else "")
+    created = 0
+    start = time.perf_counter()
+
+    with driver.session() as session:
+        state = _load_state(session)
+        resuming = state["status"] == "running" and state["mode"] == mode
+        done = list(state["done_genres"]) if resuming else []
+        if not resuming:
+            _save_state(session, status="running", mode=mode, done_genres=[],
+                        started_at=datetime.now(timezone.utc).isoformat())
+
+        genres = [record["genre"] for record in session.run(GENRES_QUERY)]
+        query = _pairs_query(weighted)
+        for position, genre in enumerate(genres, start=1):
+            if genre in done:
+                continue
+            summary = session.run(query, genre=genre, incremental=incremental, weighted=weighted,
+                                  batch_size=batch_size).consume()
+            created += summary.counters.relationships_created
+            done.append(genre)
+            _save_state(session, done_genres=done)
+
+            if progress:
+                elapsed = time.perf_counter() - start
+                progress(f"{position}/{len(genres)} genres ({genre}) — {created} relations créées en {elapsed:.1f} s")
+
+        # Les réalisateurs présents sont désormais couverts par le mode incrémental
+        session.run(MARK_QUERY, batch_size=batch_size).consume()
+        _save_state(session, status="complete", completed_at=datetime.now(timezone.utc).isoformat())
+
+    query_cache.invalidate("neo4j")
+    return created
+
+
+if __name__ == "__main__":
+    from databases.neo4j_connection import connect_neo4j
+
+    parser = argparse.ArgumentParser(description="Crée les relations INFLUENCE_PAR genre par genre")
+    parser.add_argument("--incremental", action="store_true", help="seulement les nouveaux réalisateurs")
+    parser.add_argument("--weighted", action="store_true", help="poids = nombre de genres partagés")
+    parser.add_argument("--batch-size", type=int, default=INFLUENCE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    total = build_influence_relations(connect_neo4j(), batch_size=args.batch_size,
+                                      weighted=args.weighted, incremental=args.incremental)
+    print(f"✅ {total} relations INFLUENCE_PAR créées")
@@ -0,0 +1,150 @@
+import argparse
+import time
+
+from config.config import FILM_PROJECTION_BATCH
+from utils.cache import query_cache
+
+# Projection film–film matérialisée : (f1)-[:PARTAGE_ACTEURS {weight}]->(f2) dans
+# les deux sens, weight = nombre d'acteurs communs, et f.connexions = nombre de
+# films voisins. Les lectures (film le plus connecté, films proches) deviennent
+# des lectures d'index / de voisinage direct au lieu d'expansions quadratiques.
+# Construction par lots de films non encore traités (f.partage_indexed) :
+# le même job sert à la reprise et à la mise à jour incrémentale. L'ETL
+# (mongo_to_neo4j.py) remet en attente les films qui gagnent un acteur et relance
+# le job après le chargement.
+# Un seul nœud JobState porte l'état de la projection : ready (passage complet
+# terminé, remis à faux par l'ETL) et le nombre de relations A_JOUE au début de
+# ce passage. projection_ready() ne lit que ce nœud et le magasin de comptes.
+# Usage : python -m queries.film_projection [--rebuild] [--batch-size 200]
+
+JOB_NAME = "film_projection"
+
+# Servi par le magasin de comptes (pas de parcours)
+EDGE_COUNT_QUERY = "MATCH ()-[r:A_JOUE]->() RETURN count(r) AS edges"
+
+READY_QUERY = """
+    OPTIONAL MATCH (s:JobState {name: $name})
+    RETURN coalesce(s.ready, false) AS ready, s.edges AS edges
+"""
+
+INVALIDATE_QUERY = "MATCH (s:JobState {name: $name}) SET s.ready = false"
+
+PENDING_QUERY = """
+    MATCH (f:films)
+    WHERE f.partage_indexed IS NULL
+    RETURN elementId(f) AS id
+    LIMIT $batch_size
+"""
+
+# Les voisins d'un nouveau film gagnent une arête : leur degré est recalculé
+BATCH_QUERY = """
+    UNWIND $ids AS id
+    MATCH (f1:films) WHERE elementId(f1) = id
+    CALL {
+        WITH f1
+        OPTIONAL MATCH (f1)<-[:A_JOUE]-(a:Actor)-[:A_JOUE]->(f2:films)
+        WHERE f1 <> f2
+        WITH f1, f2, count(DISTINCT a) AS shared
+        CALL {
+            WITH f1, f2, shared
+            WITH f1, f2, shared WHERE f2 IS NOT NULL
+            MERGE (f1)-[p:PARTAGE_ACTEURS]->(f2) SET p.weight = shared
+            MERGE (f2)-[q:PARTAGE_ACTEURS]->(f1) SET q.weight = shared
+        }
+        RETURN collect(f2) AS neighbours
+    }
+    SET f1.partage_indexed = true, f1.connexions = size(neighbours)
+    WITH neighbours
+    UNWIND neighbours AS f2
+    WITH DISTINCT f2
+    SET f2.connexions = COUNT { (f2)-[:PARTAGE_ACTEURS]->() }
+"""
+
+CLEAR_QUERY = """
+    MATCH (f:films)
+    CALL {
+        WITH f
+        OPTIONAL MATCH (f)-[p:PARTAGE_ACTEURS]->()
+        DELETE p
+        REMOVE f.partage_indexed, f.connexions
+    } IN TRANSACTIONS OF $batch_size ROWS
+"""
+
+
+# Traite tous les films en attente, par lots d'une transaction chacun
+def build_film_projection(driver, batch_size=FILM_PROJECTION_BATCH, rebuild=False, progress=print):
+    processed = 0
+    start = time.perf_counter()
+    with driver.session() as session:
+        # Compté avant le passage : une relation ajoutée pendant le job rend la projection périmée
+        edges = session.run(EDGE_COUNT_QUERY).single()["edges"]
+        if rebuild:
+            session.run("MATCH (s:JobState {name: $name}) DELETE s", name=JOB_NAME).consume()
+            session.run(CLEAR_QUERY, batch_size=batch_size).consume()
+        while True:
+            ids = [record["id"] for record in session.run(PENDING_QUERY, batch_size=batch_size)]
+            if not ids:
+                break
+            session.execute_write(lambda tx: tx.run(BATCH_QUERY, ids=ids).consume())
+            processed += len(ids)
+            if progress:
+                elapsed = time.perf_counter() - start
+                progress(f"{processed} films projetés ({processed / elapsed:.0f} films/s)")
+        session.run("MERGE (s:JobState {name: $name}) SET s.edges = $edges, s.ready = true",
+                    name=JOB_NAME, edges=edges).consume()
+    if processed or rebuild:
+        query_cache.invalidate("neo4j")
+    return processed
+
+
+# Appelé par l'ETL avant d'écrire : les lectures repassent sur la requête directe
+# jusqu'au prochain passage du job
+def invalidate_projection(driver):
+    with driver.session() as session:
+        session.run(INVALIDATE_QUERY, name=JOB_NAME).consume()
+
+
+# Projection complète (dernier passage terminé depuis l'ETL) et à jour (relations
+# A_JOUE inchangées) : un nœud et un compte, en temps constant
+def projection_ready(driver):
+    with driver.session() as session:
+        edges = session.run(EDGE_COUNT_QUERY).single()["edges"]
+        record = session.run(READY_QUERY, name=JOB_NAME).single()
+        return bool(record["ready"]) and record["edges"] == edges
+
+
+# Lecture de l'index films.connexions (ORDER BY ... LIMIT servi par l'index)
+def most_connected_film(driver):
+    with driver.session() as session:
+        result = session.run("""
+            MATCH (f:films)
+            WHERE f.connexions IS NOT NULL
+            RETURN f.title AS film, f.connexions AS connexions
+            ORDER BY f.connexions DESC
+            LIMIT 1
+        """)
+        record = result.single()
+        return record.data() if record is not None else None
+
+
+def similar_films(driver, title, k=5):
+    with driver.session() as session:
+        result = session.run("""
+            MATCH (:films {title: $title})-[p:PARTAGE_ACTEURS]->(g:films)
+            RETURN g.title AS film, p.weight AS acteurs_communs
+            ORDER BY acteurs_communs DESC, film
+            LIMIT $k
+        """, title=title, k=k)
+        return result.data()
+
+
+if __name__ == "__main__":
+    from databases.neo4j_connection import connect_neo4j
+
+    parser = argparse.ArgumentParser(description="Matérialise les relations PARTAGE_ACTEURS entre films")
+    parser.add_argument("--rebuild", action="store_true", help="supprime la projection et la reconstruit")
+    parser.add_argument("--batch-size", type=int, default=FILM_PROJECTION_BATCH)
+    args = parser.parse_args()
+
+    total = build_film_projection(connect_neo4j(), batch_size=args.batch_size, rebuild=args.rebuild)
+    print(f"✅ {total} films projetés")
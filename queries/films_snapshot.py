@@ -0,0 +1,401 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+from pymongo.collection import Collection
+
+from config.config import FILMS_SNAPSHOT_DIR, FILMS_SNAPSHOT_BATCH, PAGE_SIZE
+from queries.mongo_common import RUNTIME, REVENUE
+from queries.mongo_migration import NUMERIC_FIELDS, parse_number, parse_genres
+from queries.mongo_queries import DashboardSnapshot, PAGED_SECTIONS, _most_movies, pearson_from_sums
+from utils.instrumentation import instrumented
+from utils.pagination import list_page
+
+# Instantané colonnaire de entertainment.films pour les analyses hors ligne :
+#   - export par lots vers un jeu Parquet partitionné par décennie (decade=1990/...)
+#   - valeurs typées comme après la migration (parse_number / parse_genres)
+#   - moteur aux mêmes signatures que mongo_queries.py, calculé avec des noyaux
+#     vectorisés Arrow / NumPy sur les fichiers lus en mémoire mappée
+# L'export est écrit dans un dossier temporaire puis échangé : les lecteurs ne
+# voient jamais un instantané partiel.
+# Usage : python -m queries.films_snapshot [--batch-size 50000]
+
+MANIFEST = "_manifest.json"  # préfixe "_" : ignoré par la découverte du jeu Parquet
+
+SCHEMA = pa.schema([
+    ("_id", pa.string()),
+    ("title", pa.string()),
+    ("genre", pa.string()),
+    ("genres", pa.list_(pa.string())),
+    ("Director", pa.string()),
+    ("year", pa.int64()),
+    ("Votes", pa.int64()),
+    (RUNTIME, pa.int64()),
+    ("Metascore", pa.int64()),
+    ("rating", pa.float64()),
+    (REVENUE, pa.float64()),
+    ("decade", pa.int64()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("decade", pa.int64())]), flavor="hive")
+
+PROJECTION = {name: 1 for name in SCHEMA.names if name not in ("_id", "genres", "decade")}
+
+
+# ---------- Export ----------
+
+def _number(doc, name):
+    value = parse_number(doc.get(name), NUMERIC_FIELDS[name])
+    # Colonne entière : une valeur non entière est traitée comme invalide
+    if NUMERIC_FIELDS[name] and not isinstance(value, int):
+        return None
+    return value
+
+
+def _text(value):
+    return value if isinstance(value, str) else None
+
+
+def to_record_batch(docs):
+    columns = {name: [] for name in SCHEMA.names}
+    for doc in docs:
+        columns["_id"].append(str(doc["_id"]) if "_id" in doc else None)
+        columns["title"].append(_text(doc.get("title")))
+        columns["genre"].append(_text(doc.get("genre")))
+        columns["genres"].append(parse_genres(doc.get("genre")))
+        columns["Director"].append(_text(doc.get("Director")))
+        for name in ("year", "Votes", RUNTIME, "Metascore", "rating", REVENUE):
+            columns[name].append(_number(doc, name))
+        year = columns["year"][-1]
+        columns["decade"].append(year // 10 * 10 if year is not None else None)
+    return pa.RecordBatch.from_pydict(columns, schema=SCHEMA)
+
+
+def _batches(docs, batch_size):
+    buffer = []
+    for doc in docs:
+        buffer.append(doc)
+        if len(buffer) == batch_size:
+            yield to_record_batch(buffer)
+            buffer = []
+    if buffer:
+        yield to_record_batch(buffer)
+
+
+def write_snapshot(docs, directory=FILMS_SNAPSHOT_DIR, batch_size=FILMS_SNAPSHOT_BATCH, source=None):
+    start = time.perf_counter()
+    tmp = directory.rstrip("/") + ".tmp"
+    old = directory.rstrip("/") + ".old"
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for batch in _batches(docs, batch_size):
+            rows += batch.num_rows
+            yield batch
+
+    ds.write_dataset(counted(), tmp, schema=SCHEMA, format="parquet", partitioning=PARTITIONING,
+                     existing_data_behavior="overwrite_or_ignore")
+    os.makedirs(tmp, exist_ok=True)
+    with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"exported_at": datetime.now(timezone.utc).isoformat(), "rows": rows, "source": source}, f)
+
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, old)
+    os.rename(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+    return {"rows": rows, "seconds": time.perf_counter() - start}
+
+
+def export_snapshot(collection: Collection, directory=FILMS_SNAPSHOT_DIR, batch_size=FILMS_SNAPSHOT_BATCH):
+    cursor = collection.find({}, PROJECTION, batch_size=batch_size)
+    source = f"{collection.database.name}.{collection.name}"
+    return write_snapshot(cursor, directory, batch_size, source)
+
+
+# ---------- Noyaux vectorisés (mêmes résultats que les sections de mongo_queries.py) ----------
+
+def _column(table, name):
+    return table.column(name).combine_chunks()
+
+
+def _rows(table, names):
+    return [dict(zip(names, values)) for values in zip(*(table.column(n).to_pylist() for n in names))]
+
+
+def _group_counts(table, key):
+    counts = table.group_by(key).aggregate([([], "count_all")])
+    return counts.rename_columns([key, "count"])
+
+
+def _year_counts(table):
+    counts = _group_counts(table, "year").sort_by([("year", "ascending")], null_placement="at_start")
+    return [{"_id": y, "count": c} for y, c in zip(counts["year"].to_pylist(), counts["count"].to_pylist())]
+
+
+def _movies_after_1999(table):
+    return pc.sum(pc.cast(pc.greater(_column(table, "year"), 1999), pa.int64())).as_py() or 0
+
+
+def _avg_votes_2007(table):
+    votes = pc.filter(_column(table, "Votes"), pc.equal(_column(table, "year"), 2007))
+    return pc.mean(votes).as_py()
+
+
+def _distinct_genres(table):
+    return sorted(pc.unique(pc.list_flatten(_column(table, "genres"))).to_pylist())
+
+
+def _highest_revenue_film(table):
+    revenue = _column(table, REVENUE)
+    if revenue.null_count == len(revenue):
+        return None
+    best = pc.index(revenue, pc.max(revenue)).as_py()
+    row = table.slice(best, 1).drop_columns(["genres", "decade"]).to_pylist()[0]
+    return row
+
+
+def _directors_more_than_5(table):
+    counts = _group_counts(table, "Director").filter((pc.field("count") > 5) & pc.field("Director").is_valid())
+    counts = counts.sort_by([("count", "descending"), ("Director", "ascending")])
+    return [{"_id": d, "count": c} for d, c in zip(counts["Director"].to_pylist(), counts["count"].to_pylist())]
+
+
+# Un élément par (film, genre) : équivalent de $unwind sur le tableau des genres
+def _explode_genres(table, names):
+    genres = _column(table, "genres")
+    parents = pc.list_parent_indices(genres)
+    columns = {"genre_item": pc.list_flatten(genres)}
+    for name in names:
+        columns[name] = pc.take(_column(table, name), parents)
+    return pa.table(columns)
+
+
+def _genre_avg_revenue(table):
+    exploded = _explode_genres(table, [REVENUE]).filter(pc.is_valid(pc.field(REVENUE)))
+    means = exploded.group_by("genre_item").aggregate([(REVENUE, "mean")])
+    rows = [{"genre": g, "avg": a} for g, a in zip(means["genre_item"].to_pylist(), means[f"{REVENUE}_mean"].to_pylist())]
+    return sorted(rows, key=lambda x: x["avg"], reverse=True)
+
+
+# Rang de chaque ligne dans son groupe (clés déjà triées) : 0 pour la première
+def _rank_in_group(sorted_keys):
+    positions = np.arange(len(sorted_keys))
+    starts = np.zeros(len(sorted_keys), dtype=np.int64)
+    if len(sorted_keys):
+        changes = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+        starts[changes] = changes
+        np.maximum.accumulate(starts, out=starts)
+    return positions - starts
+
+
+def _top_k_by_group(table, key, sort_field, k):
+    valid = table.filter(pc.is_valid(pc.field(key)) & pc.is_valid(pc.field(sort_field)))
+    ordered = valid.take(pc.sort_indices(valid, [(key, "ascending"), (sort_field, "descending")]))
+    keys = _column(ordered, key).to_numpy(zero_copy_only=False)
+    return ordered.filter(pa.array(_rank_in_group(keys) < k))
+
+
+def _top_3_by_decade(table):
+    top = _top_k_by_group(table, "decade", "rating", 3)
+    top_by_decade = {}
+    for film in _rows(top, ["_id", "title", "rating", "year", "decade"]):
+        top_by_decade.setdefault(film["decade"], []).append(film)
+    return top_by_decade
+
+
+def _longest_by_genre(table):
+    # Ligne complète, comme le document entier renvoyé par mongo_queries
+    names = [name for name in table.column_names if name != "genres"]
+    top = _top_k_by_group(_explode_genres(table, names), "genre_item", RUNTIME, 1)
+    return {film.pop("genre_item"): film for film in _rows(top, ["genre_item", *names])}
+
+
+def _high_score_high_revenue(table):
+    mask = (pc.field("Metascore") > 80) & (pc.field(REVENUE) > 50)
+    return _rows(table.filter(mask), ["_id", "title", "Metascore", REVENUE])
+
+
+# Sommes du coefficient de Pearson en produits scalaires NumPy (aucune boucle Python)
+def _correlation_sums(table):
+    pairs = table.select([RUNTIME, REVENUE]).drop_null()
+    x = _column(pairs, RUNTIME).to_numpy(zero_copy_only=False).astype(np.float64)
+    y = _column(pairs, REVENUE).to_numpy(zero_copy_only=False)
+    return {
+        "n": len(x),
+        "sx": float(x.sum()),
+        "sy": float(y.sum()),
+        "sxx": float(x @ x),
+        "syy": float(y @ y),
+        "sxy": float(x @ y),
+    }
+
+
+def _runtime_by_decade(table):
+    means = table.group_by("decade").aggregate([(RUNTIME, "mean")])
+    means = means.sort_by([("decade", "ascending")], null_placement="at_start")
+    return [{"_id": d, "avg_runtime": a} for d, a in zip(means["decade"].to_pylist(), means[f"{RUNTIME}_mean"].to_pylist())]
+
+
+KERNELS = {
+    "year_counts": _year_counts,
+    "movies_after_1999": _movies_after_1999,
+    "avg_votes_2007": _avg_votes_2007,
+    "distinct_genres": _distinct_genres,
+    "highest_revenue_film": _highest_revenue_film,
+    "directors_more_than_5": _directors_more_than_5,
+    "genre_avg_revenue": _genre_avg_revenue,
+    "top_3_by_decade": _top_3_by_decade,
+    "longest_by_genre": _longest_by_genre,
+    "high_score_high_revenue": _high_score_high_revenue,
+    "correlation_sums": _correlation_sums,
+    "runtime_by_decade": _runtime_by_decade,
+}
+
+
+# ---------- Lecture (fichiers en mémoire mappée) ----------
+
+class FilmsSnapshot:
+
+    def __init__(self, table, manifest):
+        self.table = table
+        self.manifest = manifest
+
+    @classmethod
+    def open(cls, directory=FILMS_SNAPSHOT_DIR):
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Schéma explicite : une collection vide n'écrit que le manifeste
+        dataset = ds.dataset(directory, schema=SCHEMA, format="parquet", partitioning=PARTITIONING,
+                             filesystem=fs.LocalFileSystem(use_mmap=True))
+        table = dataset.to_table().select(SCHEMA.names).combine_chunks()
+        return cls(table, manifest)
+
+    @property
+    def exported_at(self):
+        return self.manifest["exported_at"]
+
+    def section(self, name):
+        return KERNELS[name](self.table)
+
+    def dashboard(self):
+        return DashboardSnapshot(**{name: kernel(self.table) for name, kernel in KERNELS.items()
+                                    if name not in PAGED_SECTIONS})
+
+
+# ---------- Instance partagée du processus ----------
+
+_snapshot = None
+_snapshot_mtime = None
+_snapshot_lock = threading.Lock()
+
+
+def snapshot_exists(directory=FILMS_SNAPSHOT_DIR):
+    return os.path.exists(os.path.join(directory, MANIFEST))
+
+
+# Exporte à la première utilisation ; relit les fichiers après un nouvel export
+def get_snapshot(collection: Collection):
+    global _snapshot, _snapshot_mtime
+    with _snapshot_lock:
+        if not snapshot_exists():
+            export_snapshot(collection)
+        mtime = os.path.getmtime(os.path.join(FILMS_SNAPSHOT_DIR, MANIFEST))
+        if _snapshot is None or mtime != _snapshot_mtime:
+            _snapshot = FilmsSnapshot.open(FILMS_SNAPSHOT_DIR)
+            _snapshot_mtime = mtime
+        return _snapshot
+
+
+@instrumented("snapshot")
+def dashboard_snapshot(collection: Collection):
+    return get_snapshot(collection).dashboard()
+
+
+# 1. Année avec le plus grand nombre de films
+@instrumented("snapshot")
+def year_with_most_movies(collection: Collection):
+    return _most_movies(get_snapshot(collection).section("year_counts"))
+
+# 2. Nombre de films après 1999
+@instrumented("snapshot")
+def movies_after_1999(collection: Collection):
+    return get_snapshot(collection).section("movies_after_1999")
+
+# 3. Moyenne des votes pour les films sortis en 2007
+@instrumented("snapshot")
+def avg_votes_2007(collection: Collection):
+    return get_snapshot(collection).section("avg_votes_2007")
+
+# 4. Histogramme : Nombre de films par année
+@instrumented("snapshot")
+def films_per_year(collection: Collection):
+    return get_snapshot(collection).section("year_counts")
+
+# 5. Genres de films disponibles
+@instrumented("snapshot")
+def distinct_genres(collection: Collection):
+    return get_snapshot(collection).section("distinct_genres")
+
+# 6. Film ayant généré le plus de revenu
+@instrumented("snapshot")
+def highest_revenue_film(collection: Collection):
+    return get_snapshot(collection).section("highest_revenue_film")
+
+# 7. Réalisateurs ayant fait plus de 5 films (par pages)
+@instrumented("snapshot")
+def directors_with_more_than_5_films(collection: Collection, page=1, page_size=PAGE_SIZE):
+    return list_page(get_snapshot(collection).section("directors_more_than_5"), page, page_size)
+
+# 8. Genre rapportant en moyenne le plus de revenus
+@instrumented("snapshot")
+def top_genre_by_avg_revenue(collection: Collection):
+    return get_snapshot(collection).section("genre_avg_revenue")
+
+# 9. Top 3 films les mieux notés par décennie
+@instrumented("snapshot")
+def top_3_rated_by_decade(collection: Collection):
+    return get_snapshot(collection).section("top_3_by_decade")
+
+# 10. Film le plus long par genre
+@instrumented("snapshot")
+def longest_film_by_genre(collection: Collection):
+    return get_snapshot(collection).section("longest_by_genre")
+
+# 11. Films notés > 80 et revenus > 50 millions
+@instrumented("snapshot")
+def high_score_high_revenue(collection: Collection):
+    return get_snapshot(collection).section("high_score_high_revenue")
+
+# 12. Corrélation entre runtime et revenu
+@instrumented("snapshot")
+def correlation_runtime_revenue(collection: Collection):
+    return pearson_from_sums(get_snapshot(collection).section("correlation_sums"))
+
+# 13. Évolution de la durée moyenne des films par décennie
+@instrumented("snapshot")
+def avg_runtime_by_decade(collection: Collection):
+    return get_snapshot(collection).section("runtime_by_decade")
+
+
+if __name__ == "__main__":
+    from databases.mongo_connection import connect_mongodb
+
+    parser = argparse.ArgumentParser(description="Export Parquet partitionné de la collection films")
+    parser.add_argument("--batch-size", type=int, default=FILMS_SNAPSHOT_BATCH)
+    args = parser.parse_args()
+
+    stats = export_snapshot(connect_mongodb(), batch_size=args.batch_size)
+    print(f"✅ {stats['rows']} films exportés en {stats['seconds']:.1f} s -> {FILMS_SNAPSHOT_DIR}")
@@ -0,0 +1,421 @@
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from bson import Timestamp
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from queries.mongo_common import RUNTIME, REVENUE, as_double, decade_expr, unwind_genres
+from queries.mongo_migration import parse_number, parse_genres
+from utils.cache import cached
+
+# Collection de synthèse films_stats, tenue à jour en continu :
+#   {"_id": {"kind": "year", "key": 2007}}      count, votes_sum, votes_count
+#   {"_id": {"kind": "decade", "key": 2000}}    count, runtime_sum, runtime_count
+#   {"_id": {"kind": "genre", "key": "Drama"}}  revenue_sum, revenue_count
+#   {"_id": {"kind": "correlation", "key": None}} n, sx, sy, sxx, syy, sxy
+#   {"_id": {"kind": "meta", "key": None}}      status, heartbeat, resume_token
+# Une reconstruction complète (lue à un instant T, collection intermédiaire échangée
+# d'un coup avec renameCollection) puis des incréments issus des change streams
+# à partir de T : aucune écriture n'est perdue ni comptée deux fois.
+# Nécessite un replica set (les change streams n'existent pas sur un mongod seul).
+# Usage : python -m queries.films_stats
+
+STATS_COLLECTION = "films_stats"
+STAGING_COLLECTION = "films_stats_staging"
+META_ID = {"kind": "meta", "key": None}
+STAT_KINDS = ["year", "decade", "genre", "correlation"]
+
+# Au-delà de ce délai sans heartbeat du mainteneur, les lecteurs repassent sur films
+STALE_AFTER = 120
+HEARTBEAT_INTERVAL = 30
+# Délai minimal entre deux reconstructions complètes déclenchées par le mainteneur
+MIN_REBUILD_INTERVAL = 300
+# Une lecture de la synthèse sert toutes les sections d'un même affichage
+READ_CACHE_TTL = 10
+
+
+def stats_collection(collection: Collection):
+    return collection.database[STATS_COLLECTION]
+
+
+# ---------- Reconstruction complète ----------
+
+def _year_stats_pipeline():
+    return [
+        {"$group": {
+            "_id": {"kind": "year", "key": {"$ifNull": ["$year", None]}},
+            "count": {"$sum": 1},
+            "votes_sum": {"$sum": "$Votes"},
+            "votes_count": {"$sum": {"$cond": [{"$isNumber": "$Votes"}, 1, 0]}}
+        }}
+    ]
+
+
+def _decade_stats_pipeline():
+    return [
+        {"$group": {
+            "_id": {"kind": "decade", "key": {"$ifNull": [decade_expr(), None]}},
+            "count": {"$sum": 1},
+            "runtime_sum": {"$sum": "$" + RUNTIME},
+            "runtime_count": {"$sum": {"$cond": [{"$isNumber": "$" + RUNTIME}, 1, 0]}}
+        }}
+    ]
+
+
+def _genre_stats_pipeline():
+    return [
+        {"$match": {REVENUE: {"$exists": True}, "genre": {"$type": "string", "$ne": ""}}},
+        {"$project": {"genre": 1, "revenue": as_double(REVENUE)}},
+        {"$match": {"revenue": {"$ne": None}}},
+        *unwind_genres(),
+        {"$group": {
+            "_id": {"kind": "genre", "key": "$genre_item"},
+            "revenue_sum": {"$sum": "$revenue"},
+            "revenue_count": {"$sum": 1}
+        }}
+    ]
+
+
+def _correlation_stats_pipeline():
+    return [
+        {"$match": {RUNTIME: {"$exists": True}, REVENUE: {"$exists": True}}},
+        {"$project": {"x": as_double(RUNTIME), "y": as_double(REVENUE)}},
+        {"$match": {"x": {"$ne": None}, "y": {"$ne": None}}},
+        {"$group": {
+            "_id": {"kind": "correlation", "key": None},
+            "n": {"$sum": 1},
+            "sx": {"$sum": "$x"},
+            "sy": {"$sum": "$y"},
+            "sxx": {"$sum": {"$multiply": ["$x", "$x"]}},
+            "syy": {"$sum": {"$multiply": ["$y", "$y"]}},
+            "sxy": {"$sum": {"$multiply": ["$x", "$y"]}}
+        }}
+    ]
+
+
+# Instant de lecture commun aux pipelines de reconstruction (dernière écriture appliquée)
+def current_operation_time(collection: Collection):
+    with collection.database.client.start_session() as session:
+        collection.find_one({}, {"_id": 1}, session=session)
+        return session.operation_time
+
+
+# Groupes d'un pipeline lus à l'instant at (lecture "snapshot") ; un seul document
+# revient, les groupes sont peu nombreux
+def _groups_at(collection: Collection, pipeline, at):
+    command = {
+        "aggregate": collection.name,
+        "pipeline": [*pipeline, {"$group": {"_id": None, "rows": {"$push": "$$ROOT"}}}],
+        "cursor": {},
+        "readConcern": {"level": "snapshot", "atClusterTime": at},
+    }
+    batch = collection.database.command(command)["cursor"]["firstBatch"]
+    return batch[0]["rows"] if batch else []
+
+
+# Les quatre pipelines lisent la collection au même instant at et remplissent une
+# collection intermédiaire, échangée ensuite avec films_stats en une opération :
+# les lecteurs ne voient jamais un mélange d'ancienne et de nouvelle synthèse (ni
+# les groupes disparus depuis). Les écritures postérieures à at sont rejouées
+# par le change stream (voir FilmsStatsMaintainer.rebuild).
+# La lecture doit tenir dans la fenêtre d'historique du serveur
+# (minSnapshotHistoryWindowInSeconds, 300 s par défaut).
+def rebuild_stats(collection: Collection, at=None):
+    at = at or current_operation_time(collection)
+    build_id = uuid.uuid4().hex
+    database = collection.database
+    rows = []
+    for pipeline in (_year_stats_pipeline, _decade_stats_pipeline, _genre_stats_pipeline, _correlation_stats_pipeline):
+        rows += [dict(row, build=build_id) for row in _groups_at(collection, pipeline(), at)]
+
+    now = datetime.now(timezone.utc)
+    rows.append({"_id": META_ID, "status": "ready", "build": build_id, "built_at": now, "heartbeat": now})
+    database.drop_collection(STAGING_COLLECTION)
+    database[STAGING_COLLECTION].insert_many(rows)
+    database.client.admin.command(
+        "renameCollection", f"{database.name}.{STAGING_COLLECTION}",
+        to=f"{database.name}.{STATS_COLLECTION}", dropTarget=True
+    )
+    return at
+
+
+# ---------- Incréments ----------
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _decade_of(year):
+    if not _is_number(year):
+        return None
+    return int(math.floor(year / 10) * 10)
+
+
+# Contribution d'un film aux compteurs (mêmes règles que les pipelines de reconstruction)
+def contributions(doc, sign=1):
+    deltas = {}
+
+    year = doc.get("year")
+    year_delta = deltas.setdefault(("year", year), {"count": 0})
+    year_delta["count"] += sign
+    if _is_number(doc.get("Votes")):
+        year_delta["votes_sum"] = year_delta.get("votes_sum", 0) + sign * doc["Votes"]
+        year_delta["votes_count"] = year_delta.get("votes_count", 0) + sign
+
+    decade_delta = deltas.setdefault(("decade", _decade_of(year)), {"count": 0})
+    decade_delta["count"] += sign
+    if _is_number(doc.get(RUNTIME)):
+        decade_delta["runtime_sum"] = decade_delta.get("runtime_sum", 0) + sign * doc[RUNTIME]
+        decade_delta["runtime_count"] = decade_delta.get("runtime_count", 0) + sign
+
+    revenue = parse_number(doc.get(REVENUE)) if REVENUE in doc else None
+    if revenue is not None:
+        for genre in parse_genres(doc.get("genre")):
+            genre_delta = deltas.setdefault(("genre", genre), {"revenue_sum": 0.0, "revenue_count": 0})
+            genre_delta["revenue_sum"] += sign * revenue
+            genre_delta["revenue_count"] += sign
+
+    runtime = parse_number(doc.get(RUNTIME)) if RUNTIME in doc else None
+    if runtime is not None and revenue is not None:
+        deltas[("correlation", None)] = {
+            "n": sign,
+            "sx": sign * runtime,
+            "sy": sign * revenue,
+            "sxx": sign * runtime * runtime,
+            "syy": sign * revenue * revenue,
+            "sxy": sign * runtime * revenue,
+        }
+    return deltas
+
+
+def apply_deltas(collection: Collection, deltas):
+    operations = []
+    for (kind, key), fields in deltas.items():
+        changed = {name: value for name, value in fields.items() if value}
+        if changed:
+            operations.append(UpdateOne({"_id": {"kind": kind, "key": key}}, {"$inc": changed}, upsert=True))
+    if operations:
+        stats_collection(collection).bulk_write(operations, ordered=False)
+
+
+def _merge_deltas(target, source):
+    for group, fields in source.items():
+        merged = target.setdefault(group, {})
+        for name, value in fields.items():
+            merged[name] = merged.get(name, 0) + value
+    return target
+
+
+# Deltas d'un évènement de change stream ; None si l'image "avant" manque
+def event_deltas(change):
+    operation = change["operationType"]
+    before = change.get("fullDocumentBeforeChange")
+    after = change.get("fullDocument")
+
+    if operation == "insert":
+        return contributions(after)
+    if operation == "delete":
+        return contributions(before, sign=-1) if before else None
+    if operation in ("update", "replace"):
+        if before is None or after is None:
+            return None
+        return _merge_deltas(contributions(before, sign=-1), contributions(after))
+    return {}
+
+
+# ---------- Lecture ----------
+
+def _group_sort_key(row):
+    key = row["_id"]
+    return (key is not None, key)
+
+
+# Toutes les sections calculables depuis films_stats, en O(groupes) ;
+# None si la synthèse est absente ou si le mainteneur ne tourne plus.
+# Gardé quelques secondes en cache : les sections d'un affichage lisent une seule fois.
+@cached(ttl=READ_CACHE_TTL, tags=("mongo",))
+def read_stats(collection: Collection, stale_after=STALE_AFTER):
+    docs = list(stats_collection(collection).find({}))
+    meta = next((d for d in docs if d["_id"] == META_ID), None)
+    if not meta or meta.get("status") != "ready":
+        return None
+    heartbeat = meta.get("heartbeat")
+    if heartbeat is None:
+        return None
+    if heartbeat.tzinfo is None:
+        heartbeat = heartbeat.replace(tzinfo=timezone.utc)
+    if (datetime.now(timezone.utc) - heartbeat).total_seconds() > stale_after:
+        return None
+
+    by_kind = {kind: [] for kind in STAT_KINDS}
+    for doc in docs:
+        kind = doc["_id"].get("kind")
+        if kind in by_kind:
+            by_kind[kind].append(doc)
+
+    years = [d for d in by_kind["year"] if d.get("count", 0) > 0]
+    year_counts = sorted(({"_id": d["_id"]["key"], "count": d["count"]} for d in years), key=_group_sort_key)
+
+    votes_2007 = next((d for d in years if d["_id"]["key"] == 2007), None)
+    avg_votes_2007 = None
+    if votes_2007 and votes_2007.get("votes_count", 0) > 0:
+        avg_votes_2007 = votes_2007["votes_sum"] / votes_2007["votes_count"]
+
+    movies_after_1999 = sum(
+        d["count"] for d in years if _is_number(d["_id"]["key"]) and d["_id"]["key"] > 1999
+    )
+
+    genre_avg_revenue = sorted(
+        ({"genre": d["_id"]["key"], "avg": d["revenue_sum"] / d["revenue_count"]}
+         for d in by_kind["genre"] if d.get("revenue_count", 0) > 0),
+        key=lambda x: x["avg"], reverse=True
+    )
+
+    runtime_by_decade = sorted(
+        ({"_id": d["_id"]["key"],
+          "avg_runtime": d["runtime_sum"] / d["runtime_count"] if d.get("runtime_count", 0) > 0 else None}
+         for d in by_kind["decade"] if d.get("count", 0) > 0),
+        key=_group_sort_key
+    )
+
+    correlation = next(iter(by_kind["correlation"]), None)
+    correlation_sums = {name: correlation.get(name, 0) for name in ("n", "sx", "sy", "sxx", "syy", "sxy")} \
+        if correlation else {"n": 0, "sx": 0.0, "sy": 0.0, "sxx": 0.0, "syy": 0.0, "sxy": 0.0}
+
+    return {
+        "year_counts": year_counts,
+        "movies_after_1999": movies_after_1999,
+        "avg_votes_2007": avg_votes_2007,
+        "genre_avg_revenue": genre_avg_revenue,
+        "runtime_by_decade": runtime_by_decade,
+        "correlation_sums": correlation_sums,
+    }
+
+
+# ---------- Mainteneur en arrière-plan ----------
+
+class FilmsStatsMaintainer:
+
+    def __init__(self, collection: Collection, heartbeat_interval=HEARTBEAT_INTERVAL,
+                 min_rebuild_interval=MIN_REBUILD_INTERVAL):
+        self.collection = collection
+        self.stats = stats_collection(collection)
+        self.heartbeat_interval = heartbeat_interval
+        self.min_rebuild_interval = min_rebuild_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_rebuild = 0.0
+        self._needs_rebuild = False
+
+    # Images "avant" pour décrémenter correctement les updates / deletes (MongoDB 6.0+)
+    def enable_pre_images(self):
+        try:
+            self.collection.database.command(
+                "collMod", self.collection.name, changeStreamPreAndPostImages={"enabled": True}
+            )
+            return True
+        except OperationFailure:
+            return False
+
+    # Renvoie l'instant à partir duquel reprendre le flux : juste après la lecture
+    # de la reconstruction, les deltas s'appliquent sur la collection échangée
+    def rebuild(self):
+        at = rebuild_stats(self.collection)
+        self._last_rebuild = time.monotonic()
+        self._needs_rebuild = False
+        return Timestamp(at.time, at.inc + 1)
+
+    def _meta(self):
+        return self.stats.find_one({"_id": META_ID}) or {}
+
+    def _save_progress(self, resume_token):
+        self.stats.update_one(
+            {"_id": META_ID},
+            {"$set": {"resume_token": resume_token, "heartbeat": datetime.now(timezone.utc)}}
+        )
+
+    def _watch(self, resume_token=None, start_at=None):
+        options = {
+            # Images exactes avant / après chaque modification (voir enable_pre_images)
+            "full_document": "whenAvailable",
+            "full_document_before_change": "whenAvailable",
+            "max_await_time_ms": 1000,
+        }
+        if resume_token:
+            options["resume_after"] = resume_token
+        elif start_at:
+            options["start_at_operation_time"] = start_at
+        return self.collection.watch(**options)
+
+    def run(self):
+        self.enable_pre_images()
+        meta = self._meta()
+        resume_token = meta.get("resume_token") if meta.get("status") == "ready" else None
+        start_at = None
+        if resume_token is None:
+            start_at = self.rebuild()
+
+        while not self._stop.is_set():
+            try:
+                with self._watch(resume_token, start_at) as stream:
+                    rebuilt_at = self._consume(stream)
+                    resume_token = stream.resume_token
+                if rebuilt_at is not None:
+                    # Nouveau flux à partir de l'instant lu par la reconstruction : les
+                    # écritures faites pendant celle-ci sont rejouées une seule fois
+                    resume_token, start_at = None, rebuilt_at
+            except OperationFailure:
+                # Jeton de reprise expiré (oplog tourné) : on repart d'une reconstruction
+                resume_token = None
+                start_at = self.rebuild()
+            except PyMongoError:
+                if self._stop.wait(5):
+                    return
+
+    # Renvoie l'instant de reprise d'une reconstruction faite en cours de flux (le
+    # flux est alors abandonné), None si le flux s'est arrêté
+    def _consume(self, stream):
+        last_heartbeat = time.monotonic()
+        while not self._stop.is_set() and stream.alive:
+            change = stream.try_next()
+            if change is not None:
+                deltas = event_deltas(change)
+                if deltas is None:
+                    self._needs_rebuild = True
+                else:
+                    apply_deltas(self.collection, deltas)
+
+            now = time.monotonic()
+            if self._needs_rebuild and now - self._last_rebuild >= self.min_rebuild_interval:
+                return self.rebuild()
+            if change is not None or now - last_heartbeat >= self.heartbeat_interval:
+                self._save_progress(stream.resume_token)
+                last_heartbeat = now
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="films-stats", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+if __name__ == "__main__":
+    from databases.mongo_connection import connect_mongodb
+
+    maintainer = FilmsStatsMaintainer(connect_mongodb())
+    print("Synthèse films_stats : reconstruction puis suivi des changements (Ctrl+C pour arrêter)")
+    try:
+        maintainer.run()
+    except KeyboardInterrupt:
+        maintainer.stop()
@@ -0,0 +1,440 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from config.config import GRAPH_SNAPSHOT_DIR, GRAPH_SNAPSHOT_BATCH, GRAPH_SNAPSHOT_REFRESH, PATH_MAX_HOPS, PAGE_SIZE
+from utils.pagination import list_page
+
+# Copie locale du graphe biparti (:Actor)-[:A_JOUE]->(:films) en tableaux CSR NumPy.
+# Les requêtes de parcours (degré, co-acteurs, film le plus connecté, plus court
+# chemin) sont calculées en mémoire au lieu d'un aller-retour Aura chacune.
+# Les fonctions de module ont la même signature que celles de neo4j_queries.py.
+# Le rafraîchissement incrémental transfère les arêtes d'id(r) supérieur au dernier
+# copié (déprécié en Neo4j 5 mais toujours disponible, elementId() n'étant pas
+# ordonné). Neo4j réutilise les id supprimés : les arêtes déjà copiées sont donc
+# contrôlées par une empreinte (voir FINGERPRINT_QUERY) avant chaque rafraîchissement.
+
+EDGES_QUERY = """
+    MATCH (a:Actor)-[r:A_JOUE]->(f:films)
+    WHERE id(r) > $after
+    RETURN id(r) AS rel_id, id(a) AS actor_node, elementId(a) AS actor_id, a.name AS actor_name,
+           id(f) AS film_node, elementId(f) AS film_id, f.title AS film_title
+"""
+
+# Empreinte des arêtes d'id <= $last : nombre, sommes des id (relation, extrémités)
+# et des longueurs de noms. Une suppression, un id réutilisé par une nouvelle arête
+# ou un renommage la modifient : la copie est alors rechargée entièrement.
+# (Un renommage à longueur égale n'est vu qu'au rechargement complet : refresh(full=True).)
+FINGERPRINT_QUERY = """
+    MATCH (a:Actor)-[r:A_JOUE]->(f:films)
+    WHERE id(r) <= $last
+    RETURN count(r) AS edges, sum(id(r)) AS rels, sum(id(a)) AS actors, sum(id(f)) AS films,
+           sum(size(coalesce(a.name, ""))) AS actor_names, sum(size(coalesce(f.title, ""))) AS film_titles
+"""
+
+
+# Longueur d'un nom comme size() de Cypher (unités UTF-16)
+def name_size(name):
+    return len(name.encode("utf-16-le")) // 2 if isinstance(name, str) else 0
+
+
+# Rassemble plusieurs tranches CSR d'un coup : renvoie (ligne d'origine, valeur)
+def gather_rows(indptr, indices, rows):
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=indices.dtype)
+    owners = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owners, indices[np.repeat(starts, lengths) + offsets]
+
+
+def build_csr(sources, targets, n_rows):
+    order = np.argsort(sources, kind="stable")
+    counts = np.bincount(sources, minlength=n_rows)
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, targets[order].astype(np.int64)
+
+
+class GraphSnapshot:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.actor_names = []      # id local -> nom
+        self.film_titles = []      # id local -> titre
+        self.actor_keys = {}       # elementId -> id local
+        self.film_keys = {}
+        self.actor_by_name = {}    # nom -> ids locaux
+        self.edge_actor = np.empty(0, dtype=np.int64)
+        self.edge_film = np.empty(0, dtype=np.int64)
+        self.last_rel_id = -1
+        self.fingerprint = {"edges": 0, "rels": 0, "actors": 0, "films": 0, "actor_names": 0, "film_titles": 0}
+        self.loaded_at = 0.0
+        self._build()
+
+    # ---------- Chargement ----------
+
+    def _actor_id(self, key, name):
+        local = self.actor_keys.get(key)
+        if local is None:
+            local = len(self.actor_names)
+            self.actor_keys[key] = local
+            self.actor_names.append(name)
+            self.actor_by_name.setdefault(name, []).append(local)
+        return local
+
+    def _film_id(self, key, title):
+        local = self.film_keys.get(key)
+        if local is None:
+            local = len(self.film_titles)
+            self.film_keys[key] = local
+            self.film_titles.append(title)
+        return local
+
+    # Récupère les arêtes créées après la dernière synchronisation, par lots
+    def _fetch_edges(self, driver, batch_size=GRAPH_SNAPSHOT_BATCH):
+        new_actors, new_films = [], []
+        with driver.session(fetch_size=batch_size) as session:
+            for record in session.run(EDGES_QUERY, after=self.last_rel_id):
+                new_actors.append(self._actor_id(record["actor_id"], record["actor_name"]))
+                new_films.append(self._film_id(record["film_id"], record["film_title"]))
+                self.last_rel_id = max(self.last_rel_id, record["rel_id"])
+                for name, value in (("edges", 1), ("rels", record["rel_id"]), ("actors", record["actor_node"]),
+                                    ("films", record["film_node"]), ("actor_names", name_size(record["actor_name"])),
+                                    ("film_titles", name_size(record["film_title"]))):
+                    self.fingerprint[name] += value
+        return np.asarray(new_actors, dtype=np.int64), np.asarray(new_films, dtype=np.int64)
+
+    def _build(self):
+        n_actors, n_films = len(self.actor_names), len(self.film_titles)
+        self.a2f_ptr, self.a2f = build_csr(self.edge_actor, self.edge_film, n_actors)
+        self.f2a_ptr, self.f2a = build_csr(self.edge_film, self.edge_actor, n_films)
+        self.degrees = np.diff(self.a2f_ptr)
+        self._connections = None
+        self._components = None
+        self._element_ids = None
+
+    @classmethod
+    def load(cls, driver, batch_size=GRAPH_SNAPSHOT_BATCH):
+        snapshot = cls()
+        snapshot.refresh(driver, batch_size)
+        return snapshot
+
+    # Rafraîchissement incrémental : seules les nouvelles arêtes sont transférées.
+    # Si les arêtes déjà copiées ont changé (empreinte différente), le graphe est
+    # rechargé entièrement.
+    def refresh(self, driver, batch_size=GRAPH_SNAPSHOT_BATCH, full=False):
+        with self._lock:
+            with driver.session() as session:
+                remote = session.run(FINGERPRINT_QUERY, last=self.last_rel_id).single().data()
+            if full or remote != self.fingerprint:
+                self._reset()
+            actors, films = self._fetch_edges(driver, batch_size)
+            if len(actors):
+                self.edge_actor = np.concatenate([self.edge_actor, actors])
+                self.edge_film = np.concatenate([self.edge_film, films])
+                self._build()
+            self.loaded_at = time.time()
+            return self
+
+    # ---------- Persistance (fichiers .npy relus en mémoire mappée) ----------
+
+    # Écrit dans un dossier temporaire puis l'échange avec l'ancien : les tableaux
+    # d'un instantané ouvert depuis ce dossier sont en mémoire mappée sur les
+    # anciens fichiers, qui ne doivent pas être réécrits sur place
+    def save(self, directory=GRAPH_SNAPSHOT_DIR):
+        directory = directory.rstrip("/")
+        tmp, old = directory + ".tmp", directory + ".old"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ("edge_actor", "edge_film", "a2f_ptr", "a2f", "f2a_ptr", "f2a"):
+            np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp, "names.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "actor_names": self.actor_names,
+                "film_titles": self.film_titles,
+                "actor_keys": self.actor_keys,
+                "film_keys": self.film_keys,
+                "last_rel_id": self.last_rel_id,
+                "fingerprint": self.fingerprint,
+            }, f)
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(directory):
+            os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def open(cls, directory=GRAPH_SNAPSHOT_DIR):
+        snapshot = cls.__new__(cls)
+        with open(os.path.join(directory, "names.json"), encoding="utf-8") as f:
+            names = json.load(f)
+        snapshot.actor_names = names["actor_names"]
+        snapshot.film_titles = names["film_titles"]
+        snapshot.actor_keys = names["actor_keys"]
+        snapshot.film_keys = names["film_keys"]
+        snapshot.last_rel_id = names["last_rel_id"]
+        # Ancien format sans empreinte : rechargé entièrement au prochain rafraîchissement
+        snapshot.fingerprint = names.get("fingerprint")
+        snapshot.actor_by_name = {}
+        for local, name in enumerate(snapshot.actor_names):
+            snapshot.actor_by_name.setdefault(name, []).append(local)
+        for name in ("edge_actor", "edge_film", "a2f_ptr", "a2f", "f2a_ptr", "f2a"):
+            setattr(snapshot, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+        snapshot.degrees = np.diff(snapshot.a2f_ptr)
+        snapshot.loaded_at = os.path.getmtime(os.path.join(directory, "names.json"))
+        snapshot._connections = None
+        snapshot._components = None
+        snapshot._element_ids = None
+        snapshot._lock = threading.RLock()
+        return snapshot
+
+    # ---------- Noyaux ----------
+
+    # Acteurs désignés par leur nom (homonymes compris) ou par elementId (by_id=True)
+    def _actor_ids(self, key, by_id=False):
+        if by_id:
+            local = self.actor_keys.get(key)
+            return np.asarray([] if local is None else [local], dtype=np.int64)
+        return np.asarray(self.actor_by_name.get(key, []), dtype=np.int64)
+
+    # id local -> elementId (acteurs, films), pour les clés de pagination
+    def element_ids(self):
+        if self._element_ids is None:
+            actors, films = [None] * len(self.actor_names), [None] * len(self.film_titles)
+            for key, local in self.actor_keys.items():
+                actors[local] = key
+            for key, local in self.film_keys.items():
+                films[local] = key
+            self._element_ids = actors, films
+        return self._element_ids
+
+    def films_of(self, actor_ids):
+        return np.unique(gather_rows(self.a2f_ptr, self.a2f, actor_ids)[1])
+
+    def actors_of(self, film_ids):
+        return np.unique(gather_rows(self.f2a_ptr, self.f2a, film_ids)[1])
+
+    # Nombre de films distincts partageant au moins un acteur, pour chaque film
+    def connections(self, chunk=2048):
+        if self._connections is None:
+            n_films = len(self.film_titles)
+            result = np.zeros(n_films, dtype=np.int64)
+            for start in range(0, n_films, chunk):
+                rows = np.arange(start, min(start + chunk, n_films))
+                owners, actors = gather_rows(self.f2a_ptr, self.f2a, rows)
+                hop_owners, films = gather_rows(self.a2f_ptr, self.a2f, actors)
+                origin = rows[owners[hop_owners]]
+                pairs = np.unique(origin * n_films + films)
+                origin, films = pairs // n_films, pairs % n_films
+                keep = origin != films
+                result[start:start + len(rows)] = np.bincount(origin[keep] - start, minlength=len(rows))
+            self._connections = result
+        return self._connections
+
+    # Matrice creuse co-acteurs en COO : (acteur, co-acteur, nb de films communs)
+    def co_actor_edges(self, chunk=2048):
+        n_actors = len(self.actor_names)
+        sources, targets, weights = [], [], []
+        for start in range(0, n_actors, chunk):
+            rows = np.arange(start, min(start + chunk, n_actors))
+            owners, films = gather_rows(self.a2f_ptr, self.a2f, rows)
+            hop_owners, actors = gather_rows(self.f2a_ptr, self.f2a, films)
+            origin = rows[owners[hop_owners]]
+            keep = origin != actors
+            pairs, counts = np.unique(origin[keep] * n_actors + actors[keep], return_counts=True)
+            sources.append(pairs // n_actors)
+            targets.append(pairs % n_actors)
+            weights.append(counts)
+        if not sources:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        return np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+
+    # Composante connexe de chaque acteur (propagation du plus petit label,
+    # acteur -> film -> acteur, jusqu'à stabilité)
+    def components(self):
+        if self._components is None:
+            labels = np.arange(len(self.actor_names), dtype=np.int64)
+            edge_actor = np.asarray(self.edge_actor)
+            edge_film = np.asarray(self.edge_film)
+            while True:
+                film_labels = np.full(len(self.film_titles), len(labels), dtype=np.int64)
+                np.minimum.at(film_labels, edge_film, labels[edge_actor])
+                updated = labels.copy()
+                np.minimum.at(updated, edge_actor, film_labels[edge_film])
+                if np.array_equal(updated, labels):
+                    break
+                labels = updated
+            self._components = labels
+        return self._components
+
+    def same_component(self, actor1, actor2, by_id=False):
+        components = self.components()
+        first = {int(components[a]) for a in self._actor_ids(actor1, by_id)}
+        return any(int(components[a]) in first for a in self._actor_ids(actor2, by_id))
+
+    # ---------- Requêtes (mêmes résultats que les versions Cypher) ----------
+
+    def top_actor_by_films(self):
+        if len(self.degrees) == 0:
+            return None
+        best = int(np.argmax(self.degrees))
+        return {"acteur": self.actor_names[best], "nb_films": int(self.degrees[best])}
+
+    # Lignes triées comme la version Cypher : (nom, elementId)
+    def co_actors(self, actor, by_id=False):
+        me = self._actor_ids(actor, by_id)
+        films = self.films_of(me)
+        owners, actors = gather_rows(self.f2a_ptr, self.f2a, films)
+        keep = ~np.isin(actors, me)
+        actors, counts = np.unique(actors[keep], return_counts=True)
+        actor_ids = self.element_ids()[0]
+        rows = [{"acteur": self.actor_names[a], "id": actor_ids[a], "films_communs": int(c)}
+                for a, c in zip(actors, counts) if self.actor_names[a] is not None]
+        return sorted(rows, key=lambda r: (r["acteur"], r["id"]))
+
+    def films_with_my_coworkers(self, my_name, by_id=False):
+        me = self._actor_ids(my_name, by_id)
+        coworkers = np.setdiff1d(self.actors_of(self.films_of(me)), me)
+        film_ids = self.element_ids()[1]
+        rows = [{"film": self.film_titles[f], "id": film_ids[f]} for f in self.films_of(coworkers)
+                if self.film_titles[f] is not None]
+        return sorted(rows, key=lambda r: (r["film"], r["id"]))
+
+    def most_connected_film(self):
+        connections = self.connections()
+        if len(connections) == 0 or connections.max() == 0:
+            return None
+        best = int(np.argmax(connections))
+        return {"film": self.film_titles[best], "connexions": int(connections[best])}
+
+    def similar_films(self, title, k=5):
+        film_ids = np.asarray([i for i, t in enumerate(self.film_titles) if t == title], dtype=np.int64)
+        owners, films = gather_rows(self.a2f_ptr, self.a2f, self.actors_of(film_ids))
+        films = films[~np.isin(films, film_ids)]
+        if len(films) == 0:
+            return []
+        counts = np.bincount(films)
+        candidates = np.flatnonzero(counts)
+        order = sorted(candidates, key=lambda f: (-counts[f], self.film_titles[f]))[:k]
+        return [{"film": self.film_titles[f], "acteurs_communs": int(counts[f])} for f in order]
+
+    # BFS par niveaux sur le graphe biparti (acteur -> film -> acteur ...)
+    def shortest_path(self, actor1, actor2, max_hops=None, by_id=False):
+        sources, targets = self._actor_ids(actor1, by_id), self._actor_ids(actor2, by_id)
+        if len(sources) == 0 or len(targets) == 0:
+            return None
+
+        n_actors = len(self.actor_names)
+        actor_parent = np.full(n_actors, -2, dtype=np.int64)   # -2 : non visité, -1 : source
+        film_parent = np.full(len(self.film_titles), -2, dtype=np.int64)
+        actor_parent[sources] = -1
+        target_mask = np.zeros(n_actors, dtype=bool)
+        target_mask[targets] = True
+
+        frontier, hops = sources, 0
+        while len(frontier) and (max_hops is None or hops < max_hops):
+            owners, films = gather_rows(self.a2f_ptr, self.a2f, frontier)
+            films, first = np.unique(films, return_index=True)
+            fresh = film_parent[films] == -2
+            films = films[fresh]
+            film_parent[films] = frontier[owners[first[fresh]]]
+
+            owners, actors = gather_rows(self.f2a_ptr, self.f2a, films)
+            actors, first = np.unique(actors, return_index=True)
+            fresh = actor_parent[actors] == -2
+            actors = actors[fresh]
+            actor_parent[actors] = films[owners[first[fresh]]]
+            hops += 2
+
+            reached = actors[target_mask[actors]]
+            if len(reached):
+                return self._path_steps(int(reached[0]), actor_parent, film_parent)
+            frontier = actors
+        return None
+
+    def _path_steps(self, end, actor_parent, film_parent):
+        nodes = [("actor", end)]
+        while True:
+            kind, node = nodes[-1]
+            parent = actor_parent[node] if kind == "actor" else film_parent[node]
+            if parent < 0:
+                break
+            nodes.append(("film" if kind == "actor" else "actor", int(parent)))
+        nodes.reverse()
+
+        def label(kind, node):
+            return self.actor_names[node] if kind == "actor" else self.film_titles[node]
+
+        return [f"{label(*nodes[i])} --[A_JOUE]--> {label(*nodes[i + 1])}" for i in range(len(nodes) - 1)]
+
+
+# ---------- Instance partagée du processus ----------
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(driver, max_age=GRAPH_SNAPSHOT_REFRESH):
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            if os.path.exists(os.path.join(GRAPH_SNAPSHOT_DIR, "names.json")):
+                _snapshot = GraphSnapshot.open(GRAPH_SNAPSHOT_DIR)
+            else:
+                GraphSnapshot.load(driver).save(GRAPH_SNAPSHOT_DIR)
+                _snapshot = GraphSnapshot.open(GRAPH_SNAPSHOT_DIR)
+        if time.time() - _snapshot.loaded_at > max_age:
+            # Relu depuis les nouveaux fichiers : les tableaux restent en mémoire mappée
+            _snapshot.refresh(driver).save(GRAPH_SNAPSHOT_DIR)
+            _snapshot = GraphSnapshot.open(GRAPH_SNAPSHOT_DIR)
+        return _snapshot
+
+
+def top_actor_by_films(driver):
+    return get_snapshot(driver).top_actor_by_films()
+
+
+def co_actors(driver, actor, page=1, page_size=PAGE_SIZE, by_id=False):
+    return list_page(get_snapshot(driver).co_actors(actor, by_id), page, page_size)
+
+
+def actors_with_anne_hathaway(driver):
+    return list(dict.fromkeys(r["acteur"] for r in get_snapshot(driver).co_actors("Anne Hathaway")))
+
+
+def films_with_my_coworkers(driver, my_name="Ton Nom", by_id=False, page=1, page_size=PAGE_SIZE):
+    return list_page(get_snapshot(driver).films_with_my_coworkers(my_name, by_id), page, page_size)
+
+
+def most_connected_film(driver):
+    return get_snapshot(driver).most_connected_film()
+
+
+def similar_films(driver, title, k=5):
+    return get_snapshot(driver).similar_films(title, k)
+
+
+def shortest_path_between_actors(driver, actor1, actor2, by_id=False):
+    return get_snapshot(driver).shortest_path(actor1, actor2, max_hops=PATH_MAX_HOPS, by_id=by_id)
+
+
+if __name__ == "__main__":
+    from databases.neo4j_connection import connect_neo4j
+
+    start = time.perf_counter()
+    snapshot = GraphSnapshot.load(connect_neo4j())
+    snapshot.save(GRAPH_SNAPSHOT_DIR)
+    print(f"✅ {len(snapshot.actor_names)} acteurs, {len(snapshot.film_titles)} films, "
+          f"{len(snapshot.edge_actor)} relations en {time.perf_counter() - start:.1f} s -> {GRAPH_SNAPSHOT_DIR}")
@@ -0,0 +1,33 @@
+# Noms de champs et expressions d'agrégation partagés par les modules MongoDB
+
+RUNTIME = "Runtime (Minutes)"
+REVENUE = "Revenue (Millions)"
+
+
+# Conversion côté serveur équivalente à float() en Python :
+# nombres et booléens convertis, chaînes converties après trim, le reste à null
+def as_double(field_name):
+    value = "$" + field_name
+    return {"$switch": {
+        "branches": [
+            {"case": {"$in": [{"$type": value}, ["double", "int", "long", "decimal", "bool"]]},
+             "then": {"$toDouble": value}},
+            {"case": {"$eq": [{"$type": value}, "string"]},
+             "then": {"$convert": {"input": {"$trim": {"input": value}}, "to": "double",
+                                   "onError": None, "onNull": None}}},
+        ],
+        "default": None
+    }}
+
+
+def decade_expr(field_name="year"):
+    return {"$multiply": [{"$floor": {"$divide": ["$" + field_name, 10]}}, 10]}
+
+
+# Découpe "Action,Drama" en un document par genre (nettoyé) côté serveur
+def unwind_genres():
+    return [
+        {"$addFields": {"genre_item": {"$split": ["$genre", ","]}}},
+        {"$unwind": "$genre_item"},
+        {"$addFields": {"genre_item": {"$trim": {"input": "$genre_item"}}}}
+    ]
@@ -0,0 +1,128 @@
+import argparse
+import sys
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collection import Collection
+
+from queries.mongo_migration import is_normalized
+from queries.mongo_queries import FACET, INDEXED_SECTIONS, REVENUE, dashboard_pipelines
+
+# Index de la collection films et vérification des plans d'exécution.
+# Usage : python -m queries.mongo_indexes [--verify-only]
+
+INDEXES = [
+    # movies_after_1999, avg_votes_2007
+    IndexModel([("year", ASCENDING)], name="year_1"),
+    # highest_revenue_film (tri décroissant sans SORT en mémoire)
+    IndexModel([(REVENUE, DESCENDING)], name="revenue_-1"),
+    # high_score_high_revenue
+    IndexModel([("Metascore", ASCENDING), (REVENUE, ASCENDING)], name="metascore_1_revenue_1"),
+    # top_3_rated_by_decade (schéma normalisé)
+    IndexModel([("decade", ASCENDING), ("rating", DESCENDING)], name="decade_1_rating_-1"),
+    # filtres par genre (index multikey sur le tableau genres)
+    IndexModel([("genres", ASCENDING)], name="genres_1"),
+]
+
+# Idempotent : createIndexes ne fait rien si l'index existe déjà avec la même définition
+def ensure_indexes(collection: Collection):
+    return collection.create_indexes(INDEXES)
+
+
+def explain_pipeline(collection: Collection, pipeline):
+    return collection.database.command(
+        "explain",
+        {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+        verbosity="queryPlanner"
+    )
+
+
+# Plans gagnants contenus dans une sortie explain (classique, SBE ou shardée)
+def _winning_plans(explain):
+    plans = []
+
+    def visit(value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                if key == "rejectedPlans":
+                    continue
+                if key == "winningPlan" and isinstance(child, dict):
+                    plans.append(child.get("queryPlan", child))
+                else:
+                    visit(child)
+        elif isinstance(value, list):
+            for child in value:
+                visit(child)
+
+    visit(explain)
+    return plans
+
+
+# Renvoie (problèmes, étapes, contient un GROUP) pour un nœud de plan.
+# Un SORT placé au-dessus d'un GROUP trie les groupes (peu de lignes) : accepté.
+def _plan_problems(node):
+    stage = node.get("stage")
+    children = list(node.get("inputStages", []))
+    if "inputStage" in node:
+        children.append(node["inputStage"])
+
+    problems, stages, below_group = [], [stage], False
+    for child in children:
+        child_problems, child_stages, child_group = _plan_problems(child)
+        problems += child_problems
+        stages += child_stages
+        below_group = below_group or child_group
+
+    if stage == "COLLSCAN":
+        problems.append("COLLSCAN")
+    if stage == "SORT" and not below_group:
+        problems.append("SORT en mémoire")
+    return problems, stages, below_group or stage == "GROUP"
+
+
+# Explique les agrégations telles que dashboard_snapshot() les exécute. Les sections
+# indexées doivent s'appuyer sur un index ; le $facet regroupe les groupements
+# globaux (parcours complet par construction), listé sans faire échouer la vérification.
+def verify_query_plans(collection: Collection):
+    report = {}
+    for name, pipeline in dashboard_pipelines(is_normalized(collection)).items():
+        problems, stages = [], []
+        for plan in _winning_plans(explain_pipeline(collection, pipeline)):
+            plan_problems, plan_stages, _ = _plan_problems(plan)
+            problems += plan_problems
+            stages += plan_stages
+        report[name] = {
+            "stages": stages,
+            "problems": problems,
+            "checked": name in INDEXED_SECTIONS,
+            "sections": list(pipeline[0]["$facet"]) if name == FACET else [name],
+        }
+    return report
+
+
+def failing_sections(report):
+    return {name: r["problems"] for name, r in report.items() if r["checked"] and r["problems"]}
+
+
+if __name__ == "__main__":
+    from databases.mongo_connection import connect_mongodb
+
+    parser = argparse.ArgumentParser(description="Crée les index de films et vérifie les plans d'exécution")
+    parser.add_argument("--verify-only", action="store_true", help="ne crée pas les index")
+    args = parser.parse_args()
+
+    collection = connect_mongodb()
+    if not args.verify_only:
+        print("Index :", ", ".join(ensure_indexes(collection)))
+    if not is_normalized(collection):
+        print("⚠️ Collection non normalisée : lancer python -m queries.mongo_migration")
+
+    report = verify_query_plans(collection)
+    for name, r in report.items():
+        status = "❌" if r["checked"] and r["problems"] else ("✅" if r["checked"] else "·")
+        label = f"$facet ({len(r['sections'])} sections)" if name == FACET else name
+        print(f"{status} {label:<25} {' > '.join(s for s in r['stages'] if s)}")
+
+    failures = failing_sections(report)
+    if failures:
+        print(f"Régressions de plan : {failures}")
+        sys.exit(1)
@@ -0,0 +1,166 @@
+import argparse
+import math
+import time
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+
+from utils.cache import query_cache
+
+# Migration de normalisation de entertainment.films :
+#   - champs numériques typés (les valeurs invalides sont déplacées dans raw.<champ>)
+#   - genres : tableau de genres nettoyés (le champ texte "genre" est conservé)
+#   - decade : décennie précalculée
+# Reprenable : seuls les documents sans schema_version = SCHEMA_VERSION sont traités.
+# Usage : python -m queries.mongo_migration [--batch-size 1000]
+
+SCHEMA_VERSION = 1
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+# champ -> True si la valeur doit être un entier
+NUMERIC_FIELDS = {
+    "Revenue (Millions)": False,
+    "Votes": True,
+    "Runtime (Minutes)": True,
+    "Metascore": True,
+    "rating": False,
+    "year": True,
+}
+
+# Durée pendant laquelle la détection du schéma est gardée en mémoire (secondes)
+DETECTION_TTL = 60
+_detection_cache = {}
+
+
+# Même règle que float() en Python ; None si la valeur est invalide
+def parse_number(value, integer=False):
+    if value is None or isinstance(value, (list, dict)):
+        return None
+    try:
+        number = float(value.strip() if isinstance(value, str) else value)
+    except (ValueError, TypeError):
+        return None
+    if math.isnan(number) or math.isinf(number):
+        return None
+    if integer and number.is_integer():
+        return int(number)
+    return number
+
+
+def parse_genres(value):
+    if not isinstance(value, str) or not value:
+        return []
+    return [g.strip() for g in value.split(",")]
+
+
+# Calcule les opérations $set / $unset d'un document
+def normalize_document(doc):
+    to_set = {"schema_version": SCHEMA_VERSION}
+    to_unset = {}
+
+    for field_name, integer in NUMERIC_FIELDS.items():
+        if field_name not in doc:
+            continue
+        raw = doc[field_name]
+        number = parse_number(raw, integer)
+        if number is None:
+            to_unset[field_name] = ""
+            if raw is not None:
+                to_set[f"raw.{field_name}"] = raw
+        elif number != raw or type(number) is not type(raw):
+            to_set[field_name] = number
+
+    to_set["genres"] = parse_genres(doc.get("genre"))
+
+    year = parse_number(doc.get("year"), integer=True)
+    if year is not None:
+        to_set["decade"] = int(year // 10 * 10)
+    else:
+        to_unset["decade"] = ""
+
+    update = {"$set": to_set}
+    if to_unset:
+        update["$unset"] = to_unset
+    return update
+
+
+def _migration_state(collection: Collection):
+    return collection.database[MIGRATIONS_COLLECTION]
+
+
+def migrate_films(collection: Collection, batch_size=1000, progress=print):
+    pending_filter = {"schema_version": {"$ne": SCHEMA_VERSION}}
+    projection = {field_name: 1 for field_name in NUMERIC_FIELDS}
+    projection["genre"] = 1
+
+    total = collection.count_documents(pending_filter)
+    state = _migration_state(collection)
+    state.update_one(
+        {"_id": collection.name},
+        {"$set": {"status": "running", "version": SCHEMA_VERSION, "started_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+    # Curseur propre à cette exécution : une reprise repart du filtre schema_version
+    processed = 0
+    last_id = None
+    start = time.perf_counter()
+
+    while True:
+        batch_filter = dict(pending_filter)
+        if last_id is not None:
+            batch_filter["_id"] = {"$gt": last_id}
+        batch = list(
+            collection.find(batch_filter, projection).sort("_id", ASCENDING).limit(batch_size)
+        )
+        if not batch:
+            break
+
+        operations = [UpdateOne({"_id": doc["_id"]}, normalize_document(doc)) for doc in batch]
+        collection.bulk_write(operations, ordered=False)
+
+        processed += len(batch)
+        last_id = batch[-1]["_id"]
+        state.update_one({"_id": collection.name}, {"$inc": {"processed": len(batch)}})
+
+        if progress:
+            elapsed = time.perf_counter() - start
+            rate = processed / elapsed if elapsed else 0.0
+            progress(f"{processed}/{total} documents migrés ({rate:.0f} docs/s)")
+
+    state.update_one(
+        {"_id": collection.name},
+        {"$set": {"status": "complete", "completed_at": datetime.now(timezone.utc)}}
+    )
+    _detection_cache.pop(collection.full_name, None)
+    query_cache.invalidate("mongo")
+    return processed
+
+
+# Le schéma normalisé est utilisable quand la migration est terminée et qu'aucun
+# document n'a été inséré depuis sans passer par normalize_document (pas de tableau
+# genres : les pipelines normalisés l'ignoreraient). Le test s'appuie sur genres_1.
+def is_normalized(collection: Collection):
+    now = time.monotonic()
+    cached = _detection_cache.get(collection.full_name)
+    if cached and now - cached[1] < DETECTION_TTL:
+        return cached[0]
+
+    state = _migration_state(collection).find_one({"_id": collection.name}, {"status": 1, "version": 1})
+    normalized = bool(state) and state.get("status") == "complete" and state.get("version") == SCHEMA_VERSION
+    if normalized:
+        normalized = collection.find_one({"genres": {"$exists": False}}, {"_id": 1}) is None
+    _detection_cache[collection.full_name] = (normalized, now)
+    return normalized
+
+
+if __name__ == "__main__":
+    from databases.mongo_connection import connect_mongodb
+
+    parser = argparse.ArgumentParser(description="Normalise la collection films (types numériques, genres, décennie)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    migrated = migrate_films(connect_mongodb(), batch_size=args.batch_size)
+    print(f"✅ Migration terminée : {migrated} documents mis à jour")
@@ -1,183 +1,443 @@
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
 from pymongo.collection import Collection
-from bson.son import SON
 
-# 1. Année avec le plus grand nombre de films
-def year_with_most_movies(collection: Collection):
-    pipeline = [
+from queries.mongo_common import RUNTIME, REVENUE, as_double, decade_expr, unwind_genres
+from queries.mongo_migration import is_normalized
+from queries.films_stats import read_stats
+from config.config import PAGE_SIZE
+from utils.cache import cached
+from utils.instrumentation import instrumented
+from utils.pagination import keyset_page, mongo_keyset_pipeline, stream_aggregate
+
+# Durée de vie en cache des résultats MongoDB (secondes)
+MONGO_CACHE_TTL = 300
+
+# ---------- Sections du tableau de bord ----------
+# Chaque section = un sous-pipeline + une fonction de finalisation côté Python.
+# Les fonctions par question exécutent leur section seule ; dashboard_snapshot()
+# exécute les groupements globaux dans un unique $facet (un seul aller-retour) et
+# les sections indexées à part (INDEXED_SECTIONS).
+# normalized=True : la collection a été migrée (queries/mongo_migration.py),
+# les champs sont typés et "genres" / "decade" sont déjà calculés.
+
+def _year_counts_pipeline(normalized=False):
+    return [
         {"$group": {"_id": "$year", "count": {"$sum": 1}}},
-        {"$sort": SON([("count", -1)])},
+        {"$sort": {"_id": 1}}
+    ]
+
+
+def _movies_after_1999_pipeline(normalized=False):
+    return [
+        {"$match": {"year": {"$gt": 1999}}},
+        {"$count": "count"}
+    ]
+
+
+def _finalize_count(rows):
+    return rows[0]["count"] if rows else 0
+
+
+def _avg_votes_2007_pipeline(normalized=False):
+    return [
+        {"$match": {"year": 2007}},
+        {"$group": {"_id": None, "averageVotes": {"$avg": "$Votes"}}}
+    ]
+
+
+def _finalize_avg_votes(rows):
+    return rows[0]["averageVotes"] if rows else None
+
+
+def _distinct_genres_pipeline(normalized=False):
+    if normalized:
+        return [
+            {"$unwind": "$genres"},
+            {"$group": {"_id": "$genres"}}
+        ]
+    return [
+        {"$match": {"genre": {"$type": "string", "$ne": ""}}},
+        {"$project": {"genre": 1}},
+        *unwind_genres(),
+        {"$group": {"_id": "$genre_item"}}
+    ]
+
+
+def _finalize_distinct_genres(rows):
+    return sorted(row["_id"] for row in rows)
+
+
+def _highest_revenue_pipeline(normalized=False):
+    return [
+        {"$match": {REVENUE: {"$exists": True}}},
+        {"$sort": {REVENUE: -1}},
         {"$limit": 1}
     ]
-    return list(collection.aggregate(pipeline))
+
+
+def _finalize_first(rows):
+    return rows[0] if rows else None
+
+
+# Tri total (count, nom) : clé de pagination des réalisateurs
+DIRECTORS_SORT = [("count", -1), ("_id", 1)]
+
+
+def _directors_groups(normalized=False):
+    return [
+        {"$group": {"_id": "$Director", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 5}, "_id": {"$ne": None}}}
+    ]
+
+
+def _directors_pipeline(normalized=False):
+    return _directors_groups(normalized) + [{"$sort": dict(DIRECTORS_SORT)}]
+
+
+# Revenu moyen par genre, calculé entièrement côté serveur
+def _genre_revenue_pipeline(normalized=False):
+    if normalized:
+        return [
+            {"$match": {REVENUE: {"$exists": True}, "genres.0": {"$exists": True}}},
+            {"$project": {"genres": 1, REVENUE: 1}},
+            {"$unwind": "$genres"},
+            {"$group": {"_id": "$genres", "avg": {"$avg": "$" + REVENUE}}},
+            {"$project": {"_id": 0, "genre": "$_id", "avg": 1}}
+        ]
+    return [
+        {"$match": {REVENUE: {"$exists": True}, "genre": {"$type": "string", "$ne": ""}}},
+        {"$project": {"genre": 1, "revenue": as_double(REVENUE)}},
+        {"$match": {"revenue": {"$ne": None}}},
+        *unwind_genres(),
+        {"$group": {"_id": "$genre_item", "avg": {"$avg": "$revenue"}}},
+        {"$project": {"_id": 0, "genre": "$_id", "avg": 1}}
+    ]
+
+
+def _finalize_genre_revenue(rows):
+    return sorted(rows, key=lambda x: x["avg"], reverse=True)
+
+
+# Top K par groupe côté serveur : $topN ne renvoie que k lignes par groupe
+def top_k_by_group_pipeline(group_expr, sort_field, k, match=None, fields=None, descending=True):
+    fields = fields or ["title", sort_field]
+    return [
+        {"$match": {sort_field: {"$exists": True}, **(match or {})}},
+        {"$group": {"_id": group_expr, "items": {"$topN": {
+            "n": k,
+            "sortBy": {sort_field: -1 if descending else 1},
+            "output": {"_id": "$_id", **{f: "$" + f for f in fields}}
+        }}}},
+        {"$sort": {"_id": 1}}
+    ]
+
+
+def top_k_by_group(collection: Collection, group_expr, sort_field, k, match=None, fields=None, descending=True):
+    pipeline = top_k_by_group_pipeline(group_expr, sort_field, k, match, fields, descending)
+    return {row["_id"]: row["items"] for row in collection.aggregate(pipeline)}
+
+
+def _top_3_by_decade_pipeline(normalized=False):
+    if normalized:
+        return top_k_by_group_pipeline("$decade", "rating", 3, match={"decade": {"$exists": True}},
+                                       fields=["title", "rating", "year"])
+    return top_k_by_group_pipeline(decade_expr(), "rating", 3, match={"year": {"$exists": True}},
+                                   fields=["title", "rating", "year"])
+
+
+def _finalize_top_by_decade(rows):
+    top_by_decade = {}
+    for row in rows:
+        top_by_decade[row["_id"]] = [{**film, "decade": row["_id"]} for film in row["items"]]
+    return top_by_decade
+
+
+# Film le plus long par genre : une seule ligne (document complet) par genre revient du serveur
+def _longest_by_genre_pipeline(normalized=False):
+    if normalized:
+        per_genre = [
+            {"$match": {RUNTIME: {"$exists": True}, "genres.0": {"$exists": True}}},
+            {"$addFields": {"genre_item": "$genres"}},
+            {"$unwind": "$genre_item"}
+        ]
+    else:
+        per_genre = [
+            {"$match": {RUNTIME: {"$exists": True}, "genre": {"$type": "string", "$ne": ""}}},
+            *unwind_genres()
+        ]
+    return [
+        *per_genre,
+        # Égalité de durée : le plus petit _id, pour un résultat déterministe
+        {"$group": {"_id": "$genre_item", "film": {"$top": {
+            "sortBy": {RUNTIME: -1, "_id": 1},
+            "output": "$$ROOT"
+        }}}},
+        {"$unset": "film.genre_item"}
+    ]
+
+
+def _finalize_longest_by_genre(rows):
+    return {row["_id"]: row["film"] for row in rows}
+
+
+def _high_score_high_revenue_pipeline(normalized=False):
+    return [
+        {"$match": {
+            "Metascore": {"$gt": 80},
+            REVENUE: {"$gt": 50}
+        }},
+        {"$project": {"title": 1, "Metascore": 1, REVENUE: 1}}
+    ]
+
+
+# Sommes nécessaires au coefficient de Pearson (n, Σx, Σy, Σx², Σy², Σxy)
+def _correlation_sums_pipeline(normalized=False):
+    if normalized:
+        # Champs déjà typés par la migration : aucune conversion nécessaire
+        pairs = [
+            {"$match": {RUNTIME: {"$exists": True}, REVENUE: {"$exists": True}}},
+            {"$project": {"x": "$" + RUNTIME, "y": "$" + REVENUE}}
+        ]
+    else:
+        pairs = [
+            {"$match": {RUNTIME: {"$exists": True}, REVENUE: {"$exists": True}}},
+            {"$project": {"x": as_double(RUNTIME), "y": as_double(REVENUE)}},
+            {"$match": {"x": {"$ne": None}, "y": {"$ne": None}}}
+        ]
+    return [
+        *pairs,
+        {"$group": {
+            "_id": None,
+            "n": {"$sum": 1},
+            "sx": {"$sum": "$x"},
+            "sy": {"$sum": "$y"},
+            "sxx": {"$sum": {"$multiply": ["$x", "$x"]}},
+            "syy": {"$sum": {"$multiply": ["$y", "$y"]}},
+            "sxy": {"$sum": {"$multiply": ["$x", "$y"]}}
+        }}
+    ]
+
+
+def _finalize_correlation_sums(rows):
+    if not rows:
+        return {"n": 0, "sx": 0.0, "sy": 0.0, "sxx": 0.0, "syy": 0.0, "sxy": 0.0}
+    row = dict(rows[0])
+    row.pop("_id", None)
+    return row
+
+
+def pearson_from_sums(sums):
+    n = sums["n"]
+    if n <= 1:
+        return None
+    cov = n * sums["sxy"] - sums["sx"] * sums["sy"]
+    var_x = n * sums["sxx"] - sums["sx"] ** 2
+    var_y = n * sums["syy"] - sums["sy"] ** 2
+    if var_x <= 0 or var_y <= 0:
+        return float("nan")  # même résultat que np.corrcoef sur une série constante
+    return cov / math.sqrt(var_x * var_y)
+
+
+def _runtime_by_decade_pipeline(normalized=False):
+    return [
+        {"$project": {"decade": "$decade" if normalized else decade_expr(), RUNTIME: 1}},
+        {"$group": {"_id": "$decade", "avg_runtime": {"$avg": "$" + RUNTIME}}},
+        {"$sort": {"_id": 1}}
+    ]
+
+
+def _identity(rows):
+    return rows
+
+
+# Sections servies par la synthèse films_stats quand son mainteneur tourne
+STATS_SECTIONS = {
+    "year_counts", "movies_after_1999", "avg_votes_2007",
+    "genre_avg_revenue", "runtime_by_decade", "correlation_sums",
+}
+
+# Sections lues par pages (fonction dédiée), hors du $facet du tableau de bord
+PAGED_SECTIONS = {"directors_more_than_5"}
+
+# Sections qui filtrent ou trient sur un index (queries/mongo_indexes.py). Un
+# sous-pipeline de $facet n'utilise aucun index : elles sont exécutées à part.
+INDEXED_SECTIONS = {
+    "movies_after_1999",
+    "avg_votes_2007",
+    "highest_revenue_film",
+    "high_score_high_revenue",
+    "top_3_by_decade",
+}
+
+# Nom de l'agrégation $facet dans dashboard_pipelines()
+FACET = "$facet"
+
+SECTIONS = {
+    "year_counts": (_year_counts_pipeline, _identity),
+    "movies_after_1999": (_movies_after_1999_pipeline, _finalize_count),
+    "avg_votes_2007": (_avg_votes_2007_pipeline, _finalize_avg_votes),
+    "distinct_genres": (_distinct_genres_pipeline, _finalize_distinct_genres),
+    "highest_revenue_film": (_highest_revenue_pipeline, _finalize_first),
+    "directors_more_than_5": (_directors_pipeline, _identity),
+    "genre_avg_revenue": (_genre_revenue_pipeline, _finalize_genre_revenue),
+    "top_3_by_decade": (_top_3_by_decade_pipeline, _finalize_top_by_decade),
+    "longest_by_genre": (_longest_by_genre_pipeline, _finalize_longest_by_genre),
+    "high_score_high_revenue": (_high_score_high_revenue_pipeline, _identity),
+    "correlation_sums": (_correlation_sums_pipeline, _finalize_correlation_sums),
+    "runtime_by_decade": (_runtime_by_decade_pipeline, _identity),
+}
+
+
+def _run_section(collection: Collection, name):
+    if name in STATS_SECTIONS:
+        stats = read_stats(collection)
+        if stats is not None:
+            return stats[name]
+    pipeline, finalize = SECTIONS[name]
+    return finalize(list(collection.aggregate(pipeline(is_normalized(collection)))))
+
+
+# Résultat typé de dashboard_snapshot()
+@dataclass
+class DashboardSnapshot:
+    year_counts: List[Dict[str, Any]] = field(default_factory=list)
+    movies_after_1999: int = 0
+    avg_votes_2007: Optional[float] = None
+    distinct_genres: List[str] = field(default_factory=list)
+    highest_revenue_film: Optional[Dict[str, Any]] = None
+    genre_avg_revenue: List[Dict[str, Any]] = field(default_factory=list)
+    top_3_by_decade: Dict[int, List[Dict[str, Any]]] = field(default_factory=dict)
+    longest_by_genre: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    high_score_high_revenue: List[Dict[str, Any]] = field(default_factory=list)
+    correlation_sums: Dict[str, float] = field(default_factory=dict)
+    runtime_by_decade: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def year_with_most_movies(self):
+        return _most_movies(self.year_counts)
+
+    @property
+    def correlation(self):
+        return pearson_from_sums(self.correlation_sums)
+
+
+# Agrégations exécutées par dashboard_snapshot() (et vérifiées par mongo_indexes.py) :
+# une par section indexée, puis toutes les autres dans un unique $facet (clé FACET)
+def dashboard_pipelines(normalized=False, skip=()):
+    names = [name for name in SECTIONS if name not in skip and name not in PAGED_SECTIONS]
+    pipelines = {name: SECTIONS[name][0](normalized) for name in names if name in INDEXED_SECTIONS}
+    facet = {name: SECTIONS[name][0](normalized) for name in names if name not in INDEXED_SECTIONS}
+    if facet:
+        pipelines[FACET] = [{"$facet": facet}]
+    return pipelines
+
+
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
+def dashboard_snapshot(collection: Collection):
+    # Sections déjà agrégées dans films_stats : lues directement (O(groupes))
+    # (copie : le dictionnaire renvoyé par read_stats est partagé par son cache)
+    values = dict(read_stats(collection) or {})
+    for name, pipeline in dashboard_pipelines(is_normalized(collection), skip=values).items():
+        rows = list(collection.aggregate(pipeline))
+        if name == FACET:
+            facet_rows = rows[0] if rows else {}
+            for section in pipeline[0]["$facet"]:
+                values[section] = SECTIONS[section][1](facet_rows.get(section, []))
+        else:
+            values[name] = SECTIONS[name][1](rows)
+    return DashboardSnapshot(**values)
+
+
+def _most_movies(year_counts):
+    if not year_counts:
+        return []
+    return [max(year_counts, key=lambda d: d["count"])]
+
+
+# 1. Année avec le plus grand nombre de films
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
+def year_with_most_movies(collection: Collection):
+    return _most_movies(_run_section(collection, "year_counts"))
 
 # 2. Nombre de films après 1999
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def movies_after_1999(collection: Collection):
-    return collection.count_documents({"year": {"$gt": 1999}})
+    return _run_section(collection, "movies_after_1999")
 
 # 3. Moyenne des votes pour les films sortis en 2007
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def avg_votes_2007(collection: Collection):
-    pipeline = [
-        {"$match": {"year": 2007}},
-        {"$group": {"_id": None, "averageVotes": {"$avg": "$Votes"}}}
-    ]
-    result = list(collection.aggregate(pipeline))
-    return result[0]["averageVotes"] if result else None
+    return _run_section(collection, "avg_votes_2007")
 
 # 4. Histogramme : Nombre de films par année
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def films_per_year(collection: Collection):
-    pipeline = [
-        {"$group": {"_id": "$year", "count": {"$sum": 1}}},
-        {"$sort": {"_id": 1}}
-    ]
-    return list(collection.aggregate(pipeline))
+    return _run_section(collection, "year_counts")
 
 # 5. Genres de films disponibles
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def distinct_genres(collection: Collection):
-    genres = collection.distinct("genre")
-    flat_genres = set()
-    for g in genres:
-        if g:
-            flat_genres.update([x.strip() for x in g.split(",")])
-    return sorted(flat_genres)
+    return _run_section(collection, "distinct_genres")
 
 # 6. Film ayant généré le plus de revenu
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def highest_revenue_film(collection: Collection):
-    return collection.find_one(
-        {"Revenue (Millions)": {"$exists": True}},
-        sort=[("Revenue (Millions)", -1)]
-    )
-
-# 7. Réalisateurs ayant fait plus de 5 films
-def directors_with_more_than_5_films(collection: Collection):
-    pipeline = [
-        {"$group": {"_id": "$Director", "count": {"$sum": 1}}},
-        {"$match": {"count": {"$gt": 5}}},
-        {"$sort": {"count": -1}}
-    ]
-    return list(collection.aggregate(pipeline))
+    return _run_section(collection, "highest_revenue_film")
+
+# 7. Réalisateurs ayant fait plus de 5 films (par pages)
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
+def directors_with_more_than_5_films(collection: Collection, page=1, page_size=PAGE_SIZE):
+    groups = _directors_groups(is_normalized(collection))
+
+    def fetch(after, limit):
+        return list(stream_aggregate(collection, mongo_keyset_pipeline(groups, DIRECTORS_SORT, after, limit)))
+
+    return keyset_page("directors_more_than_5", fetch, lambda r: [r["count"], r["_id"]], page, page_size)
 
 # 8. Genre rapportant en moyenne le plus de revenus
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def top_genre_by_avg_revenue(collection: Collection):
-    pipeline = [
-        {"$project": {"genre": 1, "Revenue (Millions)": 1}},
-        {"$match": {"Revenue (Millions)": {"$exists": True}}}
-    ]
-
-    docs = list(collection.aggregate(pipeline))
-    genre_stats = {}
-
-    for doc in docs:
-        genre_field = doc.get("genre")
-        revenue_raw = doc.get("Revenue (Millions)")
-
-        try:
-            revenue = float(revenue_raw)
-        except (ValueError, TypeError):
-            continue  # skip malformed revenue
-
-        if genre_field:
-            for g in genre_field.split(","):
-                g = g.strip()
-                if g not in genre_stats:
-                    genre_stats[g] = []
-                genre_stats[g].append(revenue)
-
-    # 🧽 nettoyage ultime avant calcul
-    avg_by_genre = []
-    for genre, revenues in genre_stats.items():
-        cleaned_revenues = []
-        for r in revenues:
-            try:
-                cleaned_revenues.append(float(r))
-            except (ValueError, TypeError):
-                continue
-        if cleaned_revenues:
-            avg = sum(cleaned_revenues) / len(cleaned_revenues)
-            avg_by_genre.append({"genre": genre, "avg": avg})
-
-    return sorted(avg_by_genre, key=lambda x: x["avg"], reverse=True)
+    return _run_section(collection, "genre_avg_revenue")
 
 # 9. Top 3 films les mieux notés par décennie
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def top_3_rated_by_decade(collection: Collection):
-    pipeline = [
-        {"$match": {"year": {"$exists": True}, "rating": {"$exists": True}}},
-        {"$project": {
-            "title": 1,
-            "rating": 1,
-            "year": 1,
-            "decade": {"$multiply": [{"$floor": {"$divide": ["$year", 10]}}, 10]}
-        }},
-        {"$sort": {"decade": 1, "rating": -1}},
-    ]
-    results = list(collection.aggregate(pipeline))
-    from collections import defaultdict
-    top_by_decade = defaultdict(list)
-    for film in results:
-        decade = film["decade"]
-        if len(top_by_decade[decade]) < 3:
-            top_by_decade[decade].append(film)
-    return dict(top_by_decade)
-
-# 10. Film le plus long par genre
+    return _run_section(collection, "top_3_by_decade")
+
+# 10. Film le plus long par genre (document complet). Égalité de durée : le film de
+# plus petit _id (l'ancienne version Python gardait le premier document lu)
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def longest_film_by_genre(collection: Collection):
-    docs = collection.find({"Runtime (Minutes)": {"$exists": True}})
-    genre_max = {}
-    for doc in docs:
-        if "genre" in doc and "Runtime (Minutes)" in doc:
-            for g in doc["genre"].split(","):
-                g = g.strip()
-                current = genre_max.get(g)
-                if not current or doc["Runtime (Minutes)"] > current["Runtime (Minutes)"]:
-                    genre_max[g] = doc
-    return genre_max
+    return _run_section(collection, "longest_by_genre")
 
 # 11. Vue MongoDB : films notés > 80 et revenus > 50 millions
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def high_score_high_revenue(collection: Collection):
-    pipeline = [
-        {"$match": {
-            "Metascore": {"$gt": 80},
-            "Revenue (Millions)": {"$gt": 50}
-        }},
-        {"$project": {"title": 1, "Metascore": 1, "Revenue (Millions)": 1}}
-    ]
-    return list(collection.aggregate(pipeline))
+    return _run_section(collection, "high_score_high_revenue")
 
 # 12. Corrélation entre runtime et revenu
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def correlation_runtime_revenue(collection: Collection):
-    docs = collection.find({
-        "Runtime (Minutes)": {"$exists": True},
-        "Revenue (Millions)": {"$exists": True}
-    }, {"Runtime (Minutes)": 1, "Revenue (Millions)": 1})
-
-    runtimes = []
-    revenues = []
-
-    for d in docs:
-        try:
-            runtime = float(d["Runtime (Minutes)"])
-            revenue = float(d["Revenue (Millions)"])
-            runtimes.append(runtime)
-            revenues.append(revenue)
-        except (ValueError, TypeError):
-            continue  # Ignore les valeurs invalides
-
-    if len(runtimes) > 1:
-        import numpy as np
-        correlation = np.corrcoef(runtimes, revenues)[0][1]
-        return correlation
-    return None
+    return pearson_from_sums(_run_section(collection, "correlation_sums"))
 
 # 13. Évolution de la durée moyenne des films par décennie
+@cached(ttl=MONGO_CACHE_TTL, tags=("mongo",))
+@instrumented("mongo")
 def avg_runtime_by_decade(collection: Collection):
-    pipeline = [
-        {"$project": {
-            "decade": {"$multiply": [{"$floor": {"$divide": ["$year", 10]}}, 10]},
-            "Runtime (Minutes)": 1
-        }},
-        {"$group": {
-            "_id": "$decade",
-            "avg_runtime": {"$avg": "$Runtime (Minutes)"}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    return list(collection.aggregate(pipeline))
\ No newline at end of file
+    return _run_section(collection, "runtime_by_decade")
@@ -0,0 +1,202 @@
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+from config.config import ETL_BATCH_SIZE, ETL_WORKERS
+from queries.film_projection import build_film_projection, invalidate_projection
+from queries.mongo_migration import NUMERIC_FIELDS, parse_number, parse_genres
+from queries.neo4j_schema import missing_unique_constraints
+from utils.cache import query_cache
+
+# Chargement du graphe Neo4j depuis entertainment.films :
+#   - lecture en flux (curseur projeté, trié par _id)
+#   - écriture par lots UNWIND $rows MERGE ..., sur plusieurs threads
+#   - point de reprise : dernier _id dont tous les lots précédents sont écrits
+#   - débit affiché en lignes/s
+# Les contraintes d'unicité (python -m queries.neo4j_schema) rendent les MERGE
+# concurrents sûrs ; les interblocages transitoires sont rejoués par execute_write.
+# S'il en manque une, deux MERGE simultanés pourraient créer un doublon : le
+# chargement passe alors sur un seul thread.
+# Un film qui gagne un acteur est remis en attente de la projection PARTAGE_ACTEURS
+# (queries/film_projection.py), mise à jour à la fin du chargement.
+# Usage : python -m queries.mongo_to_neo4j [--batch-size 500] [--workers 4] [--restart] [--skip-projection]
+
+CHECKPOINTS_COLLECTION = "etl_checkpoints"
+JOB_NAME = "mongo_to_neo4j"
+
+logger = logging.getLogger(__name__)
+
+PROJECTION = {field_name: 1 for field_name in NUMERIC_FIELDS}
+PROJECTION.update({"title": 1, "genre": 1, "genres": 1, "Director": 1, "Actors": 1})
+
+LOAD_QUERY = """
+    UNWIND $rows AS row
+    MERGE (f:films {title: row.title})
+    SET f += row.properties
+    FOREACH (name IN row.actors |
+        MERGE (a:Actor {name: name})
+        MERGE (a)-[:A_JOUE]->(f)
+        ON CREATE SET f.partage_indexed = null)
+    FOREACH (name IN row.genres |
+        MERGE (g:Genre {name: name})
+        MERGE (f)-[:A_GENRE]->(g))
+    FOREACH (name IN row.directors |
+        MERGE (r:Realisateur {name: name})
+        MERGE (r)-[:A_REALISE]->(f))
+"""
+
+
+def _names(value):
+    if not isinstance(value, str):
+        return []
+    return [name for name in dict.fromkeys(n.strip() for n in value.split(",")) if name]
+
+
+# Document Mongo (brut ou normalisé) -> ligne du lot
+def to_row(doc):
+    properties = {"title": doc["title"]}
+    for field_name, integer in NUMERIC_FIELDS.items():
+        number = parse_number(doc.get(field_name), integer)
+        if number is not None:
+            properties[field_name] = number
+    if isinstance(doc.get("genre"), str):
+        properties["genre"] = doc["genre"]
+    genres = doc.get("genres") if isinstance(doc.get("genres"), list) else parse_genres(doc.get("genre"))
+    return {
+        "title": doc["title"],
+        "properties": properties,
+        "actors": _names(doc.get("Actors")),
+        "genres": [g for g in dict.fromkeys(genres) if g],
+        "directors": _names(doc.get("Director")),
+    }
+
+
+# Avance le point de reprise sur le plus long préfixe de lots terminés
+class Checkpoint:
+
+    def __init__(self, collection: Collection, restart=False):
+        self._state = collection.database[CHECKPOINTS_COLLECTION]
+        self._key = f"{JOB_NAME}:{collection.name}"
+        self._lock = threading.Lock()
+        self._finished = {}
+        self._next = 0
+        state = None if restart else self._state.find_one({"_id": self._key})
+        self.last_id = state.get("last_id") if state else None
+        self.rows = state.get("rows", 0) if state else 0
+        self._state.update_one(
+            {"_id": self._key},
+            {"$set": {"status": "running", "started_at": datetime.now(timezone.utc),
+                      "last_id": self.last_id, "rows": self.rows}},
+            upsert=True
+        )
+
+    def done(self, sequence, last_id, rows):
+        with self._lock:
+            self._finished[sequence] = (last_id, rows)
+            advanced = False
+            while self._next in self._finished:
+                last_id, rows = self._finished.pop(self._next)
+                self.last_id = last_id
+                self.rows += rows
+                self._next += 1
+                advanced = True
+            if advanced:
+                self._state.update_one({"_id": self._key}, {"$set": {"last_id": self.last_id, "rows": self.rows}})
+
+    def complete(self):
+        self._state.update_one(
+            {"_id": self._key},
+            {"$set": {"status": "complete", "completed_at": datetime.now(timezone.utc)}}
+        )
+
+
+def _batches(collection: Collection, after, batch_size):
+    query = {"title": {"$type": "string"}}
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    cursor = collection.find(query, PROJECTION).sort("_id", ASCENDING).batch_size(batch_size)
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _write_batch(driver, docs):
+    rows = [to_row(doc) for doc in docs]
+    with driver.session() as session:
+        session.execute_write(lambda tx: tx.run(LOAD_QUERY, rows=rows).consume())
+    return len(rows)
+
+
+def load_graph(collection: Collection, driver, batch_size=ETL_BATCH_SIZE, workers=ETL_WORKERS,
+               restart=False, progress=print):
+    if workers > 1:
+        missing = missing_unique_constraints(driver)
+        if missing:
+            logger.warning("Contraintes d'unicité absentes (%s) : chargement sur un seul thread",
+                           ", ".join(f"{label}.{prop}" for label, prop in missing))
+            workers = 1
+    checkpoint = Checkpoint(collection, restart)
+    invalidate_projection(driver)
+    start = time.perf_counter()
+    loaded = 0
+    pending = {}
+
+    def collect(done):
+        nonlocal loaded
+        for future in done:
+            sequence, last_id = pending.pop(future)
+            rows = future.result()
+            checkpoint.done(sequence, last_id, rows)
+            loaded += rows
+        if progress:
+            elapsed = time.perf_counter() - start
+            progress(f"{loaded} films chargés ({loaded / elapsed if elapsed else 0:.0f} lignes/s)")
+
+    # Au plus 2 lots en attente par thread : la lecture suit le rythme des écritures
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="etl") as pool:
+        for sequence, docs in enumerate(_batches(collection, checkpoint.last_id, batch_size)):
+            if len(pending) >= 2 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[pool.submit(_write_batch, driver, docs)] = (sequence, docs[-1]["_id"])
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    checkpoint.complete()
+    query_cache.invalidate("neo4j")
+    elapsed = time.perf_counter() - start
+    return {"rows": loaded, "seconds": elapsed, "rows_per_second": loaded / elapsed if elapsed else 0.0}
+
+
+if __name__ == "__main__":
+    from databases.mongo_connection import connect_mongodb
+    from databases.neo4j_connection import connect_neo4j
+    from queries.neo4j_schema import ensure_graph_schema
+
+    parser = argparse.ArgumentParser(description="Charge le graphe Neo4j depuis la collection films")
+    parser.add_argument("--batch-size", type=int, default=ETL_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=ETL_WORKERS)
+    parser.add_argument("--restart", action="store_true", help="ignore le point de reprise")
+    parser.add_argument("--skip-projection", action="store_true",
+                        help="ne met pas à jour la projection PARTAGE_ACTEURS")
+    args = parser.parse_args()
+
+    driver = connect_neo4j()
+    ensure_graph_schema(driver)
+    stats = load_graph(connect_mongodb(), driver, batch_size=args.batch_size, workers=args.workers,
+                       restart=args.restart)
+    print(f"✅ {stats['rows']} films chargés en {stats['seconds']:.1f} s ({stats['rows_per_second']:.0f} lignes/s)")
+    if not args.skip_projection:
+        print(f"✅ {build_film_projection(driver)} films projetés")
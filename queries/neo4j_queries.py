@@ -1,3 +1,27 @@
+from config.config import COMMUNITY_PAGE_SIZE, PAGE_SIZE
+from queries import film_projection
+from queries.director_influence import build_influence_relations
+from utils.cache import cached
+from utils.instrumentation import instrumented
+from utils.pagination import cypher_after, iter_rows, keyset_page, stream_cypher
+
+# Les moteurs NumPy (chemins, recommandations, communautés) sont importés à la
+# première utilisation : le démarrage de l'application ne charge pas NumPy.
+
+# Durées de vie en cache (secondes) : les requêtes de parcours coûteuses
+# ne changent qu'au chargement des données
+NEO4J_CACHE_TTL = 600
+NEO4J_HEAVY_CACHE_TTL = 3600
+
+# Une ligne en dict : les résultats mis en cache (et persistés sur disque) ne
+# contiennent pas d'objets Record du driver, qui ne se relisent pas avec pickle
+def _single_row(result):
+    record = result.single()
+    return record.data() if record is not None else None
+
+
+@cached(ttl=NEO4J_HEAVY_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def top_actor_by_films(driver):
     with driver.session() as session:
         result = session.run("""
@@ -6,17 +30,10 @@ def top_actor_by_films(driver):
             ORDER BY nb_films DESC
             LIMIT 1
         """)
-        return result.single()
-
-def actors_with_anne_hathaway(driver):
-    with driver.session() as session:
-        result = session.run("""
-            MATCH (a:Actor)-[:A_JOUE]->(f:films)<-[:A_JOUE]-(anne:Actor {name: "Anne Hathaway"})
-            WHERE a.name <> "Anne Hathaway"
-            RETURN DISTINCT a.name AS acteur
-        """)
-        return [record["acteur"] for record in result]
+        return _single_row(result)
 
+@cached(ttl=NEO4J_HEAVY_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def top_actor_by_revenue(driver):
     with driver.session() as session:
         result = session.run("""
@@ -27,8 +44,10 @@ def top_actor_by_revenue(driver):
             ORDER BY total_revenue DESC
             LIMIT 1
         """)
-        return result.single()
+        return _single_row(result)
 
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def avg_votes(driver):
     with driver.session() as session:
         result = session.run("""
@@ -38,6 +57,8 @@ def avg_votes(driver):
         """)
         return result.single()["moyenne_votes"]
 
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def top_genre(driver):
     with driver.session() as session:
         result = session.run("""
@@ -46,17 +67,67 @@ def top_genre(driver):
             ORDER BY nb_films DESC
             LIMIT 1
         """)
-        return result.single()
-
-def films_with_my_coworkers(driver, my_name="Ton Nom"):
-    with driver.session() as session:
-        result = session.run("""
-            MATCH (me:Actor {name: $my_name})-[:A_JOUE]->(:films)<-[:A_JOUE]-(a:Actor)
-            MATCH (a)-[:A_JOUE]->(f:films)
-            RETURN DISTINCT f.title AS film
-        """, my_name=my_name)
-        return [record["film"] for record in result]
-
+        return _single_row(result)
+
+# Point de départ d'une requête : acteur par nom, ou par elementId (résolu par actor_lookup.py)
+def _actor_anchor(variable, parameter, by_id):
+    if by_id:
+        return f"MATCH ({variable}:Actor) WHERE elementId({variable}) = ${parameter}"
+    return f"MATCH ({variable}:Actor {{name: ${parameter}}})"
+
+# Co-acteurs d'un acteur, par pages triées sur (nom, elementId). La clé et le
+# LIMIT s'appliquent avant le comptage des films communs : seuls les acteurs de
+# la page sont agrégés. Les acteurs sans nom n'ont pas de clé et sont écartés.
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
+def co_actors(driver, actor, page=1, page_size=PAGE_SIZE, by_id=False):
+    query = f"""
+        {_actor_anchor("me", "actor", by_id)}
+        WITH collect(me) AS mes
+        UNWIND mes AS me
+        MATCH (me)-[:A_JOUE]->(:films)<-[:A_JOUE]-(a:Actor)
+        WHERE NOT a IN mes AND a.name IS NOT NULL AND {cypher_after(["a.name", "elementId(a)"])}
+        WITH DISTINCT mes, a
+        ORDER BY a.name, elementId(a)
+        LIMIT $limit
+        UNWIND mes AS me
+        MATCH (a)-[:A_JOUE]->(f:films)<-[:A_JOUE]-(me)
+        RETURN a.name AS acteur, elementId(a) AS id, count(DISTINCT f) AS films_communs
+        ORDER BY acteur, id
+    """
+
+    def fetch(after, limit):
+        return list(stream_cypher(driver, query, {"actor": actor, "after": after, "limit": limit}))
+
+    return keyset_page("co_actors", fetch, lambda r: [r["acteur"], r["id"]], page, page_size, (actor, by_id))
+
+# Liste complète des co-acteurs d'Anne Hathaway (API d'origine, lue page par page)
+def actors_with_anne_hathaway(driver):
+    return list(dict.fromkeys(r["acteur"] for r in iter_rows(co_actors, driver, "Anne Hathaway")))
+
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
+def films_with_my_coworkers(driver, my_name="Ton Nom", by_id=False, page=1, page_size=PAGE_SIZE):
+    query = f"""
+        {_actor_anchor("me", "my_name", by_id)}
+        MATCH (me)-[:A_JOUE]->(:films)<-[:A_JOUE]-(a:Actor)
+        WITH DISTINCT a
+        MATCH (a)-[:A_JOUE]->(f:films)
+        WHERE f.title IS NOT NULL AND {cypher_after(["f.title", "elementId(f)"])}
+        WITH DISTINCT f
+        ORDER BY f.title, elementId(f)
+        LIMIT $limit
+        RETURN f.title AS film, elementId(f) AS id
+    """
+
+    def fetch(after, limit):
+        return list(stream_cypher(driver, query, {"my_name": my_name, "after": after, "limit": limit}))
+
+    return keyset_page("films_with_my_coworkers", fetch, lambda r: [r["film"], r["id"]], page, page_size,
+                       (my_name, by_id))
+
+@cached(ttl=NEO4J_HEAVY_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def top_director_by_distinct_actors(driver):
     with driver.session() as session:
         result = session.run("""
@@ -65,9 +136,17 @@ def top_director_by_distinct_actors(driver):
             ORDER BY nb_acteurs DESC
             LIMIT 1
         """)
-        return result.single()
+        return _single_row(result)
 
+# Lecture de la projection PARTAGE_ACTEURS si elle est complète et à jour
+# (film_projection.py), sinon requête directe sur le graphe
+@cached(ttl=NEO4J_HEAVY_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def most_connected_film(driver):
+    if film_projection.projection_ready(driver):
+        projected = film_projection.most_connected_film(driver)
+        if projected is not None:
+            return projected
     with driver.session() as session:
         result = session.run("""
             MATCH (f1:films)<-[:A_JOUE]-(a:Actor)-[:A_JOUE]->(f2:films)
@@ -77,8 +156,26 @@ def most_connected_film(driver):
             ORDER BY connexions DESC
             LIMIT 1
         """)
-        return result.single()
+        return _single_row(result)
+
+# Même règle : voisinage PARTAGE_ACTEURS si la projection est à jour
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
+def similar_films(driver, title, k=5):
+    if film_projection.projection_ready(driver):
+        return film_projection.similar_films(driver, title, k)
+    with driver.session() as session:
+        result = session.run("""
+            MATCH (f:films {title: $title})<-[:A_JOUE]-(a:Actor)-[:A_JOUE]->(g:films)
+            WHERE f <> g
+            RETURN g.title AS film, count(DISTINCT a) AS acteurs_communs
+            ORDER BY acteurs_communs DESC, film
+            LIMIT $k
+        """, title=title, k=k)
+        return result.data()
 
+@cached(ttl=NEO4J_HEAVY_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def top_5_actors_by_directors(driver):
     with driver.session() as session:
         result = session.run("""
@@ -89,7 +186,17 @@ def top_5_actors_by_directors(driver):
         """)
         return result.data()
 
-def recommend_by_genres(driver, actor_name):
+# Films classés par similarité de genres et films des co-acteurs (voir recommendations.py)
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
+def recommend_by_genres(driver, actor_name, k=5, by_id=False):
+    from queries.recommendations import recommend_for_actors
+    return [title for title, _ in recommend_for_actors(driver, [actor_name], k, by_id)[actor_name]]
+
+# Version Cypher d'origine (non classée), gardée comme référence de mesure
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
+def recommend_by_genres_cypher(driver, actor_name):
     with driver.session() as session:
         result = session.run("""
             MATCH (a:Actor {name: $actor_name})-[:A_JOUE]->(:films)-[:A_GENRE]->(g:Genre)
@@ -102,48 +209,36 @@ def recommend_by_genres(driver, actor_name):
         """, actor_name=actor_name)
         return [record["titre"] for record in result]
 
-def create_director_influence_relations(driver):
-    with driver.session() as session:
-        session.run("""
-            MATCH (r1:Realisateur)-[:A_REALISE]->(:films)-[:A_GENRE]->(g:Genre),
-                  (r2:Realisateur)-[:A_REALISE]->(:films)-[:A_GENRE]->(g)
-            WHERE r1 <> r2
-            MERGE (r1)-[:INFLUENCE_PAR]->(r2)
-        """)
+@instrumented("neo4j", sample_rate=0)
+def create_director_influence_relations(driver, incremental=False, weighted=False):
+    # Job par lots genre par genre, reprenable (voir director_influence.py)
+    return build_influence_relations(driver, incremental=incremental, weighted=weighted, progress=None)
 
 
-def shortest_path_between_actors(driver, actor1, actor2):
-    with driver.session() as session:
-        result = session.run("""
-            MATCH (a1:Actor {name: $a1}), (a2:Actor {name: $a2}),
-            p = shortestPath((a1)-[:A_JOUE*]-(a2))
-            RETURN nodes(p) AS nodes, relationships(p) AS rels
-        """, a1=actor1, a2=actor2)
-
-        if not result.peek():
-            return None
-
-        record = result.single()
-        nodes = record["nodes"]
-        rels = record["rels"]
-        path_list = []
-
-        for i in range(len(rels)):
-            n1 = nodes[i]
-            n2 = nodes[i + 1]
-            r = rels[i]
-            path_list.append(f"{n1['name'] if 'name' in n1 else n1.get('title')} "
-                             f"--[{r.type}]--> "
-                             f"{n2['name'] if 'name' in n2 else n2.get('title')}")
-        return path_list
+@cached(ttl=NEO4J_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
+def shortest_path_between_actors(driver, actor1, actor2, by_id=False):
+    # Profondeur bornée, BFS local ou Cypher selon PATH_METHOD (voir path_service.py)
+    from queries.path_service import PathService
+    return PathService(driver).shortest_path(actor1, actor2, by_id=by_id)
 
+# GDS si disponible, sinon propagation de labels locale (voir communities.py).
+# communityId est écrit sur les nœuds : seul le résumé reste en cache.
+@cached(ttl=NEO4J_HEAVY_CACHE_TTL, tags=("neo4j",))
+@instrumented("neo4j")
 def detect_actor_communities(driver):
-    with driver.session() as session:
-        session.run("CALL gds.graph.project('actorGraph', 'Actor', 'A_JOUE')")
-        result = session.run("""
-            CALL gds.louvain.stream('actorGraph')
-            YIELD nodeId, communityId
-            RETURN gds.util.asNode(nodeId).name AS acteur, communityId
-            ORDER BY communityId
-        """)
-        return result.data()
\ No newline at end of file
+    from queries.communities import detect_communities, summarize
+    return summarize(detect_communities(driver))
+
+# Acteurs par communauté (0 = la plus grande), lus par pages depuis les nœuds
+@instrumented("neo4j")
+def community_members(driver, page=1, page_size=COMMUNITY_PAGE_SIZE):
+    from queries.communities import COMMUNITY_PAGE_QUERY
+
+    def fetch(after, limit):
+        return list(stream_cypher(driver, COMMUNITY_PAGE_QUERY, {"after": after, "limit": limit}))
+
+    return keyset_page("communities", fetch, lambda r: [r["communityId"], r["acteur"], r["id"]], page, page_size)
+
+def actor_communities_page(driver, page=1, page_size=COMMUNITY_PAGE_SIZE):
+    return {**detect_actor_communities(driver), "page": community_members(driver, page, page_size)}
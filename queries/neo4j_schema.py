@@ -0,0 +1,257 @@
+import argparse
+import logging
+import sys
+
+from neo4j.exceptions import ClientError, DatabaseError
+
+from queries import neo4j_queries
+from queries.path_service import PathService
+from queries.recommendations import recommend_cypher
+from utils.instrumentation import profiled
+
+# Contraintes et index du graphe, et vérification des plans d'exécution (PROFILE).
+# Usage : python -m queries.neo4j_schema [--verify-only] [--actor "Anne Hathaway"] [--other "Tom Hanks"]
+
+# Clés de recherche : (label, propriété)
+LOOKUP_KEYS = [
+    ("Actor", "name"),
+    ("films", "title"),
+    ("Genre", "name"),
+    ("Realisateur", "name"),
+]
+
+# Index texte pour les prédicats CONTAINS / STARTS WITH sur les noms affichés
+TEXT_KEYS = [
+    ("Actor", "name"),
+    ("films", "title"),
+]
+
+# Index plein texte (Lucene) : suggestions et recherche approchée (actor_lookup.py)
+FULLTEXT_KEYS = [
+    ("Actor", "name"),
+]
+
+# Index range sans contrainte : tri du film le plus connecté (film_projection.py),
+# pagination des communautés (communities.py)
+RANGE_KEYS = [
+    ("films", "connexions"),
+    ("Actor", "communityId"),
+]
+
+# Délai d'attente de la mise en ligne des index (secondes)
+AWAIT_INDEXES_TIMEOUT = 300
+
+# Opérateurs de plan qui parcourent tout un label ou toute la base
+SCAN_OPERATORS = {"NodeByLabelScan", "AllNodesScan"}
+
+logger = logging.getLogger(__name__)
+
+
+def _constraint_name(label, prop):
+    return f"{label.lower()}_{prop}_unique"
+
+
+def _range_index_name(label, prop):
+    return f"{label.lower()}_{prop}_range"
+
+
+def _text_index_name(label, prop):
+    return f"{label.lower()}_{prop}_text"
+
+
+def _fulltext_index_name(label, prop):
+    return f"{label.lower()}_{prop}_fulltext"
+
+
+# Idempotent (IF NOT EXISTS). Une contrainte d'unicité crée aussi l'index range
+# de la propriété ; si des doublons existent déjà, on se rabat sur un index range
+# simple (avertissement dans le journal, nom *_range dans le résultat). Sans la
+# contrainte, load_graph (mongo_to_neo4j.py) charge sur un seul thread.
+def ensure_graph_schema(driver, timeout=AWAIT_INDEXES_TIMEOUT):
+    created = []
+    with driver.session() as session:
+        for label, prop in LOOKUP_KEYS:
+            try:
+                session.run(
+                    f"CREATE CONSTRAINT {_constraint_name(label, prop)} IF NOT EXISTS "
+                    f"FOR (n:`{label}`) REQUIRE n.`{prop}` IS UNIQUE"
+                ).consume()
+                created.append(_constraint_name(label, prop))
+            except (ClientError, DatabaseError) as e:
+                logger.warning("Contrainte d'unicité impossible sur %s.%s (%s) : index range à la place",
+                               label, prop, e.code)
+                session.run(
+                    f"CREATE INDEX {_range_index_name(label, prop)} IF NOT EXISTS "
+                    f"FOR (n:`{label}`) ON (n.`{prop}`)"
+                ).consume()
+                created.append(_range_index_name(label, prop))
+
+        for label, prop in TEXT_KEYS:
+            session.run(
+                f"CREATE TEXT INDEX {_text_index_name(label, prop)} IF NOT EXISTS "
+                f"FOR (n:`{label}`) ON (n.`{prop}`)"
+            ).consume()
+            created.append(_text_index_name(label, prop))
+
+        for label, prop in FULLTEXT_KEYS:
+            session.run(
+                f"CREATE FULLTEXT INDEX {_fulltext_index_name(label, prop)} IF NOT EXISTS "
+                f"FOR (n:`{label}`) ON EACH [n.`{prop}`]"
+            ).consume()
+            created.append(_fulltext_index_name(label, prop))
+
+        for label, prop in RANGE_KEYS:
+            session.run(
+                f"CREATE INDEX {_range_index_name(label, prop)} IF NOT EXISTS "
+                f"FOR (n:`{label}`) ON (n.`{prop}`)"
+            ).consume()
+            created.append(_range_index_name(label, prop))
+
+        session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+    return created
+
+
+# Clés de LOOKUP_KEYS sans contrainte d'unicité en base
+def missing_unique_constraints(driver):
+    with driver.session() as session:
+        rows = session.run("""
+            SHOW CONSTRAINTS YIELD type, labelsOrTypes, properties
+            RETURN type, labelsOrTypes, properties
+        """).data()
+    unique = {
+        (row["labelsOrTypes"][0], row["properties"][0]) for row in rows
+        if "UNIQUENESS" in row["type"] and len(row["labelsOrTypes"] or []) == 1 and len(row["properties"] or []) == 1
+    }
+    return [(label, prop) for label, prop in LOOKUP_KEYS if (label, prop) not in unique]
+
+
+def index_states(driver):
+    with driver.session() as session:
+        result = session.run("""
+            SHOW INDEXES YIELD name, type, labelsOrTypes, properties, state
+            WHERE labelsOrTypes IS NOT NULL
+            RETURN name, type, labelsOrTypes, properties, state
+        """)
+        return result.data()
+
+
+# Session qui préfixe chaque requête par PROFILE et garde le plan mesuré
+class _ProfilingSession:
+
+    def __init__(self, session, profiles):
+        self._session = session
+        self._profiles = profiles
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Appelé aussi par une session qui l'enveloppe (utils.instrumentation)
+    def close(self):
+        try:
+            for result in self._results:
+                self._profiles.append(result.consume().profile)
+            self._results = []
+        finally:
+            self._session.close()
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def run(self, query, parameters=None, **kwargs):
+        result = self._session.run(query if profiled(query) else "PROFILE " + query, parameters, **kwargs)
+        self._results.append(result)
+        return result
+
+
+class _ProfilingDriver:
+
+    def __init__(self, driver):
+        self._driver = driver
+        self.profiles = []
+
+    def session(self, **kwargs):
+        return _ProfilingSession(self._driver.session(**kwargs), self.profiles)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def _operators(plan):
+    operators = [plan.get("operatorType", "").split("@")[0]]
+    for child in plan.get("children", []):
+        operators += _operators(child)
+    return operators
+
+
+# Fonctions de lecture ancrées sur une clé : elles doivent utiliser un index.
+# Les autres agrègent tout un label par construction ; elles sont listées
+# dans le rapport sans faire échouer la vérification.
+def _profiled_calls(actor, other, film):
+    return {
+        "co_actors": (lambda d: neo4j_queries.co_actors.uncached(d, actor), True),
+        "films_with_my_coworkers": (lambda d: neo4j_queries.films_with_my_coworkers.uncached(d, my_name=actor), True),
+        "recommend_by_genres_cypher": (lambda d: neo4j_queries.recommend_by_genres_cypher.uncached(d, actor), True),
+        "recommend_cypher": (lambda d: recommend_cypher(d, actor), True),
+        "shortest_path_between_actors": (
+            lambda d: PathService(d, method="cypher", use_snapshot=False).shortest_path(actor, other), True),
+        "similar_films": (lambda d: neo4j_queries.similar_films.uncached(d, film), True),
+        "top_actor_by_films": (lambda d: neo4j_queries.top_actor_by_films.uncached(d), False),
+        "top_actor_by_revenue": (lambda d: neo4j_queries.top_actor_by_revenue.uncached(d), False),
+        "avg_votes": (lambda d: neo4j_queries.avg_votes.uncached(d), False),
+        "top_genre": (lambda d: neo4j_queries.top_genre.uncached(d), False),
+        "top_director_by_distinct_actors": (
+            lambda d: neo4j_queries.top_director_by_distinct_actors.uncached(d), False),
+        "most_connected_film": (lambda d: neo4j_queries.most_connected_film.uncached(d), False),
+        "top_5_actors_by_directors": (lambda d: neo4j_queries.top_5_actors_by_directors.uncached(d), False),
+    }
+
+
+def verify_graph_plans(driver, actor="Anne Hathaway", other="Tom Hanks", film="Inception"):
+    report = {}
+    for name, (call, checked) in _profiled_calls(actor, other, film).items():
+        profiling = _ProfilingDriver(driver)
+        call(profiling)
+        operators = [op for plan in profiling.profiles if plan for op in _operators(plan)]
+        problems = []
+        if checked:
+            problems += sorted(SCAN_OPERATORS.intersection(operators))
+            if not any("IndexSeek" in op for op in operators):
+                problems.append("aucun IndexSeek")
+        report[name] = {"operators": operators, "problems": problems, "checked": checked}
+    return report
+
+
+def failing_functions(report):
+    return {name: r["problems"] for name, r in report.items() if r["checked"] and r["problems"]}
+
+
+if __name__ == "__main__":
+    from databases.neo4j_connection import connect_neo4j
+
+    parser = argparse.ArgumentParser(description="Crée les contraintes/index Neo4j et vérifie les plans (PROFILE)")
+    parser.add_argument("--verify-only", action="store_true", help="ne crée pas le schéma")
+    parser.add_argument("--actor", default="Anne Hathaway")
+    parser.add_argument("--other", default="Tom Hanks")
+    parser.add_argument("--film", default="Inception")
+    args = parser.parse_args()
+
+    driver = connect_neo4j()
+    if not args.verify_only:
+        print("Schéma :", ", ".join(ensure_graph_schema(driver)))
+    for index in index_states(driver):
+        print(f"   {index['name']:<28} {index['type']:<6} {index['state']}")
+
+    report = verify_graph_plans(driver, args.actor, args.other, args.film)
+    for name, r in report.items():
+        status = "❌" if r["checked"] and r["problems"] else ("✅" if r["checked"] else "·")
+        leaves = [op for op in r["operators"] if "Seek" in op or "Scan" in op]
+        print(f"{status} {name:<32} {', '.join(dict.fromkeys(leaves))}")
+
+    failures = failing_functions(report)
+    if failures:
+        print(f"Régressions de plan : {failures}")
+        sys.exit(1)
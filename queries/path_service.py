@@ -0,0 +1,184 @@
+import os
+
+import numpy as np
+
+from config.config import GRAPH_SNAPSHOT, GRAPH_SNAPSHOT_DIR, PATH_MAX_HOPS, PATH_METHOD
+
+# Service de plus courts chemins entre acteurs :
+#   - profondeur bornée (max_hops relations A_JOUE)
+#   - méthode "bfs" (BFS bidirectionnel sur la copie CSR locale) ou "cypher"
+#   - plusieurs couples en un seul appel (UNWIND côté Cypher)
+#   - k plus courts chemins sur demande (Cypher SHORTEST k, Neo4j 5.21+)
+#   - échec immédiat si les deux acteurs sont dans des composantes différentes :
+#     composantes de la copie locale dès qu'elle existe (aussi en mode "cypher"),
+#     sinon contrôle Cypher borné (acteurs présents et ayant joué dans un film)
+#   - acteurs désignés par leur nom ou par elementId (by_id=True, voir actor_lookup.py)
+
+ANCHOR_BY_NAME = "MATCH (a1:Actor {name: pair.a1}), (a2:Actor {name: pair.a2})"
+ANCHOR_BY_ID = "MATCH (a1:Actor), (a2:Actor) WHERE elementId(a1) = pair.a1 AND elementId(a2) = pair.a2"
+
+CYPHER_SHORTEST = """
+    UNWIND $pairs AS pair
+    {anchor}
+    WITH pair, a1, a2 WHERE a1 <> a2
+    MATCH p = shortestPath((a1)-[:A_JOUE*..{max_hops}]-(a2))
+    RETURN pair.a1 AS a1, pair.a2 AS a2, [n IN nodes(p) | coalesce(n.name, n.title)] AS names
+"""
+
+# Contrôle borné, sans parcours : un acteur sans film ne peut être relié à personne
+CYPHER_CANDIDATES = """
+    UNWIND $pairs AS pair
+    {anchor}
+    WITH pair, a1, a2
+    WHERE a1 <> a2 AND EXISTS {{ (a1)-[:A_JOUE]->() }} AND EXISTS {{ (a2)-[:A_JOUE]->() }}
+    RETURN DISTINCT pair.a1 AS a1, pair.a2 AS a2
+"""
+
+CYPHER_K_SHORTEST = """
+    UNWIND $pairs AS pair
+    {anchor}
+    WITH pair, a1, a2 WHERE a1 <> a2
+    MATCH p = SHORTEST {k} (a1)-[:A_JOUE]-{{1,{max_hops}}}(a2)
+    RETURN pair.a1 AS a1, pair.a2 AS a2, [n IN nodes(p) | coalesce(n.name, n.title)] AS names
+"""
+
+
+def format_steps(names):
+    return [f"{names[i]} --[A_JOUE]--> {names[i + 1]}" for i in range(len(names) - 1)]
+
+
+class PathService:
+
+    # use_snapshot : composantes de la copie locale (None = si elle existe déjà)
+    def __init__(self, driver, max_hops=PATH_MAX_HOPS, method=PATH_METHOD, use_snapshot=None):
+        if method not in ("bfs", "cypher"):
+            raise ValueError(f"méthode inconnue : {method}")
+        self.driver = driver
+        self.max_hops = int(max_hops)
+        self.method = method
+        self.use_snapshot = use_snapshot
+        self._snapshot = None
+
+    def snapshot(self):
+        if self._snapshot is None:
+            from queries.graph_snapshot import get_snapshot
+            self._snapshot = get_snapshot(self.driver)
+        return self._snapshot
+
+    def shortest_path(self, actor1, actor2, k=1, by_id=False):
+        paths = self.shortest_paths([(actor1, actor2)], k=k, by_id=by_id)[(actor1, actor2)]
+        if k == 1:
+            return paths[0] if paths else None
+        return paths
+
+    # {(acteur1, acteur2): [chemin, ...]} ; liste vide si aucun chemin
+    def shortest_paths(self, pairs, k=1, by_id=False):
+        pairs = [tuple(p) for p in pairs]
+        results = {pair: [] for pair in pairs}
+        distinct = [pair for pair in dict.fromkeys(pairs) if pair[0] != pair[1]]
+        reachable = self._reachable(distinct, by_id) if distinct else set()
+        candidates = [pair for pair in distinct if pair in reachable]
+        if not candidates:
+            return results
+
+        if self.method == "bfs" and k == 1:
+            snapshot = self.snapshot()
+            for a1, a2 in candidates:
+                path = bidirectional_bfs(snapshot, a1, a2, self.max_hops, by_id)
+                if path:
+                    results[(a1, a2)] = [format_steps(path)]
+            return results
+
+        anchor = ANCHOR_BY_ID if by_id else ANCHOR_BY_NAME
+        query = CYPHER_SHORTEST.format(anchor=anchor, max_hops=self.max_hops) if k == 1 \
+            else CYPHER_K_SHORTEST.format(anchor=anchor, k=int(k), max_hops=self.max_hops)
+        with self.driver.session() as session:
+            records = session.run(query, pairs=[{"a1": a1, "a2": a2} for a1, a2 in candidates])
+            for record in records:
+                results[(record["a1"], record["a2"])].append(format_steps(record["names"]))
+
+        for pair, paths in results.items():
+            paths.sort(key=len)
+            del paths[k:]
+        return results
+
+    # Copie locale utilisable sans la construire exprès : mode bfs, GRAPH_SNAPSHOT,
+    # ou fichiers déjà écrits par graph_snapshot.py
+    def _local_snapshot(self):
+        use = self.use_snapshot
+        if use is None:
+            use = GRAPH_SNAPSHOT or os.path.exists(os.path.join(GRAPH_SNAPSHOT_DIR, "names.json"))
+        return self.snapshot() if use or self.method == "bfs" else None
+
+    # Couples qui peuvent être reliés. Un acteur absent de la copie locale (ajouté
+    # depuis le dernier rafraîchissement) passe par le contrôle Cypher.
+    def _reachable(self, pairs, by_id=False):
+        reachable, unknown = set(), list(pairs)
+        snapshot = self._local_snapshot()
+        if snapshot is not None:
+            unknown = []
+            for pair in pairs:
+                if not all(len(snapshot._actor_ids(actor, by_id)) for actor in pair):
+                    unknown.append(pair)
+                elif snapshot.same_component(*pair, by_id=by_id):
+                    reachable.add(pair)
+        if unknown:
+            anchor = ANCHOR_BY_ID if by_id else ANCHOR_BY_NAME
+            with self.driver.session() as session:
+                records = session.run(CYPHER_CANDIDATES.format(anchor=anchor),
+                                      pairs=[{"a1": a1, "a2": a2} for a1, a2 in unknown])
+                reachable.update((record["a1"], record["a2"]) for record in records)
+        return reachable
+
+
+# BFS bidirectionnel : on étend toujours le côté dont la frontière est la plus petite
+def bidirectional_bfs(snapshot, actor1, actor2, max_hops=PATH_MAX_HOPS, by_id=False):
+    from queries.graph_snapshot import gather_rows
+
+    sources, targets = snapshot._actor_ids(actor1, by_id), snapshot._actor_ids(actor2, by_id)
+    if len(sources) == 0 or len(targets) == 0:
+        return None
+
+    sizes = {"actor": len(snapshot.actor_names), "film": len(snapshot.film_titles)}
+    adjacency = {"actor": (snapshot.a2f_ptr, snapshot.a2f), "film": (snapshot.f2a_ptr, snapshot.f2a)}
+    other = {"actor": "film", "film": "actor"}
+
+    sides = []
+    for start in (sources, targets):
+        parents = {kind: np.full(size, -2, dtype=np.int64) for kind, size in sizes.items()}
+        parents["actor"][start] = -1
+        sides.append({"parents": parents, "frontier": start, "kind": "actor"})
+
+    hops = 0
+    while hops < max_hops and all(len(side["frontier"]) for side in sides):
+        current, opposite = sorted(sides, key=lambda side: len(side["frontier"]))
+        indptr, indices = adjacency[current["kind"]]
+        owners, reached = gather_rows(indptr, indices, current["frontier"])
+        reached, first = np.unique(reached, return_index=True)
+
+        next_kind = other[current["kind"]]
+        parents = current["parents"][next_kind]
+        fresh = parents[reached] == -2
+        reached = reached[fresh]
+        parents[reached] = current["frontier"][owners[first[fresh]]]
+        current["frontier"], current["kind"] = reached, next_kind
+        hops += 1
+
+        meeting = reached[opposite["parents"][next_kind][reached] != -2]
+        if len(meeting):
+            node = int(meeting[0])
+            forward, backward = (current, opposite) if current is sides[0] else (opposite, current)
+            head = _walk(forward["parents"], next_kind, node)
+            tail = _walk(backward["parents"], next_kind, node)
+            nodes = list(reversed(head)) + tail[1:]
+            return [snapshot.actor_names[n] if kind == "actor" else snapshot.film_titles[n] for kind, n in nodes]
+    return None
+
+
+def _walk(parents, kind, node):
+    nodes = [(kind, node)]
+    while parents[kind][node] >= 0:
+        node = int(parents[kind][node])
+        kind = "film" if kind == "actor" else "actor"
+        nodes.append((kind, node))
+    return nodes
@@ -0,0 +1,198 @@
+import threading
+
+import numpy as np
+
+from config.config import GRAPH_SNAPSHOT, GRAPH_SNAPSHOT_BATCH, RECO_COACTOR_WEIGHT, RECO_MAX_CELLS
+from queries.graph_snapshot import build_csr, gather_rows, get_snapshot
+
+# Moteur de recommandation par lots, sur la copie CSR du graphe :
+#   - profil de genres de l'acteur = (acteur × film) · (film × genre), le film × genre
+#     étant lui aussi une matrice CSR (quelques genres par film)
+#   - score = cosinus(profil, genres du film) + poids × films des co-acteurs (normalisé)
+#   - films déjà joués exclus, top-k par argpartition
+#   - des milliers d'acteurs en un appel : matrice de scores calculée par blocs
+#     d'au plus RECO_MAX_CELLS cellules
+# Sans GRAPH_SNAPSHOT=1, la copie n'est pas chargée : même cosinus de genres calculé
+# en Cypher, sans le terme des co-acteurs.
+# Par nom, un homonyme n'est jamais choisi au hasard : l'acteur doit alors être
+# désigné par son elementId (by_id=True, voir actor_lookup.py).
+
+GENRES_QUERY = """
+    MATCH (f:films)-[:A_GENRE]->(g:Genre)
+    RETURN elementId(f) AS film_id, f.title AS film_title, g.name AS genre
+"""
+
+ACTOR_IDS_QUERY = """
+    MATCH (a:Actor {name: $name})
+    RETURN elementId(a) AS id
+"""
+
+# Poids de genre = nombre de films de l'acteur dans le genre ; chaque film candidat
+# a un vecteur de genres à 1, normalisé par la racine de son nombre de genres
+CYPHER_QUERY = """
+    MATCH (a:Actor) WHERE elementId(a) = $actor_id
+    MATCH (a)-[:A_JOUE]->(:films)-[:A_GENRE]->(g:Genre)
+    WITH a, g, count(*) AS weight
+    WITH a, collect([g, weight]) AS profile, sqrt(sum(weight * weight)) AS norm
+    UNWIND profile AS entry
+    WITH a, norm, entry[0] AS g, entry[1] AS weight
+    MATCH (g)<-[:A_GENRE]-(f:films)
+    WHERE NOT (a)-[:A_JOUE]->(f)
+    WITH f, norm, sum(weight) AS overlap
+    WITH f, overlap / (norm * sqrt(toFloat(COUNT { (f)-[:A_GENRE]->(:Genre) }))) AS score
+    RETURN f.title AS title, score
+    ORDER BY score DESC, title
+    LIMIT $k
+"""
+
+
+def _ambiguous(name, ids):
+    return ValueError(f"Plusieurs acteurs s'appellent « {name} » ({', '.join(ids)}) : "
+                      f"désigner l'acteur par son elementId (by_id=True)")
+
+
+class RecommendationEngine:
+
+    def __init__(self, snapshot, film_genre_rows, coactor_weight=RECO_COACTOR_WEIGHT):
+        self.snapshot = snapshot
+        self.coactor_weight = coactor_weight
+        # Films sans acteur : ajoutés après ceux de la copie
+        self.film_titles = list(snapshot.film_titles)
+        film_keys = dict(snapshot.film_keys)
+        genre_ids = {}
+        films, genres = [], []
+        for key, title, genre in film_genre_rows:
+            local = film_keys.get(key)
+            if local is None:
+                local = film_keys[key] = len(self.film_titles)
+                self.film_titles.append(title)
+            films.append(local)
+            genres.append(genre_ids.setdefault(genre, len(genre_ids)))
+        self.genres = list(genre_ids)
+
+        # Film × genre en CSR, couples (film, genre) dédoublonnés ; chaque film pèse
+        # 1 / racine(nombre de genres) (vecteur de genres normalisé)
+        n_films, n_genres = len(self.film_titles), max(1, len(self.genres))
+        codes = np.unique(np.asarray(films, dtype=np.int64) * n_genres + np.asarray(genres, dtype=np.int64))
+        self.fg_ptr, self.fg_genres = build_csr(codes // n_genres, codes % n_genres, n_films)
+        counts = np.diff(self.fg_ptr)
+        self.fg_weight = (1.0 / np.sqrt(np.maximum(counts, 1))).astype(np.float32)
+
+    @classmethod
+    def load(cls, driver, snapshot=None, batch_size=GRAPH_SNAPSHOT_BATCH):
+        snapshot = snapshot if snapshot is not None else get_snapshot(driver)
+        with driver.session(fetch_size=batch_size) as session:
+            rows = [(r["film_id"], r["film_title"], r["genre"]) for r in session.run(GENRES_QUERY)]
+        return cls(snapshot, rows)
+
+    # Films joués par chaque acteur du lot : (ligne du lot, film)
+    def _seen(self, actor_ids):
+        return gather_rows(self.snapshot.a2f_ptr, self.snapshot.a2f, actor_ids)
+
+    def _coactor_scores(self, actor_ids, seen_owners, seen_films):
+        # acteur -> films -> co-acteurs (comptés une fois par film commun) -> leurs films
+        coactor_owners, coactors = gather_rows(self.snapshot.f2a_ptr, self.snapshot.f2a, seen_films)
+        coactor_owners = seen_owners[coactor_owners]
+        keep = coactors != np.asarray(actor_ids)[coactor_owners]
+        coactor_owners, coactors = coactor_owners[keep], coactors[keep]
+        film_owners, films = gather_rows(self.snapshot.a2f_ptr, self.snapshot.a2f, coactors)
+        scores = np.zeros((len(actor_ids), len(self.film_titles)), dtype=np.float32)
+        np.add.at(scores, (coactor_owners[film_owners], films), 1.0)
+        peaks = scores.max(axis=1, keepdims=True)
+        return scores / np.where(peaks == 0, 1.0, peaks)
+
+    def score(self, actor_ids):
+        actor_ids = np.asarray(actor_ids, dtype=np.int64)
+        seen_owners, seen_films = self._seen(actor_ids)
+        genre_owners, seen_genres = gather_rows(self.fg_ptr, self.fg_genres, seen_films)
+        profiles = np.zeros((len(actor_ids), len(self.genres)), dtype=np.float32)
+        np.add.at(profiles, (seen_owners[genre_owners], seen_genres), 1.0)
+        norms = np.linalg.norm(profiles, axis=1, keepdims=True)
+        profiles /= np.where(norms == 0, 1.0, norms)
+
+        # Produit par la matrice creuse : somme des poids de profil sur les genres de
+        # chaque film, par différence de sommes cumulées le long de fg_genres
+        sums = np.zeros((len(actor_ids), len(self.fg_genres) + 1), dtype=np.float64)
+        np.cumsum(profiles[:, self.fg_genres], axis=1, out=sums[:, 1:])
+        scores = (sums[:, self.fg_ptr[1:]] - sums[:, self.fg_ptr[:-1]]).astype(np.float32) * self.fg_weight
+
+        if self.coactor_weight:
+            scores += self.coactor_weight * self._coactor_scores(actor_ids, seen_owners, seen_films)
+        scores[seen_owners, seen_films] = -np.inf
+        return scores
+
+    @staticmethod
+    def top_k(scores, k):
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return np.empty((len(scores), 0), dtype=np.int64)
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=1)
+
+    # {nom d'acteur: [(titre, score), ...]} ; acteurs inconnus -> liste vide.
+    # by_id=True : acteurs désignés par elementId (homonymes distingués) ; par nom,
+    # un homonyme lève ValueError
+    def recommend(self, actor_names, k=5, by_id=False):
+        names = list(dict.fromkeys(actor_names))
+        results = {name: [] for name in names}
+        if by_id:
+            keys = self.snapshot.actor_keys
+            known = [(key, keys[key]) for key in names if key in keys]
+        else:
+            by_name = self.snapshot.actor_by_name
+            known = []
+            for name in names:
+                actors = by_name.get(name, [])
+                if len(actors) > 1:
+                    ids = {local: key for key, local in self.snapshot.actor_keys.items()}
+                    raise _ambiguous(name, [ids[local] for local in actors])
+                if actors:
+                    known.append((name, actors[0]))
+        # Tableaux temporaires acteurs × films et acteurs × couples (film, genre)
+        block = max(1, RECO_MAX_CELLS // max(1, len(self.film_titles), len(self.fg_genres)))
+
+        for start in range(0, len(known), block):
+            chunk = known[start:start + block]
+            scores = self.score([actor for _, actor in chunk])
+            for (name, _), row, films in zip(chunk, scores, self.top_k(scores, k)):
+                results[name] = [(self.film_titles[f], float(row[f])) for f in films if row[f] > 0]
+        return results
+
+
+_engine = None
+_engine_key = None
+_engine_lock = threading.Lock()
+
+
+# Reconstruit le moteur quand la copie du graphe a reçu de nouvelles arêtes
+def get_engine(driver):
+    global _engine, _engine_key
+    with _engine_lock:
+        snapshot = get_snapshot(driver)
+        key = (id(snapshot), len(snapshot.edge_actor))
+        if _engine is None or _engine_key != key:
+            _engine = RecommendationEngine.load(driver, snapshot)
+            _engine_key = key
+        return _engine
+
+
+def recommend_cypher(driver, actor, k=5, by_id=False):
+    with driver.session() as session:
+        if by_id:
+            actor_id = actor
+        else:
+            ids = [record["id"] for record in session.run(ACTOR_IDS_QUERY, name=actor)]
+            if len(ids) > 1:
+                raise _ambiguous(actor, ids)
+            if not ids:
+                return []
+            actor_id = ids[0]
+        result = session.run(CYPHER_QUERY, actor_id=actor_id, k=k)
+        return [(record["title"], record["score"]) for record in result if record["score"] > 0]
+
+
+def recommend_for_actors(driver, actor_names, k=5, by_id=False):
+    if not GRAPH_SNAPSHOT:
+        return {actor: recommend_cypher(driver, actor, k, by_id) for actor in dict.fromkeys(actor_names)}
+    return get_engine(driver).recommend(actor_names, k, by_id)
@@ -0,0 +1,80 @@
+import statistics
+import subprocess
+import sys
+import time
+
+# Latence de démarrage et d'interaction de l'application Streamlit
+#   1. import à froid des modules de app.py (nouveau processus à chaque mesure)
+#   2. exécutions du script avec streamlit.testing (page Neo4j, saisie d'un champ)
+# Usage : python -m testing.bench_app [nb_iterations]
+
+APP_IMPORTS = (
+    "import databases.mongo_connection, databases.neo4j_connection, queries.mongo_queries, "
+    "queries.neo4j_queries, utils.visualization, utils.dashboard_executor, utils.instrumentation"
+)
+
+COLD_IMPORT = f"""
+import sys, time
+start = time.perf_counter()
+{APP_IMPORTS}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in ("matplotlib", "seaborn", "numpy", "queries.graph_snapshot") if m in sys.modules]
+print(f"{{elapsed:.1f}} {{','.join(heavy)}}")
+"""
+
+
+def cold_import(iterations):
+    durations, heavy = [], ""
+    for _ in range(iterations):
+        output = subprocess.run([sys.executable, "-c", COLD_IMPORT], capture_output=True, text=True, check=True)
+        value, _, heavy = output.stdout.strip().partition(" ")
+        durations.append(float(value))
+    return durations, heavy
+
+
+def timed_run(app_test):
+    start = time.perf_counter()
+    app_test.run()
+    return (time.perf_counter() - start) * 1000
+
+
+def app_runs(iterations):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=120)
+    results = {"premier affichage": [timed_run(at)]}
+
+    at.sidebar.selectbox[0].set_value("Neo4j")
+    results["page Neo4j"] = [timed_run(at)]
+    results["page Neo4j (ré-exécution)"] = [timed_run(at) for _ in range(iterations)]
+
+    # Vue Recherche : une saisie dans "Acteur 1" puis validation du formulaire
+    at.radio[0].set_value(at.radio[0].options[1])
+    timed_run(at)
+    interactions = []
+    for i in range(iterations):
+        field = next(t for t in at.text_input if t.label == "Acteur 1")
+        field.input("Tom Hanks" if i % 2 else "Meryl Streep")
+        interactions.append(timed_run(at))
+    results["saisie Acteur 1"] = interactions
+    return results
+
+
+def report(label, durations):
+    print(f"{label:<32} médiane {statistics.median(durations):9.1f} ms   max {max(durations):9.1f} ms")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    durations, heavy = cold_import(iterations)
+    report("import à froid", durations)
+    print(f"   modules lourds chargés au démarrage : {heavy or 'aucun'}")
+
+    try:
+        results = app_runs(iterations)
+    except ImportError:
+        print("streamlit non installé : mesures d'exécution du script ignorées")
+    else:
+        for label, values in results.items():
+            report(label, values)
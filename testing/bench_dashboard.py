@@ -0,0 +1,56 @@
+import statistics
+import sys
+import time
+
+from databases.mongo_connection import connect_mongodb
+from queries.mongo_queries import (
+    year_with_most_movies, movies_after_1999, avg_votes_2007, films_per_year, avg_runtime_by_decade, distinct_genres, highest_revenue_film,
+    directors_with_more_than_5_films, top_genre_by_avg_revenue, top_3_rated_by_decade, high_score_high_revenue, longest_film_by_genre,
+    correlation_runtime_revenue, dashboard_snapshot
+)
+
+# Benchmark : 13 requêtes séparées vs une seule agrégation $facet
+# Usage : python -m testing.bench_dashboard [nb_iterations]
+
+PER_QUESTION = [
+    year_with_most_movies, movies_after_1999, avg_votes_2007, films_per_year, distinct_genres, highest_revenue_film,
+    directors_with_more_than_5_films, top_genre_by_avg_revenue, top_3_rated_by_decade, longest_film_by_genre,
+    high_score_high_revenue, correlation_runtime_revenue, avg_runtime_by_decade
+]
+
+
+# .uncached : on mesure les requêtes, pas le cache de résultats
+def run_per_question(collection):
+    for fn in PER_QUESTION:
+        fn.uncached(collection)
+
+
+def run_snapshot(collection):
+    dashboard_snapshot.uncached(collection)
+
+
+def timed(fn, collection, iterations):
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(collection)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def report(label, durations):
+    ordered = sorted(durations)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{label:<25} médiane {statistics.median(ordered):8.1f} ms   p95 {p95:8.1f} ms")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    collection = connect_mongodb()
+
+    # Échauffement (connexion, cache du serveur)
+    run_per_question(collection)
+    run_snapshot(collection)
+
+    report("13 requêtes séparées", timed(run_per_question, collection, iterations))
+    report("dashboard_snapshot ($facet)", timed(run_snapshot, collection, iterations))
@@ -0,0 +1,55 @@
+import statistics
+import sys
+import time
+
+from databases.neo4j_connection import connect_neo4j
+from queries import neo4j_queries
+from queries.recommendations import RecommendationEngine
+
+# Benchmark : recommandations Cypher (un aller-retour par acteur) vs moteur par lots
+# Usage : python -m testing.bench_recommendations [nb_acteurs_cypher] [nb_acteurs_lot]
+
+
+def percentile(durations, q):
+    ordered = sorted(durations)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def report(label, durations, actors):
+    total = sum(durations) / 1000
+    print(f"{label:<28} p50 {statistics.median(durations):8.2f} ms   p95 {percentile(durations, 0.95):8.2f} ms   "
+          f"{actors / total if total else 0:10.0f} acteurs/s")
+
+
+if __name__ == "__main__":
+    cypher_actors = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    batch_actors = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    driver = connect_neo4j()
+
+    start = time.perf_counter()
+    engine = RecommendationEngine.load(driver)
+    print(f"Chargement du moteur : {time.perf_counter() - start:.1f} s "
+          f"({len(engine.film_titles)} films, {len(engine.genres)} genres)")
+    # Noms sans homonyme : un nom partagé doit être désigné par son elementId
+    names = [name for name, actors in engine.snapshot.actor_by_name.items()
+             if len(actors) == 1][:max(cypher_actors, batch_actors)]
+
+    durations = []
+    for name in names[:cypher_actors]:
+        start = time.perf_counter()
+        neo4j_queries.recommend_by_genres_cypher.uncached(driver, name)
+        durations.append((time.perf_counter() - start) * 1000)
+    report("Cypher (par acteur)", durations, len(durations))
+
+    durations = []
+    for name in names[:cypher_actors]:
+        start = time.perf_counter()
+        engine.recommend([name])
+        durations.append((time.perf_counter() - start) * 1000)
+    report("Moteur (par acteur)", durations, len(durations))
+
+    batch = names[:batch_actors]
+    start = time.perf_counter()
+    engine.recommend(batch)
+    elapsed = (time.perf_counter() - start) * 1000
+    report(f"Moteur (lot de {len(batch)})", [elapsed], len(batch))
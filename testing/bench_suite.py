@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import pickle
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+# La copie locale du graphe du benchmark ne doit pas écraser celle de l'application
+os.environ.setdefault("GRAPH_SNAPSHOT_DIR", ".cache/bench_graph_snapshot")
+
+import bson
+from neo4j import GraphDatabase
+from pymongo import MongoClient, monitoring
+
+from queries import mongo_queries, neo4j_queries
+from queries.mongo_to_neo4j import load_graph
+from queries.neo4j_schema import ensure_graph_schema
+from testing.synthetic_movies import generate_films
+
+# Benchmark de toutes les fonctions de requête sur des bases locales et un jeu synthétique :
+#   mongod --dbpath /tmp/bench-mongo
+#   docker run -d -p 7687:7687 -e NEO4J_AUTH=neo4j/benchpassword neo4j:5
+# Mesures par fonction : p50 / p95 (ms), pic mémoire Python (tracemalloc), octets reçus
+# (réponses MongoDB réelles ; pour Neo4j, taille sérialisée du résultat).
+# La référence est enregistrée par taille de jeu ; une régression du p95 fait échouer le run.
+# Usage : python -m testing.bench_suite --films 100000 [--save-baseline] [--skip-load]
+
+MONGO_URI = os.getenv("LOCAL_MONGODB_URI", "mongodb://localhost:27017")
+NEO4J_URI = os.getenv("LOCAL_NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("LOCAL_NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("LOCAL_NEO4J_PASSWORD", "benchpassword")
+BENCH_DB = "bench_entertainment"
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+MONGO_FUNCTIONS = [
+    "dashboard_snapshot", "year_with_most_movies", "movies_after_1999", "avg_votes_2007", "films_per_year",
+    "distinct_genres", "highest_revenue_film", "directors_with_more_than_5_films", "top_genre_by_avg_revenue",
+    "top_3_rated_by_decade", "longest_film_by_genre", "high_score_high_revenue", "correlation_runtime_revenue",
+    "avg_runtime_by_decade",
+]
+
+ACTOR, OTHER, FILM = "Actor 00000000", "Actor 00000001", "Film 00000000"
+
+NEO4J_FUNCTIONS = {
+    "top_actor_by_films": {},
+    "co_actors": {"actor": ACTOR},
+    "top_actor_by_revenue": {},
+    "avg_votes": {},
+    "top_genre": {},
+    "films_with_my_coworkers": {"my_name": ACTOR},
+    "top_director_by_distinct_actors": {},
+    "most_connected_film": {},
+    "similar_films": {"title": FILM},
+    "top_5_actors_by_directors": {},
+    "recommend_by_genres": {"actor_name": ACTOR},
+    "recommend_by_genres_cypher": {"actor_name": ACTOR},
+    "shortest_path_between_actors": {"actor1": ACTOR, "actor2": OTHER},
+}
+
+
+# Somme des tailles BSON des réponses du serveur
+class ReplyBytes(monitoring.CommandListener):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        size = len(bson.encode(event.reply))
+        with self._lock:
+            self.total += size
+
+    def failed(self, event):
+        pass
+
+
+def load_mongo(collection, n_films, batch=10000):
+    collection.drop()
+    buffer = []
+    for doc in generate_films(n_films):
+        buffer.append(doc)
+        if len(buffer) == batch:
+            collection.insert_many(buffer, ordered=False)
+            buffer = []
+    if buffer:
+        collection.insert_many(buffer, ordered=False)
+
+
+def load_neo4j(collection, driver):
+    with driver.session() as session:
+        session.run("""
+            MATCH (n)
+            CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+        """).consume()
+    ensure_graph_schema(driver)
+    return load_graph(collection, driver, restart=True, progress=None)
+
+
+def measure(call, iterations, bytes_counter=None):
+    call()  # échauffement
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    received = bytes_counter.total if bytes_counter else 0
+    tracemalloc.start()
+    result = call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if bytes_counter:
+        received = bytes_counter.total - received
+    else:
+        received = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+
+    ordered = sorted(durations)
+    return {
+        "p50_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "peak_kb": peak / 1024,
+        "bytes": received,
+    }
+
+
+def run_suite(collection, driver, bytes_counter, iterations):
+    results = {}
+    for name in MONGO_FUNCTIONS:
+        fn = getattr(mongo_queries, name).uncached
+        results[f"mongo.{name}"] = measure(lambda: fn(collection), iterations, bytes_counter)
+    for name, kwargs in NEO4J_FUNCTIONS.items():
+        fn = getattr(neo4j_queries, name).uncached
+        results[f"neo4j.{name}"] = measure(lambda: fn(driver, **kwargs), iterations)
+    return results
+
+
+# Régression : p95 au-delà de la tolérance relative ET de l'écart absolu minimal (bruit)
+def regressions(results, baseline, tolerance, min_delta_ms):
+    failures = {}
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        limit = max(reference["p95_ms"] * (1 + tolerance), reference["p95_ms"] + min_delta_ms)
+        if current["p95_ms"] > limit:
+            failures[name] = (reference["p95_ms"], current["p95_ms"])
+    return failures
+
+
+def baseline_path(n_films):
+    return os.path.join(BASELINE_DIR, f"baseline_{n_films}.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des requêtes sur un jeu de données synthétique")
+    parser.add_argument("--films", type=int, default=10000, help="taille du jeu (1 000 à 10 000 000)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--skip-load", action="store_true", help="réutilise les données déjà chargées")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="hausse relative du p95 tolérée")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    bytes_counter = ReplyBytes()
+    client = MongoClient(MONGO_URI, event_listeners=[bytes_counter])
+    collection = client[BENCH_DB]["films"]
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+    if not args.skip_load:
+        start = time.perf_counter()
+        load_mongo(collection, args.films)
+        print(f"MongoDB : {args.films} films en {time.perf_counter() - start:.1f} s")
+        stats = load_neo4j(collection, driver)
+        print(f"Neo4j   : {stats['rows']} films en {stats['seconds']:.1f} s ({stats['rows_per_second']:.0f} lignes/s)")
+
+    results = run_suite(collection, driver, bytes_counter, args.iterations)
+    print(f"{'fonction':<45} {'p50 ms':>9} {'p95 ms':>9} {'pic Ko':>9} {'octets':>11}")
+    for name, r in results.items():
+        print(f"{name:<45} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {r['peak_kb']:9.0f} {r['bytes']:11d}")
+
+    path = baseline_path(args.films)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"✅ Référence enregistrée : {path}")
+    elif os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            failures = regressions(results, json.load(f), args.tolerance, args.min_delta_ms)
+        if failures:
+            for name, (before, after) in failures.items():
+                print(f"❌ {name} : p95 {before:.1f} ms -> {after:.1f} ms")
+            sys.exit(1)
+        print("✅ Aucune régression par rapport à la référence")
+    else:
+        print(f"Pas de référence pour {args.films} films (--save-baseline pour l'enregistrer)")
+
+    driver.close()
+    client.close()
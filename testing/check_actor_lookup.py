@@ -0,0 +1,153 @@
+import random
+import statistics
+import sys
+import time
+
+from queries.actor_lookup import ActorLookup, NameIndex, FINGERPRINT_QUERY, normalize
+
+# Vérifie l'index de noms en mémoire (préfixes + trigrammes) et mesure la latence
+# des suggestions, sans serveur : noms synthétiques, résultats comparés à un
+# parcours complet de la liste, fautes de frappe retrouvées, suppressions
+# détectées au rafraîchissement. Échoue si la médiane dépasse MAX_MEDIAN_US.
+# Usage : python -m testing.check_actor_lookup [nb_acteurs]
+
+MAX_MEDIAN_US = 1000
+
+FIRST = ["Tom", "Anne", "Scarlett", "Meryl", "Penélope", "Denzel", "Cate", "Leonardo", "Zoë", "Joaquín",
+         "Marion", "Jean", "Gérard", "Isabelle", "Omar", "Léa", "Vincent", "Juliette", "Mads", "Tilda"]
+LAST = ["Hanks", "Hathaway", "Johansson", "Streep", "Cruz", "Washington", "Blanchett", "DiCaprio", "Saldaña",
+        "Phoenix", "Cotillard", "Dujardin", "Depardieu", "Huppert", "Sy", "Seydoux", "Cassel", "Binoche",
+        "Mikkelsen", "Swinton"]
+CONSONANTS = ["b", "c", "d", "f", "g", "h", "j", "k", "l", "m", "n", "p", "r", "s", "t", "v", "z", "ch"]
+VOWELS = ["a", "e", "i", "o", "u", "ou", "an", "é"]
+
+
+def synthetic_word(rng, syllables):
+    return "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(syllables)).capitalize()
+
+
+# Les 400 noms connus, puis des noms syllabiques : les trigrammes se répartissent
+# comme dans un vrai catalogue au lieu de tous renvoyer aux 400 mêmes noms
+def synthetic_names(n_actors, seed=7):
+    rng = random.Random(seed)
+    names = [f"{f} {l}" for f in FIRST for l in LAST]
+    while len(names) < n_actors:
+        names.append(f"{synthetic_word(rng, rng.randint(2, 3))} {synthetic_word(rng, rng.randint(2, 4))}")
+    return names[:n_actors]
+
+
+def typo(name, rng):
+    i = rng.randrange(1, len(name) - 1)
+    return name[:i] + name[i + 1:]
+
+
+def latency_us(call, queries):
+    durations = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        durations.append((time.perf_counter() - start) * 1e6)
+    durations.sort()
+    return statistics.median(durations), durations[int(len(durations) * 0.95)]
+
+
+class FakeRecord(dict):
+
+    def data(self):
+        return dict(self)
+
+
+# Driver factice : acteurs {node_id: nom}, seules les requêtes du rafraîchissement
+class FakeDriver:
+
+    def __init__(self, actors):
+        self.actors = actors
+
+    def session(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        if query == FINGERPRINT_QUERY:
+            known = [n for n in self.actors if n <= params["last"]]
+            self.result = [FakeRecord(actors=len(known), ids=sum(known),
+                                      names=sum(len(self.actors[n]) for n in known))]
+        else:
+            rows = [{"node_id": n, "id": f"id:{n}", "name": self.actors[n]} for n in sorted(self.actors)]
+            self.result = [r for r in rows if r["node_id"] > params["after"]][:params["limit"]]
+        return self
+
+    def single(self):
+        return self.result[0]
+
+    def data(self):
+        return self.result
+
+
+def check_refresh():
+    driver = FakeDriver({0: "Tom Hanks", 1: "Anne Hathaway", 2: "Meryl Streep"})
+    lookup = ActorLookup(driver, backend="local").refresh(batch_size=2)
+    # Une suppression et une création entre deux rafraîchissements : même nombre d'acteurs
+    del driver.actors[1]
+    driver.actors[3] = "Cate Blanchett"
+    lookup.refresh(batch_size=2)
+    deleted = sorted(lookup.index.names) == ["Cate Blanchett", "Meryl Streep", "Tom Hanks"]
+    # Id supprimé puis réutilisé par un nouvel acteur (id <= dernier chargé)
+    driver.actors[1] = "Léa Seydoux"
+    del driver.actors[2]
+    lookup.refresh(batch_size=2)
+    reused = sorted(lookup.index.names) == ["Cate Blanchett", "Léa Seydoux", "Tom Hanks"]
+    return deleted and reused and not lookup.index.exact("Anne Hathaway") and not lookup.index.exact("Meryl Streep")
+
+
+if __name__ == "__main__":
+    n_actors = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(1)
+    names = synthetic_names(n_actors)
+
+    index = NameIndex()
+    start = time.perf_counter()
+    index.add_many((f"id:{i}", name) for i, name in enumerate(names))
+    print(f"Chargement : {len(index)} acteurs en {time.perf_counter() - start:.2f} s")
+
+    # Rafraîchissement incrémental : un petit lot inséré à sa place
+    index.add_many([("id:new", "Timothée Chalamet")])
+
+    failures = []
+    for text in ["tom h", "PENELOPE", "zoe sal", "chalam", "johansson-0001"]:
+        key = normalize(text)
+        expected = {i for i, n in enumerate(index.names) if any(
+            " ".join(normalize(n).split(" ")[w:]).startswith(key) for w in range(len(n.split())))}
+        found = {index.positions[m.id] for m in index.prefix(text, len(expected) + 1)}
+        if found != expected:
+            failures.append(f"préfixe {text!r}")
+
+    for name in rng.sample(names[:400], 50):
+        if name not in [m.name for m in index.fuzzy(typo(name, rng), 5)]:
+            failures.append(f"faute de frappe {name!r}")
+
+    if [m.id for m in index.exact("  anne   HATHAWAY ")] != [f"id:{names.index('Anne Hathaway')}"]:
+        failures.append("résolution exacte")
+
+    if not check_refresh():
+        failures.append("suppression non détectée au rafraîchissement")
+
+    prefixes = [rng.choice(names)[:rng.randint(2, 8)] for _ in range(2000)]
+    typos = [typo(rng.choice(names[:400]), rng) for _ in range(500)]
+    for label, call, queries in [("Préfixe", lambda q: index.prefix(q, 8), prefixes),
+                                 ("Faute de frappe", lambda q: index.search(q, 8), typos)]:
+        p50, p95 = latency_us(call, queries)
+        print(f"{label:<18} médiane {p50:8.1f} µs   p95 {p95:8.1f} µs")
+        if p50 > MAX_MEDIAN_US:
+            failures.append(f"{label.lower()} : médiane {p50:.0f} µs > {MAX_MEDIAN_US} µs")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Index de noms conforme")
@@ -0,0 +1,98 @@
+import os
+
+from neo4j import GraphDatabase
+
+from queries import film_projection, neo4j_queries
+from queries.mongo_to_neo4j import _write_batch
+
+# Vérifie que les lectures de la projection PARTAGE_ACTEURS ne servent que si elle
+# est complète et à jour, et que la requête directe prend le relais sinon.
+# Neo4j local jetable (le graphe est effacé), comme pour testing.bench_suite :
+#   docker run -d -p 7687:7687 -e NEO4J_AUTH=neo4j/benchpassword neo4j:5
+# Usage : python -m testing.check_film_projection
+
+NEO4J_URI = os.getenv("LOCAL_NEO4J_URI", "bolt://localhost:7687")
+NEO4J_USER = os.getenv("LOCAL_NEO4J_USER", "neo4j")
+NEO4J_PASSWORD = os.getenv("LOCAL_NEO4J_PASSWORD", "benchpassword")
+
+# F1 partage un acteur avec F2 et F3 ; F4 est isolé
+CASTS = {"F1": ["A", "B"], "F2": ["A"], "F3": ["B", "C"], "F4": ["D"]}
+
+LIVE_QUERY = """
+    MATCH (f1:films)<-[:A_JOUE]-(:Actor)-[:A_JOUE]->(f2:films)
+    WHERE f1 <> f2
+    WITH f1, count(DISTINCT f2) AS connexions
+    RETURN f1.title AS film, connexions
+    ORDER BY connexions DESC
+    LIMIT 1
+"""
+
+
+def run(driver, query, **params):
+    with driver.session() as session:
+        return session.run(query, params).data()
+
+
+def load(driver):
+    run(driver, "MATCH (n) DETACH DELETE n")
+    for title, actors in CASTS.items():
+        run(driver, """
+            MERGE (f:films {title: $title})
+            WITH f UNWIND $actors AS name
+            MERGE (a:Actor {name: name})
+            MERGE (a)-[:A_JOUE]->(f)
+        """, title=title, actors=actors)
+
+
+def answers(driver):
+    return (neo4j_queries.most_connected_film.uncached(driver),
+            neo4j_queries.similar_films.uncached(driver, "F4"))
+
+
+if __name__ == "__main__":
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    load(driver)
+
+    # 1. Pas de projection : requête directe
+    assert not film_projection.projection_ready(driver)
+    assert answers(driver)[0] == run(driver, LIVE_QUERY)[0]
+    print("✅ sans projection : requête directe")
+
+    # 2. Projection complète et à jour : lue telle quelle
+    film_projection.build_film_projection(driver, progress=None)
+    assert film_projection.projection_ready(driver)
+    connected, similar = answers(driver)
+    assert connected == film_projection.most_connected_film(driver) == {"film": "F1", "connexions": 2}
+    assert similar == film_projection.similar_films(driver, "F4") == []
+    print("✅ projection à jour : lue")
+
+    # 3. Relation ajoutée sur des films déjà traités : projection périmée, requête directe
+    run(driver, """
+        MATCH (d:Actor {name: "D"}), (f:films) WHERE f.title IN ["F2", "F3"]
+        MERGE (d)-[:A_JOUE]->(f)
+    """)
+    assert not film_projection.projection_ready(driver)
+    connected, similar = answers(driver)
+    assert connected["connexions"] == run(driver, LIVE_QUERY)[0]["connexions"] == 3, connected
+    assert {r["film"] for r in similar} == {"F2", "F3"}, similar
+    print("✅ projection périmée : requête directe")
+
+    # 4. Reconstruction, puis chargement ETL : projection invalidée, requête directe
+    film_projection.build_film_projection(driver, rebuild=True, progress=None)
+    assert film_projection.projection_ready(driver)
+    film_projection.invalidate_projection(driver)
+    assert not film_projection.projection_ready(driver)
+    assert answers(driver)[0]["connexions"] == run(driver, LIVE_QUERY)[0]["connexions"]
+    print("✅ projection invalidée par l'ETL : requête directe")
+
+    # 5. L'ETL ajoute un acteur à un film déjà traité : seul ce film est remis en
+    # attente, le passage incrémental suffit (pas de --rebuild)
+    _write_batch(driver, [{"title": "F4", "Actors": "D, C"}])
+    assert film_projection.build_film_projection(driver, progress=None) == 1
+    assert film_projection.projection_ready(driver)
+    connected, similar = answers(driver)
+    assert connected["connexions"] == run(driver, LIVE_QUERY)[0]["connexions"], connected
+    # F4 partage D avec F2, D et C avec F3
+    assert similar == [{"film": "F3", "acteurs_communs": 2}, {"film": "F2", "acteurs_communs": 1}], similar
+    print("✅ film modifié par l'ETL : passage incrémental")
+    driver.close()
@@ -0,0 +1,139 @@
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from queries.films_snapshot import FilmsSnapshot, KERNELS, write_snapshot
+from queries.mongo_common import RUNTIME, REVENUE
+from queries.mongo_migration import parse_number, parse_genres
+from queries.mongo_queries import pearson_from_sums
+from testing.check_films_stats import same
+from testing.synthetic_movies import generate_films
+
+# Vérifie les noyaux Arrow / NumPy de l'instantané Parquet contre un calcul Python
+# document par document (mêmes règles de typage que la migration), sans serveur.
+# Les ex aequo (top 3, film le plus long) sont comparés sur la valeur triée.
+# Usage : python -m testing.check_films_snapshot [nb_films]
+
+
+def documents(n_films):
+    for number, doc in enumerate(generate_films(n_films)):
+        doc["_id"] = f"{number:024x}"
+        if number % 97 == 0:
+            del doc["year"]
+        if number % 89 == 0:
+            doc[RUNTIME] = "?"
+        yield doc
+
+
+def reference(docs):
+    year_counts = defaultdict(int)
+    runtimes, directors = defaultdict(list), defaultdict(int)
+    revenues_by_genre = defaultdict(list)
+    best_rating, longest = defaultdict(list), {}
+    after_1999, votes_2007, genres, high = 0, [], set(), []
+    xs, ys, best_revenue = [], [], None
+
+    for doc in docs:
+        year = parse_number(doc.get("year"), integer=True)
+        decade = year // 10 * 10 if year is not None else None
+        runtime = parse_number(doc.get(RUNTIME), integer=True)
+        revenue = parse_number(doc.get(REVENUE))
+        metascore = parse_number(doc.get("Metascore"), integer=True)
+        rating = parse_number(doc.get("rating"))
+        items = parse_genres(doc.get("genre"))
+
+        year_counts[year] += 1
+        after_1999 += year is not None and year > 1999
+        if year == 2007:
+            votes_2007.append(doc["Votes"])
+        genres.update(items)
+        if revenue is not None and (best_revenue is None or revenue > best_revenue):
+            best_revenue = revenue
+        if doc["Director"] is not None:
+            directors[doc["Director"]] += 1
+        runtimes[decade].append(runtime)
+        if decade is not None and rating is not None:
+            best_rating[decade].append(rating)
+        for item in items:
+            if revenue is not None:
+                revenues_by_genre[item].append(revenue)
+            if runtime is not None and (item not in longest or runtime > longest[item]):
+                longest[item] = runtime
+        if metascore is not None and revenue is not None and metascore > 80 and revenue > 50:
+            high.append(doc["title"])
+        if runtime is not None and revenue is not None:
+            xs.append(runtime)
+            ys.append(revenue)
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    sums = {"n": len(xs), "sx": float(sum(xs)), "sy": sum(ys), "sxx": float(sum(x * x for x in xs)),
+            "syy": sum(y * y for y in ys), "sxy": sum(x * y for x, y in zip(xs, ys))}
+    return {
+        "year_counts": [{"_id": y, "count": c} for y, c in sorted(year_counts.items(), key=lambda i: (i[0] is not None, i[0] or 0))],
+        "movies_after_1999": after_1999,
+        "avg_votes_2007": mean(votes_2007),
+        "distinct_genres": sorted(genres),
+        "highest_revenue": best_revenue,
+        "directors_more_than_5": sorted((c for c in directors.values() if c > 5), reverse=True),
+        "genre_avg_revenue": {g: mean(v) for g, v in revenues_by_genre.items()},
+        "top_3_by_decade": {d: sorted(r, reverse=True)[:3] for d, r in best_rating.items()},
+        "longest_by_genre": longest,
+        "high_score_high_revenue": sorted(high),
+        "correlation": pearson_from_sums(sums),
+        "runtime_by_decade": {d: mean(r) for d, r in runtimes.items()},
+    }
+
+
+def engine_values(snapshot):
+    values = {name: snapshot.section(name) for name in KERNELS}
+    return {
+        "year_counts": values["year_counts"],
+        "movies_after_1999": values["movies_after_1999"],
+        "avg_votes_2007": values["avg_votes_2007"],
+        "distinct_genres": values["distinct_genres"],
+        "highest_revenue": (values["highest_revenue_film"] or {}).get(REVENUE),
+        "directors_more_than_5": [d["count"] for d in values["directors_more_than_5"]],
+        "genre_avg_revenue": {g["genre"]: g["avg"] for g in values["genre_avg_revenue"]},
+        "top_3_by_decade": {d: [f["rating"] for f in films] for d, films in values["top_3_by_decade"].items()},
+        "longest_by_genre": {g: f[RUNTIME] for g, f in values["longest_by_genre"].items()},
+        "high_score_high_revenue": sorted(f["title"] for f in values["high_score_high_revenue"]),
+        "correlation": pearson_from_sums(values["correlation_sums"]),
+        "runtime_by_decade": {r["_id"]: r["avg_runtime"] for r in values["runtime_by_decade"]},
+    }
+
+
+if __name__ == "__main__":
+    n_films = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Collection vide : seul le manifeste est écrit, l'instantané doit s'ouvrir quand même
+        empty = f"{tmp}/empty_snapshot"
+        write_snapshot(iter([]), empty)
+        empty_values = engine_values(FilmsSnapshot.open(empty))
+        empty_failures = [name for name, value in reference(iter([])).items() if not same(value, empty_values[name])]
+
+        directory = f"{tmp}/films_snapshot"
+        stats = write_snapshot(documents(n_films), directory, batch_size=10000)
+        print(f"Export : {stats['rows']} films en {stats['seconds']:.2f} s")
+
+        start = time.perf_counter()
+        expected = reference(documents(n_films))
+        python_ms = (time.perf_counter() - start) * 1000
+
+        snapshot = FilmsSnapshot.open(directory)
+        start = time.perf_counter()
+        actual = engine_values(snapshot)
+        engine_ms = (time.perf_counter() - start) * 1000
+
+    failures = [name for name in expected if not same(expected[name], actual[name])]
+    failures += [f"{name} (instantané vide)" for name in empty_failures]
+    for name in failures:
+        print(f"❌ {name}")
+    print(f"Python document par document : {python_ms:.0f} ms   noyaux Arrow/NumPy : {engine_ms:.0f} ms")
+    if failures:
+        sys.exit(1)
+    print("✅ Instantané conforme")
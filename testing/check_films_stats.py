@@ -0,0 +1,88 @@
+import math
+import os
+import sys
+import time
+
+from pymongo import MongoClient
+
+from queries.films_stats import FilmsStatsMaintainer, read_stats
+from queries.mongo_queries import SECTIONS, STATS_SECTIONS
+
+# Vérifie la synthèse films_stats contre un mongod local en replica set :
+#   mongod --replSet rs0 --dbpath /tmp/rs0 && mongosh --eval "rs.initiate()"
+# Usage : LOCAL_MONGODB_URI="mongodb://localhost:27017/?replicaSet=rs0" python -m testing.check_films_stats
+
+URI = os.getenv("LOCAL_MONGODB_URI", "mongodb://localhost:27017/?replicaSet=rs0")
+
+FILMS = [
+    {"title": "A", "year": 2007, "Votes": 100, "genre": "Action,Drama", "Runtime (Minutes)": 120, "Revenue (Millions)": 50.5},
+    {"title": "B", "year": 2007, "Votes": 300, "genre": "Drama", "Runtime (Minutes)": 95, "Revenue (Millions)": "12.3"},
+    {"title": "C", "year": 2012, "Votes": 50, "genre": "Comedy", "Runtime (Minutes)": 88, "Revenue (Millions)": "n/a"},
+    {"title": "D", "year": 1998, "Votes": 10, "genre": "Action", "Runtime (Minutes)": 140, "Revenue (Millions)": 210.0},
+]
+
+
+def live_sections(collection):
+    values = {}
+    for name in STATS_SECTIONS:
+        pipeline, finalize = SECTIONS[name]
+        values[name] = finalize(list(collection.aggregate(pipeline(False))))
+    return values
+
+
+def same(expected, actual):
+    if isinstance(expected, float) or isinstance(actual, float):
+        return expected is not None and actual is not None and math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-9)
+    if isinstance(expected, dict):
+        return expected.keys() == actual.keys() and all(same(expected[k], actual[k]) for k in expected)
+    if isinstance(expected, list):
+        return len(expected) == len(actual) and all(same(e, a) for e, a in zip(expected, actual))
+    return expected == actual
+
+
+def wait_until_consistent(collection, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = read_stats.uncached(collection)
+        live = live_sections(collection)
+        if stats and all(same(live[name], stats[name]) for name in STATS_SECTIONS):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+if __name__ == "__main__":
+    client = MongoClient(URI)
+    client.drop_database("films_stats_check")
+    collection = client["films_stats_check"]["films"]
+    collection.insert_many([dict(f) for f in FILMS])
+
+    maintainer = FilmsStatsMaintainer(collection, heartbeat_interval=1, min_rebuild_interval=0).start()
+
+    # Sans images "avant", une mise à jour force une reconstruction en cours de flux ;
+    # l'insertion qui suit ne doit pas être comptée deux fois
+    def rebuild_mid_stream():
+        client["films_stats_check"].command("collMod", "films", changeStreamPreAndPostImages={"enabled": False})
+        collection.update_one({"title": "B"}, {"$set": {"Votes": 400}})
+        collection.insert_one({"title": "F", "year": 2007, "Votes": 20, "genre": "Drama",
+                               "Runtime (Minutes)": 90, "Revenue (Millions)": 5.0})
+
+    steps = [
+        ("reconstruction", lambda: None),
+        ("insert", lambda: collection.insert_one({"title": "E", "year": 2015, "Votes": 7, "genre": "Drama,Comedy",
+                                                  "Runtime (Minutes)": 101, "Revenue (Millions)": 33.0})),
+        ("update", lambda: collection.update_one({"title": "A"}, {"$set": {"Revenue (Millions)": 80.0, "year": 2008}})),
+        ("delete", lambda: collection.delete_one({"title": "D"})),
+        ("reconstruction en cours de flux", rebuild_mid_stream),
+        ("insert après reconstruction", lambda: collection.insert_one({"title": "G", "year": 2020, "Votes": 3})),
+    ]
+    try:
+        for label, step in steps:
+            step()
+            ok = wait_until_consistent(collection)
+            print(("✅" if ok else "❌"), label)
+            if not ok:
+                sys.exit(1)
+    finally:
+        maintainer.stop()
+        client.drop_database("films_stats_check")
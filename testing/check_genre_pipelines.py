@@ -0,0 +1,91 @@
+import math
+
+from databases.mongo_connection import connect_mongodb
+from queries.mongo_queries import (
+    distinct_genres, top_genre_by_avg_revenue, longest_film_by_genre, dashboard_snapshot, RUNTIME, REVENUE
+)
+
+# Vérifie que les pipelines "genre" côté serveur donnent les mêmes résultats
+# que les anciennes versions Python (recopiées ci-dessous comme référence).
+# Usage : python -m testing.check_genre_pipelines
+
+
+def legacy_distinct_genres(collection):
+    genres = collection.distinct("genre")
+    flat_genres = set()
+    for g in genres:
+        if g:
+            flat_genres.update([x.strip() for x in g.split(",")])
+    return sorted(flat_genres)
+
+
+def legacy_top_genre_by_avg_revenue(collection):
+    docs = collection.find({REVENUE: {"$exists": True}}, {"genre": 1, REVENUE: 1})
+    genre_stats = {}
+    for doc in docs:
+        try:
+            revenue = float(doc.get(REVENUE))
+        except (ValueError, TypeError):
+            continue
+        if doc.get("genre"):
+            for g in doc["genre"].split(","):
+                genre_stats.setdefault(g.strip(), []).append(revenue)
+    avg_by_genre = [{"genre": g, "avg": sum(r) / len(r)} for g, r in genre_stats.items()]
+    return sorted(avg_by_genre, key=lambda x: x["avg"], reverse=True)
+
+
+def legacy_longest_film_by_genre(collection):
+    genre_max = {}
+    for doc in collection.find({RUNTIME: {"$exists": True}}):
+        if "genre" in doc and RUNTIME in doc:
+            for g in doc["genre"].split(","):
+                g = g.strip()
+                current = genre_max.get(g)
+                if not current or doc[RUNTIME] > current[RUNTIME]:
+                    genre_max[g] = doc
+    return genre_max
+
+
+def check_distinct_genres(expected, actual):
+    assert expected == actual, f"genres différents : {set(expected) ^ set(actual)}"
+
+
+def check_avg_revenue(expected, actual):
+    expected_by_genre = {row["genre"]: row["avg"] for row in expected}
+    actual_by_genre = {row["genre"]: row["avg"] for row in actual}
+    assert expected_by_genre.keys() == actual_by_genre.keys(), "genres différents"
+    for genre, avg in expected_by_genre.items():
+        assert math.isclose(avg, actual_by_genre[genre], rel_tol=1e-9), f"moyenne différente pour {genre}"
+    # L'ordre ne peut différer qu'entre genres à moyenne égale
+    assert [round(r["avg"], 6) for r in expected] == [round(r["avg"], 6) for r in actual], "ordre différent"
+
+
+# Documents complets identiques ; en cas d'égalité de durée, l'ancienne version garde
+# le premier document lu et le pipeline le plus petit _id : le film renvoyé doit
+# alors être un document intact de la collection, du même genre et de même durée
+def check_longest(collection, expected, actual):
+    assert expected.keys() == actual.keys(), f"genres différents : {set(expected) ^ set(actual)}"
+    for genre, film in expected.items():
+        chosen = actual[genre]
+        if chosen == film:
+            continue
+        assert chosen[RUNTIME] == film[RUNTIME], f"durée différente pour {genre}"
+        assert chosen == collection.find_one({"_id": chosen["_id"]}), f"document incomplet pour {genre}"
+        assert genre in [g.strip() for g in chosen["genre"].split(",")], f"genre absent pour {genre}"
+
+
+if __name__ == "__main__":
+    collection = connect_mongodb()
+    snapshot = dashboard_snapshot(collection)
+
+    check_distinct_genres(legacy_distinct_genres(collection), distinct_genres(collection))
+    check_distinct_genres(legacy_distinct_genres(collection), snapshot.distinct_genres)
+    print("✅ distinct_genres identique")
+
+    check_avg_revenue(legacy_top_genre_by_avg_revenue(collection), top_genre_by_avg_revenue(collection))
+    check_avg_revenue(legacy_top_genre_by_avg_revenue(collection), snapshot.genre_avg_revenue)
+    print("✅ top_genre_by_avg_revenue identique")
+
+    check_longest(collection, legacy_longest_film_by_genre(collection), longest_film_by_genre(collection))
+    check_longest(collection, legacy_longest_film_by_genre(collection), snapshot.longest_by_genre)
+    print("✅ longest_film_by_genre identique")
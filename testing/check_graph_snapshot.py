@@ -0,0 +1,65 @@
+import tempfile
+
+from databases.neo4j_connection import connect_neo4j
+from queries import neo4j_queries
+from queries.graph_snapshot import GraphSnapshot
+from utils.pagination import iter_rows
+
+# Compare les réponses de la copie CSR locale avec les requêtes Cypher
+# Usage : python -m testing.check_graph_snapshot
+
+ACTORS = ["Anne Hathaway", "Tom Hanks", "Scarlett Johansson"]
+
+
+if __name__ == "__main__":
+    driver = connect_neo4j()
+    snapshot = GraphSnapshot.load(driver)
+
+    expected = neo4j_queries.top_actor_by_films.uncached(driver)
+    actual = snapshot.top_actor_by_films()
+    assert expected["nb_films"] == actual["nb_films"], (expected, actual)
+    print("✅ top_actor_by_films")
+
+    # Pages Cypher (pagination par clé) mises bout à bout = liste complète de la copie locale
+    for name in ACTORS:
+        expected = list(iter_rows(neo4j_queries.co_actors.uncached, driver, name, page_size=7))
+        assert expected == snapshot.co_actors(name), name
+    print("✅ co_actors")
+
+    expected = neo4j_queries.actors_with_anne_hathaway(driver)
+    assert expected == list(dict.fromkeys(r["acteur"] for r in snapshot.co_actors("Anne Hathaway")))
+    print("✅ actors_with_anne_hathaway")
+
+    for name in ACTORS:
+        expected = list(iter_rows(neo4j_queries.films_with_my_coworkers.uncached, driver, name, page_size=7))
+        assert expected == snapshot.films_with_my_coworkers(name), name
+    print("✅ films_with_my_coworkers")
+
+    expected = neo4j_queries.most_connected_film.uncached(driver)
+    actual = snapshot.most_connected_film()
+    assert expected["connexions"] == actual["connexions"], (expected, actual)
+    print("✅ most_connected_film")
+
+    for a1 in ACTORS:
+        for a2 in ACTORS:
+            if a1 == a2:
+                continue
+            expected = neo4j_queries.shortest_path_between_actors.uncached(driver, a1, a2)
+            actual = snapshot.shortest_path(a1, a2)
+            # Plusieurs plus courts chemins peuvent exister : on compare la longueur
+            assert (expected is None) == (actual is None) and len(expected or []) == len(actual or []), (a1, a2)
+    print("✅ shortest_path_between_actors")
+
+    # Instantané ouvert en mémoire mappée, rafraîchi puis sauvegardé dans son propre
+    # dossier : les fichiers relus ne doivent pas être corrompus par l'écriture
+    directory = tempfile.mkdtemp()
+    snapshot.save(directory)
+    reopened = GraphSnapshot.open(directory)
+    reopened.refresh(driver).save(directory)
+    reopened = GraphSnapshot.open(directory)
+    for a1 in ACTORS:
+        for a2 in ACTORS:
+            if a1 != a2:
+                expected, actual = snapshot.shortest_path(a1, a2), reopened.shortest_path(a1, a2)
+                assert len(expected or []) == len(actual or []), (a1, a2)
+    print("✅ open -> refresh -> save -> shortest_path")
@@ -0,0 +1,93 @@
+import sys
+from types import SimpleNamespace
+
+from queries.neo4j_schema import verify_graph_plans, failing_functions
+from utils import instrumentation
+
+# Vérifie verify_graph_plans sans serveur : un driver factice renvoie des résultats
+# vides et un plan PROFILE minimal. Chaque fonction doit s'exécuter sous PROFILE,
+# y compris quand @instrumented enveloppe la session de profilage (échantillonnage forcé).
+# Usage : python -m testing.check_neo4j_schema
+
+PLAN = {"operatorType": "NodeIndexSeek@neo4j", "dbHits": 1, "children": []}
+
+
+# Ligne d'une agrégation sans correspondance : toutes les colonnes à None
+class FakeRecord(dict):
+
+    def __missing__(self, key):
+        return None
+
+    def data(self):
+        return dict(self)
+
+
+class FakeResult:
+
+    def __init__(self, query):
+        self.query = query
+
+    def __iter__(self):
+        return iter([])
+
+    def data(self):
+        return []
+
+    def single(self):
+        return FakeRecord()
+
+    def consume(self):
+        profile = PLAN if self.query.lstrip().upper().startswith("PROFILE") else None
+        return SimpleNamespace(profile=profile, result_available_after=0, result_consumed_after=0)
+
+
+class FakeSession:
+
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        self.queries.append(query)
+        return FakeResult(query)
+
+
+class FakeDriver:
+
+    def __init__(self):
+        self.queries = []
+
+    def session(self, **kwargs):
+        return FakeSession(self.queries)
+
+
+if __name__ == "__main__":
+    failures = []
+    for rate in (0.0, 1.0):
+        instrumentation.INSTRUMENT_SAMPLE_RATE = rate
+        driver = FakeDriver()
+        try:
+            report = verify_graph_plans(driver)
+        except Exception as e:
+            failures.append(f"échantillonnage {rate} : {type(e).__name__}: {e}")
+            continue
+        unprofiled = [q for q in driver.queries if not q.lstrip().upper().startswith("PROFILE")]
+        if unprofiled:
+            failures.append(f"échantillonnage {rate} : requêtes sans PROFILE {unprofiled}")
+        missing = [name for name, r in report.items() if r["checked"] and not r["operators"]]
+        if missing or failing_functions(report):
+            failures.append(f"échantillonnage {rate} : plans absents {missing} / {failing_functions(report)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ verify_graph_plans conforme")
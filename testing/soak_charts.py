@@ -0,0 +1,42 @@
+import sys
+
+import psutil
+
+from utils.visualization import chart_png, chart_cache
+
+# Test d'endurance : des milliers de "ré-exécutions" de la page MongoDB, avec un
+# nouveau jeu de données toutes les 5 (rendu réel + éviction du cache) et sinon
+# des hits. La mémoire résidente (RSS) doit rester stable après l'échauffement.
+# Usage : python -m testing.soak_charts [nb_reruns] [croissance_max_Mo]
+
+WARMUP = 200
+
+
+def rerun(i):
+    version = i // 5
+    years = [{"_id": 1990 + y, "count": (y * 7 + version) % 50} for y in range(30)]
+    runtimes = [{"_id": 1960 + 10 * d, "avg_runtime": 100 + (d + version) % 20} for d in range(7)]
+    chart_png("films_per_year", years)
+    chart_png("runtime_by_decade", runtimes)
+
+
+if __name__ == "__main__":
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    max_growth_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    process = psutil.Process()
+
+    baseline = None
+    for i in range(reruns):
+        rerun(i)
+        if i + 1 == WARMUP:
+            baseline = process.memory_info().rss
+        if (i + 1) % 500 == 0:
+            rss = process.memory_info().rss
+            print(f"{i + 1:>6} ré-exécutions  RSS {rss / 2**20:7.1f} Mo  cache {chart_cache.stats()['entries']} graphiques")
+
+    growth = (process.memory_info().rss - (baseline or 0)) / 2**20
+    print(f"Croissance après échauffement : {growth:.1f} Mo")
+    if baseline is not None and growth > max_growth_mb:
+        print(f"❌ Croissance supérieure à {max_growth_mb} Mo")
+        sys.exit(1)
+    print("✅ Mémoire stable")
@@ -0,0 +1,62 @@
+import numpy as np
+
+# Jeu de données synthétique au format de entertainment.films (mêmes noms de champs
+# que mongo_queries.py ; Actors / Director / genre alimentent les labels Neo4j).
+# Généré par blocs : 10 M de films ne sont jamais en mémoire en même temps.
+# Popularité des acteurs et réalisateurs en loi de Zipf (quelques très actifs).
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Biography", "Comedy", "Crime", "Drama", "Family", "Fantasy", "History",
+    "Horror", "Music", "Musical", "Mystery", "Romance", "Sci-Fi", "Sport", "Thriller", "War", "Western",
+]
+
+ACTORS_PER_FILM = 4
+
+
+def dataset_shape(n_films):
+    return {
+        "films": n_films,
+        "actors": max(10, int(n_films * 0.6)),
+        "directors": max(5, n_films // 4),
+    }
+
+
+def _zipf_ids(rng, size, n_values, a=1.3):
+    return (rng.zipf(a, size) - 1) % n_values
+
+
+# Une partie des valeurs est volontairement "sale" (texte, vide) comme dans l'export d'origine
+def generate_films(n_films, seed=42, chunk=10000, dirty_ratio=0.02):
+    shape = dataset_shape(n_films)
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_films, chunk):
+        size = min(chunk, n_films - start)
+        years = rng.integers(1980, 2025, size)
+        runtimes = rng.normal(112, 20, size).clip(60, 240).astype(int)
+        ratings = rng.normal(6.7, 0.9, size).clip(1, 10).round(1)
+        votes = rng.lognormal(11, 1.2, size).astype(int)
+        revenues = rng.lognormal(3.5, 1.5, size).round(2)
+        metascores = rng.integers(10, 101, size)
+        directors = _zipf_ids(rng, size, shape["directors"])
+        actors = _zipf_ids(rng, (size, ACTORS_PER_FILM), shape["actors"])
+        genre_counts = rng.integers(1, 4, size)
+        genre_picks = rng.integers(0, len(GENRES), (size, 3))
+        dirty = rng.random((size, 2)) < dirty_ratio
+
+        for i in range(size):
+            number = start + i
+            genres = list(dict.fromkeys(GENRES[g] for g in genre_picks[i, :genre_counts[i]]))
+            yield {
+                "Rank": number + 1,
+                "title": f"Film {number:08d}",
+                "genre": ",".join(genres),
+                "Description": "",
+                "Director": f"Director {directors[i]:07d}",
+                "Actors": ", ".join(f"Actor {a:08d}" for a in dict.fromkeys(actors[i].tolist())),
+                "year": int(years[i]),
+                "Runtime (Minutes)": int(runtimes[i]),
+                "rating": float(ratings[i]),
+                "Votes": int(votes[i]),
+                "Revenue (Millions)": "" if dirty[i, 0] else float(revenues[i]),
+                "Metascore": "n/a" if dirty[i, 1] else int(metascores[i]),
+            }
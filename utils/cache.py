@@ -0,0 +1,174 @@
+import atexit
+import copy
+import functools
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from neo4j import Driver
+from pymongo.collection import Collection
+
+from config.config import CACHE_MAX_ENTRIES, CACHE_PATH, CACHE_DEFAULT_TTL
+
+
+# Cache des résultats de requêtes : TTL par fonction, taille bornée (LRU),
+# invalidation par tags et persistance optionnelle sur disque (démarrage "à chaud").
+# Chaque lecture renvoie une copie : un appelant qui modifie un résultat ne
+# modifie pas l'entrée partagée.
+class ResultCache:
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, persist_path=None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # clé -> (valeur, expire_à, tags)
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._evictions = 0
+        if persist_path:
+            self.load()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+        return True, copy.deepcopy(value)
+
+    # Une valeur qui ne se copie pas (Record Neo4j...) n'est pas mise en cache
+    def set(self, key, value, ttl=CACHE_DEFAULT_TTL, tags=()):
+        try:
+            value = copy.deepcopy(value)
+        except Exception:
+            return
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def record(self, function_name, hit):
+        with self._lock:
+            if hit:
+                self._hits[function_name] += 1
+            else:
+                self._misses[function_name] += 1
+
+    # Supprime toutes les entrées portant au moins un des tags
+    def invalidate(self, *tags):
+        tags = set(tags)
+        with self._lock:
+            stale = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            functions = sorted(set(self._hits) | set(self._misses))
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": sum(self._hits.values()),
+                "misses": sum(self._misses.values()),
+                "evictions": self._evictions,
+                "by_function": {
+                    name: {"hits": self._hits[name], "misses": self._misses[name]} for name in functions
+                },
+            }
+
+    # Écrit les entrées encore valides ; les valeurs non sérialisables (ou qui ne
+    # se relisent pas, comme les Record Neo4j) sont ignorées
+    def save(self):
+        if not self.persist_path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = []
+            for key, (value, expires_at, tags) in self._entries.items():
+                if expires_at is not None and expires_at < now:
+                    continue
+                try:
+                    payload = pickle.dumps(value)
+                    pickle.loads(payload)
+                except Exception:
+                    continue
+                entries.append((key, payload, expires_at, tags))
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(entries, f)
+        os.replace(tmp_path, self.persist_path)
+
+    def load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                entries = pickle.load(f)
+        except Exception:
+            return  # fichier illisible : démarrage à froid
+        now = time.time()
+        with self._lock:
+            for key, payload, expires_at, tags in entries:
+                if expires_at is not None and expires_at < now:
+                    continue
+                # Une entrée illisible (classe disparue, objet du driver...) est abandonnée
+                try:
+                    self._entries[key] = (pickle.loads(payload), expires_at, tags)
+                except Exception:
+                    continue
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+query_cache = ResultCache(persist_path=CACHE_PATH)
+atexit.register(query_cache.save)
+
+
+# Représentation stable d'un argument : la collection / le driver sont remplacés
+# par leur nom pour que la clé reste valable après un redémarrage
+def _key_part(value):
+    if isinstance(value, Collection):
+        return f"mongo:{value.full_name}"
+    if isinstance(value, Driver):
+        return "neo4j"
+    return repr(value)
+
+
+def make_key(fn, args, kwargs):
+    parts = [_key_part(a) for a in args]
+    parts += [f"{k}={_key_part(v)}" for k, v in sorted(kwargs.items())]
+    return f"{fn.__module__}.{fn.__qualname__}({', '.join(parts)})"
+
+
+# Décorateur : @cached(ttl=600, tags=("neo4j",))
+def cached(ttl=CACHE_DEFAULT_TTL, tags=(), cache=None):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            store = cache if cache is not None else query_cache
+            key = make_key(fn, args, kwargs)
+            hit, value = store.get(key)
+            store.record(fn.__qualname__, hit)
+            if hit:
+                return value
+            value = fn(*args, **kwargs)
+            store.set(key, value, ttl=ttl, tags=tags)
+            return value
+
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
@@ -0,0 +1,157 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from config.config import DASHBOARD_WORKERS, JOB_WORKERS, SECTION_TIMEOUT
+
+# Exécution concurrente des sections du tableau de bord : les requêtes partent
+# toutes en même temps sur un pool borné, chaque section est affichée dès que
+# son résultat arrive, avec un délai maximal par section et des erreurs isolées.
+
+
+# inputs : widgets de la section (thread principal), renvoie les arguments de run
+# ou None pour ne pas lancer la requête (ex : champ vide) ; la section est alors
+# rendue dans un fragment, ré-exécuté seul quand ses widgets changent.
+# job : traitement long en écriture, exécuté sur un pool dédié pour ne pas
+# occuper les threads des requêtes de lecture
+@dataclass
+class Section:
+    title: str
+    run: Callable[..., Any]
+    render: Callable[[Any], None]
+    inputs: Optional[Callable[[], Optional[dict]]] = None
+    timeout: float = SECTION_TIMEOUT
+    job: bool = False
+
+
+@dataclass
+class SectionResult:
+    section: Section
+    value: Any = None
+    error: Optional[BaseException] = None
+    timed_out: bool = False
+    duration: float = 0.0   # durée de la requête (s)
+    finished_at: float = 0.0  # depuis le début du tableau de bord (s)
+
+
+@dataclass
+class DashboardReport:
+    time_to_first_section: Optional[float]
+    total_time: float
+    results: list
+
+
+# Pools partagés par les ré-exécutions Streamlit (threads bornés). Un thread abandonné
+# après son délai garde sa place jusqu'à la fin de la requête : les traitements longs
+# (influence, communautés) ont leur propre pool pour ne pas bloquer les lectures.
+_pool = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+_jobs_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="dashboard-job")
+
+
+# Durée mesurée dans le thread, que la requête réussisse ou échoue
+def _timed(fn, kwargs):
+    start = time.perf_counter()
+    try:
+        value = fn(**kwargs)
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+    return value, None, time.perf_counter() - start
+
+
+def _submit(sections, pool, arguments):
+    futures = {
+        (_jobs_pool if section.job else pool).submit(_timed, section.run, arguments.get(id(section), {})): section
+        for section in sections
+    }
+    return futures, time.perf_counter()
+
+
+def _collect(futures, start, on_result):
+    deadlines = {future: start + section.timeout for future, section in futures.items()}
+    pending = set(futures)
+    results = []
+    first = None
+
+    while pending:
+        next_deadline = min(deadlines[f] for f in pending)
+        done, _ = wait(pending, timeout=max(0.0, next_deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+        now = time.perf_counter()
+
+        finished = []
+        for future in done:
+            value, error, duration = future.result()
+            finished.append(SectionResult(futures[future], value=value, error=error, duration=duration,
+                                          finished_at=now - start))
+        for future in [f for f in pending - done if deadlines[f] <= now]:
+            # Le thread ne peut pas être interrompu : son résultat sera simplement ignoré
+            future.cancel()
+            done.add(future)
+            finished.append(SectionResult(futures[future], timed_out=True, duration=futures[future].timeout,
+                                          finished_at=now - start))
+        pending -= done
+
+        for result in finished:
+            if first is None and result.error is None and not result.timed_out:
+                first = now - start
+            results.append(result)
+            on_result(result)
+
+    return DashboardReport(time_to_first_section=first, total_time=time.perf_counter() - start, results=results)
+
+
+def execute_sections(sections, on_result, pool=None, arguments=None):
+    futures, start = _submit(sections, pool or _pool, arguments or {})
+    return _collect(futures, start, on_result)
+
+
+def _render_result(result, st):
+    if result.timed_out:
+        st.warning(f"⏱️ Section abandonnée après {result.section.timeout:.0f} s")
+    elif result.error is not None:
+        st.error(f"⚠️ Erreur : {result.error}")
+    else:
+        try:
+            result.section.render(result.value)
+        except Exception as e:
+            st.error(f"⚠️ Erreur d'affichage : {e}")
+
+
+# Section avec widgets : fragment Streamlit, une saisie ne ré-exécute que cette section
+def _render_fragment(section, st):
+    @st.fragment
+    def fragment():
+        st.subheader(section.title)
+        kwargs = section.inputs()
+        if kwargs is not None:
+            execute_sections([section], lambda result: _render_result(result, st), arguments={id(section): kwargs})
+
+    fragment()
+
+
+# Version Streamlit : un conteneur par section, rempli à l'arrivée du résultat.
+# Les sections sans widget partent d'abord en parallèle ; les fragments s'affichent
+# pendant ce temps, puis les résultats des premières sont collectés.
+def render_dashboard(sections, st):
+    containers = {}
+    static = [section for section in sections if section.inputs is None]
+    for section in sections:
+        containers[id(section)] = st.container()
+        if section.inputs is None:
+            with containers[id(section)]:
+                st.subheader(section.title)
+
+    futures, start = _submit(static, _pool, {})
+    for section in sections:
+        if section.inputs is not None:
+            with containers[id(section)]:
+                _render_fragment(section, st)
+
+    def on_result(result):
+        with containers[id(result.section)]:
+            _render_result(result, st)
+
+    report = _collect(futures, start, on_result)
+    first = f"{report.time_to_first_section * 1000:.0f} ms" if report.time_to_first_section is not None else "—"
+    st.caption(f"⏱️ Première section : {first} — total : {report.total_time * 1000:.0f} ms")
+    return report
@@ -0,0 +1,281 @@
+import functools
+import pickle
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+import bson
+from prometheus_client import Counter, Histogram, start_http_server
+from pymongo import monitoring
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+from config.config import INSTRUMENT_SAMPLE_RATE, INSTRUMENT_SLOW_MS, INSTRUMENT_HISTORY, INSTRUMENT_METRICS_PORT
+
+# Instrumentation des fonctions de requête (sous le cache : seuls les vrais appels
+# aux bases sont mesurés) :
+#   - durée et documents renvoyés (écouteur de commandes MongoDB) à chaque appel
+#   - octets reçus sur un échantillon d'appels (réencodage des réponses)
+#   - documents examinés sur un échantillon d'appels : delta serverStatus de tout le
+#     serveur pendant l'appel, donc approximatif si d'autres requêtes tournent
+#   - Neo4j : durées serveur du résumé de résultat ; PROFILE et db hits sur échantillon
+#   - "snapshot" (instantané Parquet) : durée seule, comparable à "mongo"
+#   - histogrammes Prometheus, journal des requêtes lentes pour la page "Performance"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+QUERY_SECONDS = Histogram("query_duration_seconds", "Durée des fonctions de requête",
+                          ["backend", "function"], buckets=LATENCY_BUCKETS)
+QUERY_BYTES = Histogram("query_bytes", "Octets reçus par appel (appels échantillonnés)", ["backend", "function"],
+                        buckets=SIZE_BUCKETS)
+QUERY_ERRORS = Counter("query_errors_total", "Appels en erreur", ["backend", "function"])
+MONGO_DOCS_RETURNED = Histogram("mongo_docs_returned", "Documents renvoyés par appel", ["function"],
+                                buckets=SIZE_BUCKETS)
+MONGO_DOCS_EXAMINED = Histogram("mongo_docs_examined_approx",
+                                "Documents examinés par le serveur pendant l'appel (approx., appels échantillonnés)",
+                                ["function"], buckets=SIZE_BUCKETS)
+NEO4J_SERVER_SECONDS = Histogram("neo4j_server_seconds", "Temps serveur (disponible + consommé)", ["function"],
+                                 buckets=LATENCY_BUCKETS)
+NEO4J_DB_HITS = Histogram("neo4j_db_hits", "db hits PROFILE (appels échantillonnés)", ["function"],
+                          buckets=SIZE_BUCKETS)
+
+
+@dataclass
+class QueryStats:
+    backend: str
+    function: str
+    arguments: str = ""
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0          # secondes
+    bytes: Optional[int] = None     # appels échantillonnés
+    docs_returned: int = 0
+    docs_examined: Optional[int] = None   # approximatif (delta serveur)
+    server_ms: float = 0.0
+    db_hits: Optional[int] = None
+    sampled: bool = False
+    error: Optional[str] = None
+
+
+_local = threading.local()
+_lock = threading.Lock()
+_durations = defaultdict(lambda: deque(maxlen=INSTRUMENT_HISTORY))
+_errors = defaultdict(int)
+slow_queries = deque(maxlen=INSTRUMENT_HISTORY)
+
+
+def _current():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+# ---------- MongoDB : écouteur de commandes (même thread que l'appel) ----------
+
+class QueryListener(monitoring.CommandListener):
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        stats = _current()
+        if stats is None:
+            return
+        # La réponse est déjà décodée : la réencoder coûte, on ne le fait que sur l'échantillon
+        if stats.sampled:
+            stats.bytes = (stats.bytes or 0) + len(bson.encode(event.reply))
+        cursor = event.reply.get("cursor")
+        if isinstance(cursor, dict):
+            stats.docs_returned += len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+
+    def failed(self, event):
+        pass
+
+
+query_listener = QueryListener()
+
+
+def _scanned_objects(collection: Collection):
+    try:
+        status = collection.database.client.admin.command("serverStatus")
+        return status["metrics"]["queryExecutor"]["scannedObjects"]
+    except (PyMongoError, KeyError):
+        return None
+
+
+# ---------- Neo4j : driver enveloppé qui relève les résumés de résultats ----------
+
+def _db_hits(plan):
+    return plan.get("dbHits", 0) + sum(_db_hits(child) for child in plan.get("children", []))
+
+
+def profiled(query):
+    return query.lstrip().upper().startswith(("PROFILE", "EXPLAIN"))
+
+
+class _InstrumentedSession:
+
+    def __init__(self, session, stats, profile):
+        self._session = session
+        self._stats = stats
+        self._profile = profile
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            for result in self._results:
+                summary = result.consume()
+                self._stats.server_ms += (summary.result_available_after or 0) + (summary.result_consumed_after or 0)
+                if summary.profile:
+                    self._stats.db_hits = (self._stats.db_hits or 0) + _db_hits(summary.profile)
+        finally:
+            self._session.close()
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    # CALL { } IN TRANSACTIONS ne peut pas être profilé
+    def run(self, query, parameters=None, **kwargs):
+        if self._profile and not profiled(query) and "IN TRANSACTIONS" not in query.upper():
+            query = "PROFILE " + query
+        result = self._session.run(query, parameters, **kwargs)
+        self._results.append(result)
+        return result
+
+
+class InstrumentedDriver:
+
+    def __init__(self, driver, stats, profile=False):
+        self._driver = driver
+        self._stats = stats
+        self._profile = profile
+
+    def session(self, **kwargs):
+        return _InstrumentedSession(self._driver.session(**kwargs), self._stats, self._profile)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+# ---------- Décorateur ----------
+
+def _record(stats):
+    labels = (stats.backend, stats.function)
+    QUERY_SECONDS.labels(*labels).observe(stats.duration)
+    if stats.bytes is not None:
+        QUERY_BYTES.labels(*labels).observe(stats.bytes)
+    if stats.error:
+        QUERY_ERRORS.labels(*labels).inc()
+    if stats.backend == "mongo":
+        MONGO_DOCS_RETURNED.labels(stats.function).observe(stats.docs_returned)
+        if stats.docs_examined is not None:
+            MONGO_DOCS_EXAMINED.labels(stats.function).observe(stats.docs_examined)
+    elif stats.backend == "neo4j":
+        NEO4J_SERVER_SECONDS.labels(stats.function).observe(stats.server_ms / 1000)
+        if stats.db_hits is not None:
+            NEO4J_DB_HITS.labels(stats.function).observe(stats.db_hits)
+
+    with _lock:
+        _durations[labels].append(stats.duration)
+        if stats.error:
+            _errors[labels] += 1
+        if stats.duration * 1000 >= INSTRUMENT_SLOW_MS:
+            slow_queries.appendleft(stats)
+
+
+# Placé sous @cached : @cached(...) puis @instrumented("neo4j")
+def instrumented(backend, sample_rate=None):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(target, *args, **kwargs):
+            rate = INSTRUMENT_SAMPLE_RATE if sample_rate is None else sample_rate
+            stats = QueryStats(backend, fn.__name__, ", ".join([repr(a) for a in args] +
+                                                             [f"{k}={v!r}" for k, v in kwargs.items()]))
+            stats.sampled = random.random() < rate
+            scanned = _scanned_objects(target) if stats.sampled and backend == "mongo" and isinstance(target, Collection) \
+                else None
+            if backend == "neo4j":
+                target = InstrumentedDriver(target, stats, profile=stats.sampled)
+
+            stack = _local.__dict__.setdefault("stack", [])
+            stack.append(stats)
+            start = time.perf_counter()
+            try:
+                value = fn(target, *args, **kwargs)
+            except Exception as e:
+                stats.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                stats.duration = time.perf_counter() - start
+                stack.pop()
+                if scanned is not None:
+                    after = _scanned_objects(target)
+                    stats.docs_examined = after - scanned if after is not None else None
+                if backend == "neo4j" and stats.sampled and stats.error is None:
+                    try:
+                        stats.bytes = len(pickle.dumps(value))
+                    except (pickle.PicklingError, TypeError, AttributeError):
+                        pass
+                _record(stats)
+            return value
+
+        return wrapper
+    return decorator
+
+
+# ---------- Lecture (page Performance) ----------
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summary():
+    with _lock:
+        rows = []
+        for (backend, function), durations in _durations.items():
+            ordered = sorted(durations)
+            rows.append({
+                "base": backend,
+                "fonction": function,
+                "appels": len(ordered),
+                "erreurs": _errors[(backend, function)],
+                "p50 (ms)": round(_percentile(ordered, 0.5) * 1000, 1),
+                "p95 (ms)": round(_percentile(ordered, 0.95) * 1000, 1),
+                "max (ms)": round(ordered[-1] * 1000, 1),
+            })
+    return sorted(rows, key=lambda r: r["p95 (ms)"], reverse=True)
+
+
+def slow_query_log():
+    with _lock:
+        return [{
+            "heure": time.strftime("%H:%M:%S", time.localtime(s.started_at)),
+            "base": s.backend,
+            "fonction": s.function,
+            "arguments": s.arguments,
+            "durée (ms)": round(s.duration * 1000, 1),
+            "octets": s.bytes,
+            "docs renvoyés": s.docs_returned if s.backend == "mongo" else None,
+            "docs examinés (approx.)": s.docs_examined,
+            "serveur (ms)": s.server_ms if s.backend == "neo4j" else None,
+            "db hits": s.db_hits,
+            "erreur": s.error,
+        } for s in slow_queries]
+
+
+_metrics_started = False
+
+
+# Point de collecte Prometheus (http://hôte:port/metrics), démarré une seule fois
+def start_metrics_server(port=INSTRUMENT_METRICS_PORT):
+    global _metrics_started
+    with _lock:
+        if port and not _metrics_started:
+            start_http_server(port)
+            _metrics_started = True
+    return _metrics_started
@@ -0,0 +1,116 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config.config import PAGE_SIZE, STREAM_FETCH_SIZE, PAGE_BOOKMARKS
+from utils.cache import ResultCache
+
+# Résultats volumineux (Neo4j et MongoDB) en flux et par pages :
+#   - stream_cypher / stream_aggregate : générateurs, lots de fetch_size lignes
+#     transférés à la demande (rien n'est matérialisé côté client)
+#   - keyset_page : page n = les page_size lignes qui suivent la clé de la dernière
+#     ligne de la page n-1 (ORDER BY clé LIMIT, jamais de SKIP) : coût constant
+#     quelle que soit la page. Les clés de début de page (signets) sont gardées
+#     dans un cache borné (TTL par défaut du cache) pour traduire un numéro de
+#     page en clé.
+#   - list_page : même objet Page pour une source déjà en mémoire (copie locale)
+
+
+@dataclass
+class Page:
+    rows: List[Dict[str, Any]]
+    page: int
+    page_size: int
+    has_next: bool
+    after: Optional[list] = None   # clé de la dernière ligne : début de la page suivante
+    pages: Optional[int] = None    # connu seulement pour une source en mémoire
+
+    @property
+    def has_previous(self):
+        return self.page > 1
+
+
+bookmarks = ResultCache(max_entries=PAGE_BOOKMARKS)
+
+
+def stream_cypher(driver, query, parameters=None, fetch_size=STREAM_FETCH_SIZE):
+    with driver.session(fetch_size=fetch_size) as session:
+        for record in session.run(query, parameters or {}):
+            yield record.data()
+
+
+def stream_aggregate(collection, pipeline, batch_size=STREAM_FETCH_SIZE):
+    with collection.aggregate(pipeline, batchSize=batch_size) as cursor:
+        yield from cursor
+
+
+# Prédicat Cypher "(e1, e2, ...) > $after" (ordre croissant sur chaque expression)
+def cypher_after(expressions, parameter="after"):
+    clauses = []
+    for i, expression in enumerate(expressions):
+        equal = [f"{e} = ${parameter}[{j}]" for j, e in enumerate(expressions[:i])]
+        clauses.append("(" + " AND ".join(equal + [f"{expression} > ${parameter}[{i}]"]) + ")")
+    return f"(${parameter} IS NULL OR " + " OR ".join(clauses) + ")"
+
+
+# Filtre MongoDB équivalent pour un tri [(champ, 1 | -1), ...]
+def mongo_after(sort, after):
+    clauses = []
+    for i, (name, direction) in enumerate(sort):
+        clause = {previous: value for (previous, _), value in zip(sort[:i], after)}
+        clause[name] = {"$gt" if direction == 1 else "$lt": after[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def mongo_keyset_pipeline(pipeline, sort, after, limit):
+    stages = list(pipeline)
+    if after is not None:
+        stages.append({"$match": mongo_after(sort, after)})
+    return stages + [{"$sort": dict(sort)}, {"$limit": limit}]
+
+
+# fetch(after, limit) -> lignes triées selon la clé ; key(row) -> valeurs de la clé.
+# name + params identifient la requête pour les signets.
+def keyset_page(name, fetch, key, page=1, page_size=PAGE_SIZE, params=()):
+    page, page_size = max(1, int(page)), max(1, int(page_size))
+
+    # Signet connu le plus proche avant la page demandée, puis avance page par page
+    current, after = 1, None
+    for candidate in range(page, 1, -1):
+        hit, value = bookmarks.get((name, params, page_size, candidate))
+        if hit:
+            current, after = candidate, value
+            break
+    # (au-delà de la dernière page, c'est la dernière qui est renvoyée)
+    rows = fetch(after, page_size + 1)
+    while current < page and len(rows) > page_size:
+        after = key(rows[page_size - 1])
+        current += 1
+        bookmarks.set((name, params, page_size, current), after)
+        rows = fetch(after, page_size + 1)
+
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    last = key(rows[-1]) if rows else after
+    if has_next:
+        bookmarks.set((name, params, page_size, current + 1), last)
+    return Page(rows, current, page_size, has_next, last)
+
+
+def list_page(rows, page=1, page_size=PAGE_SIZE):
+    page_size = max(1, int(page_size))
+    pages = max(1, math.ceil(len(rows) / page_size))
+    page = min(max(1, int(page)), pages)
+    return Page(rows[(page - 1) * page_size:page * page_size], page, page_size, page < pages, pages=pages)
+
+
+# Toutes les lignes d'une fonction paginée, page par page (générateur)
+def iter_rows(page_fn, *args, page_size=PAGE_SIZE, **kwargs):
+    page = 1
+    while True:
+        result = page_fn(*args, page=page, page_size=page_size, **kwargs)
+        yield from result.rows
+        if not result.has_next:
+            return
+        page += 1
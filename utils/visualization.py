@@ -1,27 +1,151 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
+import hashlib
+import io
+import json
 
-def plot_histogram_films_per_year(data):
-    years = [d['_id'] for d in data]
-    counts = [d['count'] for d in data]
-
-    fig, ax = plt.subplots()
-    sns.barplot(x=years, y=counts, ax=ax)
-    ax.set_title("Nombre de films par année")
-    ax.set_xlabel("Année")
-    ax.set_ylabel("Nombre de films")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+from config.config import CHART_BACKEND, CHART_CACHE_ENTRIES, CHART_DPI
+from utils.cache import ResultCache
+
+# Rendu des graphiques :
+#   - "native" : séries passées à st.bar_chart / st.line_chart (aucun import Matplotlib)
+#   - "png" : image Matplotlib rendue une fois par jeu de données (clé = hash des
+#     données), gardée dans un cache borné ; la figure est toujours fermée.
+# Matplotlib (API objet, sans pyplot ni seaborn) n'est importé qu'au premier rendu PNG.
+
+chart_cache = ResultCache(max_entries=CHART_CACHE_ENTRIES)
+
+
+def data_key(kind, data):
+    payload = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return f"{kind}:{hashlib.sha256(payload).hexdigest()}"
+
+
+# Séries (x, y, titre, axe x, axe y) de chaque graphique
+def _histogram_series(data):
+    return [d['_id'] for d in data], [d['count'] for d in data], \
+        "Nombre de films par année", "Année", "Nombre de films"
+
+
+def _runtime_series(data):
+    return [d['_id'] for d in data], [d['avg_runtime'] for d in data], \
+        "Durée moyenne des films par décennie", "Décennie", "Durée moyenne (minutes)"
+
+
+CHARTS = {
+    "films_per_year": ("bar", _histogram_series),
+    "runtime_by_decade": ("line", _runtime_series),
+}
+
+
+# Figure hors pyplot : aucune référence globale, libérée avec le dernier utilisateur
+def _figure(mark, x, y, title, x_label, y_label):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6.4, 4.8), dpi=CHART_DPI)
+    ax = fig.subplots()
+    if mark == "bar":
+        positions = range(len(x))
+        ax.bar(positions, y, color="#4c72b0")
+        ax.set_xticks(list(positions), [str(v) for v in x], rotation=45, ha="right")
+    else:
+        ax.plot(x, y, marker="o", color="#4c72b0")
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.grid(axis="y", alpha=0.3)
+    fig.tight_layout()
     return fig
 
+
+def _render_png(mark, *series):
+    fig = _figure(mark, *series)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+def chart_png(kind, data):
+    key = data_key(kind, data)
+    hit, png = chart_cache.get(key)
+    if not hit:
+        mark, series = CHARTS[kind]
+        png = _render_png(mark, *series(data))
+        chart_cache.set(key, png, ttl=None, tags=("chart",))
+    return png
+
+
+def vega_lite_spec(kind, data):
+    mark, series = CHARTS[kind]
+    x, y, title, x_label, y_label = series(data)
+    return {
+        "title": title,
+        "data": {"values": [{"x": a, "y": b} for a, b in zip(x, y)]},
+        "mark": {"type": mark, "point": mark == "line"},
+        "encoding": {
+            "x": {"field": "x", "type": "ordinal", "title": x_label},
+            "y": {"field": "y", "type": "quantitative", "title": y_label},
+        },
+    }
+
+
+def show_chart(st, kind, data, backend=CHART_BACKEND):
+    if not data:
+        st.info("Pas de données")
+        return
+    if backend == "native":
+        mark, series = CHARTS[kind]
+        x, y, title, _, _ = series(data)
+        st.caption(title)
+        values = {str(a): b for a, b in zip(x, y)}
+        (st.bar_chart if mark == "bar" else st.line_chart)(values)
+    elif backend == "vega":
+        st.vega_lite_chart(vega_lite_spec(kind, data), use_container_width=True)
+    else:
+        st.image(chart_png(kind, data))
+
+
+# ---------- Résultats paginés (utils/pagination.py) ----------
+
+# Numéro de page gardé dans session_state[key], remis à 1 quand la requête change
+def page_number(st, key, query=None):
+    if st.session_state.get(f"{key}_query") != query:
+        st.session_state[f"{key}_query"] = query
+        st.session_state[key] = 1
+    return st.session_state.get(key, 1)
+
+
+def _move_page(st, key, page):
+    st.session_state[key] = page
+
+
+# Tableau d'une page + boutons précédent / suivant (ré-exécution du fragment seul).
+# columns : {champ: titre de colonne}, dans l'ordre d'affichage
+def show_page(st, page, key, columns=None):
+    st.session_state[key] = page.page
+    if not page.rows:
+        st.info("Aucun résultat")
+        return
+    rows = [{title: r.get(c) for c, title in columns.items()} for r in page.rows] if columns else page.rows
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    previous, label, following = st.columns([1, 3, 1])
+    previous.button("◀ Précédent", key=f"{key}_previous", disabled=not page.has_previous,
+                    on_click=_move_page, args=(st, key, page.page - 1))
+    label.caption(f"Page {page.page}" + (f" / {page.pages}" if page.pages else ""))
+    following.button("Suivant ▶", key=f"{key}_next", disabled=not page.has_next,
+                     on_click=_move_page, args=(st, key, page.page + 1))
+
+
+def chart_figure(kind, data):
+    mark, series = CHARTS[kind]
+    return _figure(mark, *series(data))
+
+
+# Figures Matplotlib (non mises en cache) ; l'application passe par show_chart
+def plot_histogram_films_per_year(data):
+    return chart_figure("films_per_year", data)
+
+
 def plot_avg_runtime_by_decade(data):
-    decades = [d['_id'] for d in data]
-    avg_runtimes = [d['avg_runtime'] for d in data]
-
-    fig, ax = plt.subplots()
-    sns.lineplot(x=decades, y=avg_runtimes, marker='o', ax=ax)
-    ax.set_title("Durée moyenne des films par décennie")
-    ax.set_xlabel("Décennie")
-    ax.set_ylabel("Durée moyenne (minutes)")
-    plt.tight_layout()
-    return fig
\ No newline at end of file
+    return chart_figure("runtime_by_decade", data)